@@ -0,0 +1,21 @@
+"""
+ASGI config for brynweb project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Async openstack views (see openstack.api_views.AsyncOpenstackAPIView) await upstream
+calls without holding a worker, so one process can serve many in-flight requests.
+Sync views run one at a time per process, in Django's thread-sensitive sync thread, so
+only the async views are proxied here (config/bryn.climb.ac.uk), served by gunicorn with
+uvicorn workers (config/gunicorn-asgi-bryn.service); other views are served via WSGI.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "brynweb.settings")
+
+application = get_asgi_application()
@@ -0,0 +1,13 @@
+"""
+Gunicorn settings (--config brynweb/gunicorn_config.py)
+"""
+
+import os
+
+
+def child_exit(server, worker):
+    # Remove the exited worker's live gauge values from the prometheus multiprocess files
+    if "prometheus_multiproc_dir" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
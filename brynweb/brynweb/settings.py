@@ -98,6 +98,23 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by the gunicorn (WSGI & ASGI) workers & the huey consumer, in the huey Redis instance (its own
+# database). Membership versions, circuit breakers & locks rely on add/incr being atomic across processes,
+# and on keys not being culled, which the file-based cache doesn't provide
+
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/1",
+        "KEY_PREFIX": "bryn",
+    }
+}
+
+# Per-user team memberships are cached (invalidated by signals); seconds
+TEAM_MEMBERSHIP_CACHE_TIMEOUT = 600
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
@@ -228,6 +245,138 @@ HUEY = {
 
 POLL_FOR_HYPERVISOR_STATS = True
 
+# Openstack
+
+# Process-wide keystone session pool; tokens are renewed REFRESH_MARGIN_SECONDS ahead of expiry
+OPENSTACK_SESSION_POOL = {
+    "REFRESH_MARGIN_SECONDS": 300,
+    "IDLE_TIMEOUT_SECONDS": 1800,
+}
+
+# HTTP connection pools, shared by all clients for a region. Override per region with "REGIONS": {name: {...}}
+OPENSTACK_CONNECTION_POOL = {
+    "POOL_CONNECTIONS": 10,
+    "POOL_MAXSIZE": 20,
+    "MAX_RETRIES": 2,
+    "KEEPALIVE_IDLE_SECONDS": 60,
+    "REGIONS": {},
+}
+
+# Identical concurrent server & volume listings for a project share one upstream call (per process)
+# Results may be reused for RESULT_TTL_SECONDS after the call completes; 0 shares in-flight calls only
+OPENSTACK_COALESCING = {
+    "ENABLED": True,
+    "RESULT_TTL_SECONDS": 0,
+}
+
+# Timeouts & a circuit breaker per region & service; open breakers fail fast (503) until a probe succeeds
+# Override per region with "REGIONS": {name: {...}}
+OPENSTACK_CIRCUIT_BREAKER = {
+    "ENABLED": True,
+    "CONNECT_TIMEOUT_SECONDS": 5,
+    "READ_TIMEOUT_SECONDS": 60,
+    "FAILURE_THRESHOLD": 5,
+    "FAILURE_WINDOW_SECONDS": 60,
+    "RESET_TIMEOUT_SECONDS": 30,
+    "REGIONS": {},
+}
+
+# Prometheus metrics for openstack calls are served at /metrics, to staff or with a bearer token
+# Set METRICS_BEARER_TOKEN in locals.py; set the prometheus_multiproc_dir environment variable
+# to aggregate metrics across processes (see config/gunicorn-bryn.service; the directory is emptied at boot only,
+# by config/bryn-prometheus.conf)
+
+# Flavors, images & volume types, cached per region. Stale entries are served while refreshed in the background.
+# Private & shared flavors and images are cached per tenant, for PRIVATE_TTL_SECONDS
+OPENSTACK_CATALOG_CACHE = {
+    "TTL_SECONDS": 3600,
+    "STALE_TTL_SECONDS": 86400,
+    "PRIVATE_TTL_SECONDS": 300,
+    "WARM": True,
+}
+
+# Maximum concurrent upstream calls per tenant snapshot request
+OPENSTACK_SNAPSHOT_MAX_WORKERS = 5
+
+# Maximum concurrent upstream calls per bulk instance action request
+OPENSTACK_BULK_ACTION_MAX_WORKERS = 5
+
+# Maximum concurrent upstream calls from async views, per process (served via brynweb.asgi)
+OPENSTACK_ASYNC_MAX_WORKERS = 100
+
+# Page size for region-wide (all_tenants) server & volume listings
+OPENSTACK_INVENTORY_PAGE_SIZE = 500
+
+# Local mirror of servers & volumes, synced every SYNC_INTERVAL_MINUTES
+# With READ, list views are served from the mirror where synced (?source=live to bypass), so may be up to
+# SYNC_INTERVAL_MINUTES stale (changes made through Bryn are mirrored immediately); off by default, ?source=mirror
+# to opt in per request. With INCREMENTAL, live server listings of synced tenants fetch only servers changed since
+# the last sync (nova changes-since), merged with the mirror in memory (listings don't write); off by default
+OPENSTACK_MIRROR = {
+    "SYNC": True,
+    "SYNC_INTERVAL_MINUTES": 5,
+    "READ": False,
+    "INCREMENTAL": False,
+    "CLOCK_SKEW_SECONDS": 60,
+}
+
+# Server-Sent Events of instance & volume changes: one poller per tenant with subscribers, listing
+# every INTERVAL_SECONDS. Events are shared between processes via Redis with "CHANNEL_LAYER": "redis"
+# (the huey Redis instance, one subscription per process; in-memory where huey is in immediate mode),
+# or in-process with "memory". Each stream holds a worker thread, so MAX_STREAMS per process (keep it
+# below gunicorn's --threads); beyond that, streams are refused (503) & the frontend long-polls.
+# Long-polling instance & volume detail requests (?wait=) share the pollers, waiting MAX_WAIT_SECONDS at most
+# (served by the ASGI workers); under WSGI, each wait holds a thread, so MAX_WSGI_WAIT_SECONDS at most
+OPENSTACK_WATCH = {
+    "ENABLED": True,
+    "CHANNEL_LAYER": "redis",
+    "INTERVAL_SECONDS": 5,
+    "STREAM_SECONDS": 55,
+    "HEARTBEAT_SECONDS": 15,
+    "MAX_STREAMS": 4,
+    "RETRY_MILLISECONDS": 3000,
+    "SNAPSHOT_TIMEOUT_SECONDS": 300,
+    "MAX_WAIT_SECONDS": 30,
+    "MAX_WSGI_WAIT_SECONDS": 5,
+}
+
+# Periodic reconciliation of server leases with nova (per region): missing leases are created,
+# leases for servers deleted outside Bryn are marked deleted & shelved state is synced
+OPENSTACK_LEASE_RECONCILIATION = {
+    "ENABLED": True,
+    "INTERVAL_MINUTES": 15,
+}
+
+# Pre-built boot volumes for the most used images, held in each region's admin project
+# Override per region with "REGIONS": {name: {...}}; set "IMAGES" to pool specific image ids
+OPENSTACK_BOOT_VOLUME_POOL = {
+    "ENABLED": True,
+    "REFILL_INTERVAL_MINUTES": 5,
+    "POOL_SIZE": 2,
+    "POPULAR_IMAGES": 3,
+    "POPULARITY_DAYS": 30,
+    "REGIONS": {},
+}
+
+# In-process fake openstack, for load testing & profiling without a cloud
+# Regions named in REGIONS use the fake, e.g. "REGIONS": {"fake": {"LATENCY_SECONDS": 0.2, "ERROR_RATE": 0.01}}
+# Override latency & errors per call with "CALLS": {"nova.servers.list": {...}}
+OPENSTACK_FAKE_BACKEND = {
+    "LATENCY_SECONDS": 0.05,
+    "LATENCY_JITTER_SECONDS": 0.02,
+    "ERROR_RATE": 0.0,
+    "REGIONS": {},
+}
+
+# Keystone tokens shared between processes, via the huey Redis instance
+OPENSTACK_TOKEN_CACHE = {
+    "ENABLED": True,
+    "KEY_PREFIX": "bryn:keystone-token",
+    "EXPIRY_MARGIN_SECONDS": 300,
+    "LOCK_TIMEOUT_SECONDS": 30,
+    "LOCK_WAIT_SECONDS": 10,
+}
+
 # TinyMCE
 
 TINYMCE_DEFAULT_CONFIG = {
@@ -270,3 +419,4 @@ if not DEBUG:
 
 if DEBUG:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
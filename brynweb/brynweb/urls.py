@@ -2,6 +2,7 @@ from django.urls import include, path, register_converter
 from django.contrib import admin
 
 from core.converters import HashidsConverter
+from openstack.views import metrics_view
 
 register_converter(HashidsConverter, "hashids")
 
@@ -9,6 +10,7 @@ urlpatterns = [
     path("api/", include("core.api")),
     path("admin/", admin.site.urls),
     path("discourse/", include("discourse.urls")),
+    path("metrics", metrics_view, name="metrics"),
     path("service/", include("openstack.urls")),
     path("user/", include("userdb.urls")),
     path("", include("home.urls")),
@@ -41,6 +41,12 @@ urlpatterns = [
     path("messages/", core_views.MessagesListView.as_view(), name="messages"),
     # {%url "api:messages" % }
     path("regions/", openstack_views.RegionListView.as_view(), name="regions"),
+    # {% url "api:service_stats" %}
+    path(
+        "service-stats/",
+        openstack_views.ServiceStatsView.as_view(),
+        name="service_stats",
+    ),
     # {% url "api:teams" %}
     path("teams/", userdb_views.TeamListView.as_view(), name="teams",),
     # {% url "api:teams" team_id=team.id %}
@@ -65,6 +71,18 @@ urlpatterns = [
         openstack_views.InstanceDetailView.as_view(),
         name="instances",
     ),
+    # {% url "api:instance_actions" team_id=team.id tenant_id=tenant.id %}
+    path(
+        "teams/<hashids:team_id>/tenants/<hashids:tenant_id>/instance-actions/",
+        openstack_views.InstanceBulkActionView.as_view(),
+        name="instance_actions",
+    ),
+    # {% url "api:instance_jobs" team_id=team.id tenant_id=tenant.id pk=job.id %}
+    path(
+        "teams/<hashids:team_id>/tenants/<hashids:tenant_id>/instance-jobs/<uuid:pk>/",
+        openstack_views.ServerCreationJobDetailView.as_view(),
+        name="instance_jobs",
+    ),
     # {% url "api:lease_requests" team_id=team.id tenant_id=tenant.id instance_id=instance.id  %}
     path(
         "teams/<hashids:team_id>/tenants/<hashids:tenant_id>/instances/<str:instance_id>/lease-requests/",
@@ -95,6 +113,18 @@ urlpatterns = [
         openstack_views.VolumeDetailView.as_view(),
         name="volumes",
     ),
+    # {% url "api:tenant_snapshot" team_id=team.id tenant_id=tenant.id %}
+    path(
+        "teams/<hashids:team_id>/tenants/<hashids:tenant_id>/snapshot/",
+        openstack_views.TenantSnapshotView.as_view(),
+        name="tenant_snapshot",
+    ),
+    # {% url "api:tenant_events" team_id=team.id tenant_id=tenant.id %}
+    path(
+        "teams/<hashids:team_id>/tenants/<hashids:tenant_id>/events/",
+        openstack_views.TenantEventsView.as_view(),
+        name="tenant_events",
+    ),
     # {% url "api:volume_types" team_id=team.id tenant_id=tenant.id %}
     path(
         "teams/<hashids:team_id>/tenants/<hashids:tenant_id>/volumetypes/",
@@ -0,0 +1,19 @@
+from django.utils.cache import get_conditional_response, set_response_etag
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for DRF views: successful GET responses are given a strong ETag over the rendered
+    payload, and requests with a matching If-None-Match are answered 304 Not Modified.
+    The payload is still built, but is not resent (or re-parsed by the client).
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method != "GET" or response.status_code != 200:
+            return response
+        response.render()
+        set_response_etag(response)
+        return get_conditional_response(
+            request, etag=response.get("ETag"), response=response
+        )
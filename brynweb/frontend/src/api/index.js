@@ -4,6 +4,42 @@ axios.defaults.xsrfCookieName = "csrftoken";
 axios.defaults.xsrfHeaderName = "X-CSRFTOKEN";
 axios.defaults.timeout = 60000;
 
+// Conditional GETs: responses with an ETag are kept (as JSON, so later changes to the
+// parsed data can't leak in) & the ETag sent back as If-None-Match; a 304 Not Modified
+// is answered from the kept response
+const conditionalResponses = new Map();
+
+axios.defaults.validateStatus = (status) =>
+  (status >= 200 && status < 300) || status === 304;
+
+axios.interceptors.request.use((config) => {
+  if (config.method === "get") {
+    const kept = conditionalResponses.get(axios.getUri(config));
+    if (kept) {
+      config.headers["If-None-Match"] = kept.etag;
+    }
+  }
+  return config;
+});
+
+axios.interceptors.response.use((response) => {
+  if (response.config.method !== "get") {
+    return response;
+  }
+  const uri = axios.getUri(response.config);
+  const kept = conditionalResponses.get(uri);
+  if (response.status === 304 && kept) {
+    return { ...response, status: 200, data: JSON.parse(kept.json) };
+  }
+  if (response.headers.etag) {
+    conditionalResponses.set(uri, {
+      etag: response.headers.etag,
+      json: JSON.stringify(response.data),
+    });
+  }
+  return response;
+});
+
 const apiBase = "/api/";
 const teamBase = apiBase + "teams/TEAM_ID/";
 const tenantBase = teamBase + "tenants/TENANT_ID/";
@@ -15,6 +51,8 @@ const apiRoutes = {
   flavors: tenantBase + "flavors/",
   hypervisorStats: apiBase + "hypervisor-stats/",
   images: tenantBase + "images/",
+  instanceActions: tenantBase + "instance-actions/",
+  instanceJobs: tenantBase + "instance-jobs/",
   instances: tenantBase + "instances/",
   invitations: teamBase + "invitations/",
   keyPairs: apiBase + "keypairs/",
@@ -24,6 +62,8 @@ const apiRoutes = {
   serverLeaseRequest: instanceBase + "lease-requests/",
   teams: apiBase + "teams/",
   teamMembers: teamBase + "members/",
+  tenantEvents: tenantBase + "events/",
+  tenantSnapshot: tenantBase + "snapshot/",
   userProfile: apiBase + "userprofile/",
   volumes: tenantBase + "volumes/",
   volumeTypes: tenantBase + "volumetypes/",
@@ -42,6 +42,7 @@ export const FETCH_TENANT_INSTANCES = "FETCH_TENANT_INSTANCES";
 export const REMOVE_INSTANCE_BY_ID = "REMOVE_INSTANCE_BY_ID";
 export const RENEW_INSTANCE_LEASE = "RENEW_INSTANCE_LEASE";
 export const TRANSITION_INSTANCE = "TRANSITION_INSTANCE";
+export const TRANSITION_INSTANCES = "TRANSITION_INSTANCES";
 export const UPDATE_INSTANCE_ASSIGNED_TEAM_MEMBER =
   "UPDATE_INSTANCE_ASSIGNED_TEAM_MEMBER";
 
@@ -52,7 +53,9 @@ export const FETCH_INVITATIONS = "FETCH_INVITATIONS";
 
 // Polling
 export const CREATE_POLLING_TARGET = "CREATE_POLLING_TARGET";
-export const FETCH_POLLING_TARGETS = "FETCH_POLLING_TARGETS";
+export const FETCH_POLLING_TARGET = "FETCH_POLLING_TARGET";
+export const HANDLE_TENANT_EVENT = "HANDLE_TENANT_EVENT";
+export const WATCH_TENANT_EVENTS = "WATCH_TENANT_EVENTS";
 
 // Team Members
 export const DELETE_TEAM_MEMBER = "DELETE_TEAM_MEMBER";
@@ -10,16 +10,11 @@ import {
   FETCH_INVITATIONS,
   FETCH_KEY_PAIRS,
   FETCH_REGIONS,
-  FETCH_TENANT_FLAVORS,
-  FETCH_TENANT_IMAGES,
   FETCH_TEAM,
   FETCH_TEAM_MEMBERS,
   FETCH_TEAM_SPECIFIC_DATA,
   FETCH_TEAMS,
-  FETCH_TENANT_INSTANCES,
   FETCH_TENANT_SPECIFIC_DATA,
-  FETCH_TENANT_VOLUME_TYPES,
-  FETCH_TENANT_VOLUMES,
   FETCH_USER,
   INIT_STORE,
   SET_ACTIVE_TEAM,
@@ -40,11 +35,16 @@ import {
   SET_HYPERVISOR_STATS,
   SET_FAQS,
   SET_FILTER_TENANT_ID,
+  SET_FLAVORS,
+  SET_IMAGES,
+  SET_INSTANCES,
   SET_READY,
   SET_REGIONS,
   SET_TEAMS,
   SET_TENANTS_LOADING,
   SET_USER,
+  SET_VOLUME_TYPES,
+  SET_VOLUMES,
 } from "./mutation-types";
 
 const actions = {
@@ -134,25 +134,23 @@ const actions = {
     commit(SET_TEAMS, teams);
   },
 
-  async [FETCH_TENANT_SPECIFIC_DATA]({ commit, dispatch, getters }, tenant) {
-    /* Fetch all tenant-specific data */
+  async [FETCH_TENANT_SPECIFIC_DATA]({ commit, getters }, tenant) {
+    /* Fetch all tenant-specific data, in a single snapshot request */
     const team = getters[GET_TEAM_BY_ID](tenant.team);
-    const fetchAlways = [FETCH_TENANT_INSTANCES, FETCH_TENANT_VOLUMES];
-    const fetchOnce = [
-      FETCH_TENANT_FLAVORS,
-      FETCH_TENANT_IMAGES,
-      FETCH_TENANT_VOLUME_TYPES,
-    ];
-    const fetchActions = team.initialized
-      ? fetchAlways
-      : [...fetchAlways, ...fetchOnce];
+    const sections = team.initialized
+      ? ["instances", "volumes"]
+      : ["instances", "volumes", "flavors", "images", "volume_types"];
+    const url = getAPIRoute("tenantSnapshot", team.id, tenant.id);
+    const msg = `Error fetching data from ${getters[GET_REGION_NAME_FOR_TENANT](
+      tenant
+    )} tenant`;
+    let snapshot;
     try {
-      await Promise.all(fetchActions.map((action) => dispatch(action, tenant)));
-      commit(SET_TENANTS_LOADING, false); // first tenant to return will unlock interface
+      const response = await axios.get(url, {
+        params: { sections: sections.join(",") },
+      });
+      snapshot = response.data;
     } catch (err) {
-      const msg = `Error fetching data from ${getters[
-        GET_REGION_NAME_FOR_TENANT
-      ](tenant)} tenant`;
       if (
         err.response &&
         Object.prototype.hasOwnProperty.call(err.response.data, "detail")
@@ -162,6 +160,23 @@ const actions = {
         throw new Error(`${msg}: ${err.message}`);
       }
     }
+
+    const { instances, volumes, flavors, images, volumeTypes } = snapshot;
+    if (instances) commit(SET_INSTANCES, { instances, team, tenant });
+    if (volumes) commit(SET_VOLUMES, { volumes, team, tenant });
+    if (flavors) commit(SET_FLAVORS, { flavors, team, tenant });
+    if (images) commit(SET_IMAGES, { images, team, tenant });
+    if (volumeTypes) commit(SET_VOLUME_TYPES, { volumeTypes, team, tenant });
+    commit(SET_TENANTS_LOADING, false); // first tenant to return will unlock interface
+
+    /* Partial failure */
+    const errors = Object.entries(snapshot.errors);
+    if (errors.length) {
+      const detail = errors
+        .map(([section, error]) => `${section} (${error})`)
+        .join(", ");
+      throw new Error(`${msg}: ${detail}`);
+    }
   },
 
   async [FETCH_TEAM_SPECIFIC_DATA]({ dispatch }, team) {
@@ -14,6 +14,7 @@ import {
   REMOVE_INSTANCE_BY_ID,
   RENEW_INSTANCE_LEASE,
   TRANSITION_INSTANCE,
+  TRANSITION_INSTANCES,
   UPDATE_INSTANCE_ASSIGNED_TEAM_MEMBER,
 } from "../action-types";
 import {
@@ -39,6 +40,8 @@ import {
 } from "../mutation-types";
 
 const SHELVED_STATUSES = ["SHELVED", "SHELVED_OFFLOADED"];
+const JOB_FINISHED_STATUSES = ["COMPLETE", "FAILED"];
+const JOB_POLLING_INTERVAL = 3000;
 
 const getInstanceDetailUri = (instance) =>
   getAPIRoute("instances", instance.team, instance.tenant) + instance.id;
@@ -121,11 +124,11 @@ const getters = {
 };
 
 const actions = {
-  async [FETCH_INSTANCE]({ commit }, instance) {
-    /* Fetch and update an individual instance */
+  async [FETCH_INSTANCE]({ commit }, { item: instance, params = {} }) {
+    /* Fetch and update an individual instance; params may long-poll (wait, status) */
     const uri = getInstanceDetailUri(instance);
     try {
-      const response = await axios.get(uri);
+      const response = await axios.get(uri, { params });
       instance = response.data;
       commit(MODIFY_INSTANCE, instance);
       return instance;
@@ -142,9 +145,28 @@ const actions = {
     { commit, dispatch, rootState, state },
     { tenant, keypair, flavor, image, name }
   ) {
+    /* Server creation runs as a background job; poll the job until the server is booting */
     const payload = { tenant, keypair, flavor, image, name };
     const url = getAPIRoute("instances", rootState.activeTeamId, tenant);
-    const response = await axios.post(url, payload, { timeout: 120000 });
+    let response = await axios.post(url, payload);
+    let job = response.data;
+    const jobUri =
+      getAPIRoute("instanceJobs", job.team, job.tenant) + job.id + "/";
+    while (!JOB_FINISHED_STATUSES.includes(job.status)) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLLING_INTERVAL));
+      response = await axios.get(jobUri);
+      job = response.data;
+    }
+    if (job.status === "FAILED") {
+      throw new Error(`${job.error} (${job.step} step)`);
+    }
+    response = await axios.get(
+      getInstanceDetailUri({
+        id: job.serverId,
+        team: job.team,
+        tenant: job.tenant,
+      })
+    );
     const instance = response.data;
     commit(ADD_INSTANCE, instance);
     dispatch(CREATE_POLLING_TARGET, {
@@ -172,6 +194,41 @@ const actions = {
     });
   },
 
+  async [TRANSITION_INSTANCES]({ dispatch, state }, { instances, status }) {
+    /* Bulk transition, one request per tenant; resolves to the results per instance */
+    const targetStatuses = [status];
+    if (status === "SHELVED") {
+      targetStatuses.push("SHELVED_OFFLOADED");
+    }
+    const byTenant = {};
+    for (const instance of instances) {
+      if (!(instance.tenant in byTenant)) {
+        byTenant[instance.tenant] = [];
+      }
+      byTenant[instance.tenant].push(instance);
+    }
+    const responses = await Promise.all(
+      Object.values(byTenant).map((tenantInstances) => {
+        const { team, tenant } = tenantInstances[0];
+        const servers = tenantInstances.map((instance) => instance.id);
+        const url = getAPIRoute("instanceActions", team, tenant);
+        return axios.post(url, { servers, status });
+      })
+    );
+    const results = responses.flatMap((response) => response.data);
+    for (const result of results) {
+      if (result.error == null) {
+        dispatch(CREATE_POLLING_TARGET, {
+          collection: state.all,
+          item: state.all.find((instance) => instance.id === result.id),
+          fetchAction: FETCH_INSTANCE,
+          targetStatuses: targetStatuses,
+        });
+      }
+    }
+    return results;
+  },
+
   async [DELETE_INSTANCE]({ dispatch, state }, instance) {
     /* Delete an instance */
     const uri = getInstanceDetailUri(instance);
@@ -1,17 +1,44 @@
-import { CREATE_POLLING_TARGET, FETCH_POLLING_TARGETS } from "../action-types";
+import { getAPIRoute } from "@/api";
+import {
+  CREATE_POLLING_TARGET,
+  FETCH_POLLING_TARGET,
+  HANDLE_TENANT_EVENT,
+  WATCH_TENANT_EVENTS,
+} from "../action-types";
 import { GET_ITEM_IS_POLLING } from "../getter-types";
 import {
-  SET_POLLING_SYMBOL,
   SET_POLLING_TARGET_FULFILLED,
+  SET_TENANT_EVENTS_UNAVAILABLE,
   CLEAR_FULFILLED_POLLING_TARGETS,
-  CLEAR_POLLING_SYMBOL,
   UPDATE_OR_CREATE_POLLING_TARGET,
+  UPDATE_POLLING_TARGET_ITEM,
 } from "../mutation-types";
 
+// Long-polling: requests are held until a target status, for up to WAIT_SECONDS (or the
+// server's maximum); after errors, retry after RETRY_INTERVAL
+const WAIT_SECONDS = 25;
+const RETRY_INTERVAL = 5000;
+
+// Open tenant event streams, by "team/tenant" (not state; EventSource isn't reactive)
+const eventSources = new Map();
+
+const getTenantKey = ({ team, tenant }) => `${team}/${tenant}`;
+
+const closeUnwatchedEventSources = (targets) => {
+  /* Close event streams for tenants with no remaining targets */
+  const watched = new Set(targets.map(getTenantKey));
+  eventSources.forEach((source, key) => {
+    if (!watched.has(key)) {
+      source.close();
+      eventSources.delete(key);
+    }
+  });
+};
+
 const state = () => {
   return {
-    pollingSymbol: null, // Identifier for polling from setInterval()
-    pollingTargets: [], // [{collection[], itemId, fetchAction, ["targetStatus", "alternativeStatus"]}]
+    pollingTargets: [], // [{collection[], itemId, team, tenant, fetchAction, ["targetStatus", "alternativeStatus"]}]
+    tenantEventsUnavailable: !window.EventSource, // Fall back to polling
   };
 };
 
@@ -27,12 +54,8 @@ const getters = {
 };
 
 const mutations = {
-  [SET_POLLING_SYMBOL](state, symbol) {
-    state.pollingSymbol = symbol;
-  },
-
-  [CLEAR_POLLING_SYMBOL](state) {
-    state.pollingSymbol = null;
+  [SET_TENANT_EVENTS_UNAVAILABLE](state) {
+    state.tenantEventsUnavailable = true;
   },
 
   [UPDATE_OR_CREATE_POLLING_TARGET](
@@ -50,6 +73,8 @@ const mutations = {
       targets.push({
         collection,
         itemId: item.id,
+        team: item.team,
+        tenant: item.tenant,
         fetchAction,
         targetStatuses,
         fulfilled: false,
@@ -57,6 +82,20 @@ const mutations = {
     }
   },
 
+  [UPDATE_POLLING_TARGET_ITEM](state, { index, event }) {
+    /* Update (maintaining the ref) or remove a target's item, from a tenant event */
+    const collection = state.pollingTargets[index].collection;
+    const itemIndex = collection.findIndex((item) => item.id === event.id);
+    if (itemIndex < 0) {
+      return;
+    }
+    if (event.deleted) {
+      collection.splice(itemIndex, 1);
+    } else {
+      Object.assign(collection[itemIndex], event.data);
+    }
+  },
+
   [SET_POLLING_TARGET_FULFILLED](state, index) {
     state.pollingTargets[index].fulfilled = true;
   },
@@ -73,59 +112,89 @@ const actions = {
     { state, commit, dispatch },
     { collection, item, fetchAction, targetStatuses = [] }
   ) {
+    const isTarget = (target) =>
+      target.collection === collection && target.itemId == item.id;
+    const isPolling = state.pollingTargets.some(isTarget);
     commit(UPDATE_OR_CREATE_POLLING_TARGET, {
       collection,
       item,
       fetchAction,
       targetStatuses,
     });
-    if (!state.pollingSymbol) {
-      /* Start polling */
-      const pollingSymbol = setTimeout(() => {
-        dispatch(FETCH_POLLING_TARGETS);
-      }, 0);
-      commit(SET_POLLING_SYMBOL, pollingSymbol);
+    if (!state.tenantEventsUnavailable) {
+      dispatch(WATCH_TENANT_EVENTS, item);
+    } else if (!isPolling) {
+      dispatch(FETCH_POLLING_TARGET, state.pollingTargets.find(isTarget));
     }
   },
 
-  async [FETCH_POLLING_TARGETS]({ commit, dispatch, state }) {
-    /* Fetch & update all polling targets */
-    const results = await Promise.allSettled(
-      state.pollingTargets.map((target) => {
-        const item = target.collection.find(
-          (item) => item.id === target.itemId
+  [WATCH_TENANT_EVENTS]({ commit, dispatch, state }, { team, tenant }) {
+    /* Subscribe to pushed status changes for a tenant, unless already subscribed */
+    const key = getTenantKey({ team, tenant });
+    if (eventSources.has(key)) {
+      return;
+    }
+    const source = new EventSource(getAPIRoute("tenantEvents", team, tenant));
+    source.onmessage = (event) => {
+      dispatch(HANDLE_TENANT_EVENT, JSON.parse(event.data));
+    };
+    source.onerror = () => {
+      /* EventSource reconnects by itself, unless the stream is unavailable (e.g., disabled) */
+      if (source.readyState === EventSource.CLOSED) {
+        eventSources.forEach((source) => source.close());
+        eventSources.clear();
+        commit(SET_TENANT_EVENTS_UNAVAILABLE);
+        state.pollingTargets.forEach((target) =>
+          dispatch(FETCH_POLLING_TARGET, target)
         );
-        return dispatch(target.fetchAction, item);
-      })
-    );
+      }
+    };
+    eventSources.set(key, source);
+  },
 
-    /* Handle results */
-    results.forEach((result, index) => {
-      if (result.status == "fulfilled") {
-        /* Fulfilled case: check status against target */
-        const target = state.pollingTargets[index];
-        const newStatus = result.value.status;
-        if (target.targetStatuses?.includes(newStatus)) {
-          commit(SET_POLLING_TARGET_FULFILLED, index);
-        }
-      } else if (
-        result.status == "rejected" &&
-        result.reason.response?.status === 404
-      ) {
-        /* 404 case (e.g., item deleted) */
+  [HANDLE_TENANT_EVENT]({ commit, state }, event) {
+    /* Update targets from a pushed status change */
+    state.pollingTargets.forEach((target, index) => {
+      if (target.itemId !== event.id) {
+        return;
+      }
+      commit(UPDATE_POLLING_TARGET_ITEM, { index, event });
+      if (event.deleted || target.targetStatuses?.includes(event.status)) {
         commit(SET_POLLING_TARGET_FULFILLED, index);
       }
     });
-
-    /* Remove fulfilled targets, enque next if required */
     commit(CLEAR_FULFILLED_POLLING_TARGETS);
+    closeUnwatchedEventSources(state.pollingTargets);
+  },
 
-    if (state.pollingTargets.length === 0) {
-      commit(CLEAR_POLLING_SYMBOL);
-    } else {
-      setTimeout(() => {
-        dispatch(FETCH_POLLING_TARGETS);
-      }, 5000);
+  async [FETCH_POLLING_TARGET]({ commit, dispatch, state }, target) {
+    /* Long-poll a target until its item has a target status (or is gone) */
+    while (state.pollingTargets.includes(target)) {
+      const item = target.collection.find((item) => item.id === target.itemId);
+      let fulfilled = item == null;
+      if (item) {
+        const params = {
+          wait: WAIT_SECONDS,
+          status: target.targetStatuses.join(","),
+        };
+        try {
+          const result = await dispatch(target.fetchAction, { item, params });
+          fulfilled = target.targetStatuses.includes(result.status);
+        } catch (err) {
+          /* 404 case (e.g., item deleted) */
+          fulfilled = err.response?.status === 404;
+          if (!fulfilled) {
+            await new Promise((resolve) => {
+              setTimeout(resolve, RETRY_INTERVAL);
+            });
+          }
+        }
+      }
+      const index = state.pollingTargets.indexOf(target);
+      if (fulfilled && index >= 0) {
+        commit(SET_POLLING_TARGET_FULFILLED, index);
+        commit(CLEAR_FULFILLED_POLLING_TARGETS);
+      }
     }
   },
 };
@@ -104,11 +104,11 @@ const getters = {
 };
 
 const actions = {
-  async [FETCH_VOLUME]({ commit }, volume) {
-    /* Fetch and update an individual volume */
+  async [FETCH_VOLUME]({ commit }, { item: volume, params = {} }) {
+    /* Fetch and update an individual volume; params may long-poll (wait, status) */
     const url = getAPIRoute("volumes", volume.team, volume.tenant) + volume.id;
     try {
-      const response = await axios.get(url);
+      const response = await axios.get(url, { params });
       volume = response.data;
       commit(MODIFY_VOLUME, volume);
       return volume;
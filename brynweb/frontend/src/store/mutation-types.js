@@ -43,9 +43,9 @@ export const REMOVE_KEY_PAIR_BY_ID = "REMOVE_KEY_PAIR_BY_ID";
 export const UPDATE_OR_CREATE_POLLING_TARGET = "ADD_POLLING_TARGET";
 export const CLEAR_FULFILLED_POLLING_TARGETS =
   "CLEAR_FULFILLED_POLLING_TARGETS";
-export const CLEAR_POLLING_SYMBOL = "CLEAR_POLLING_SYMBOL";
-export const SET_POLLING_SYMBOL = "SET_POLLING_SYMBOL";
 export const SET_POLLING_TARGET_FULFILLED = "SET_POLLING_TARGET_FULFILLED";
+export const SET_TENANT_EVENTS_UNAVAILABLE = "SET_TENANT_EVENTS_UNAVAILABLE";
+export const UPDATE_POLLING_TARGET_ITEM = "UPDATE_POLLING_TARGET_ITEM";
 
 // Team Members
 export const REMOVE_TEAM_MEMBER_BY_ID = "REMOVE_TEAM_MEMBER_BY_ID";
@@ -3,14 +3,18 @@ from django.contrib.admin import helpers
 from django.template.response import TemplateResponse
 from django.utils.translation import ngettext
 
+from .catalog import RegionCatalog
 from .custom_filters import ServerLeaseStatusFilter
+from .inventory import RegionInventory
 from .models import (
     Tenant,
     Region,
     RegionSettings,
+    ServerCreationJob,
     ServerLease,
     ServerLeaseRequest,
 )
+from .tasks import refresh_region_catalog, sync_region_mirror
 
 
 def model_str(obj):
@@ -226,6 +230,26 @@ class ServerLeaseRequestAdmin(admin.ModelAdmin):
         )
 
 
+class ServerCreationJobAdmin(admin.ModelAdmin):
+    list_display = ("name", "tenant", "user", "status", "step", "created_at")
+    list_filter = ("status",)
+    search_fields = ("name", "server_id")
+    readonly_fields = (
+        "tenant",
+        "user",
+        "name",
+        "params",
+        "status",
+        "step",
+        "volume_id",
+        "server_id",
+        "error",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
 class RegionSettingsInline(admin.StackedInline):
     model = RegionSettings
 
@@ -233,8 +257,67 @@ class RegionSettingsInline(admin.StackedInline):
 class RegionAdmin(admin.ModelAdmin):
     inlines = (RegionSettingsInline,)
 
+    actions = ("refresh_catalogs", "inventory_report", "sync_mirrors")
+
+    def refresh_catalogs(self, request, queryset):
+        """
+        Admin action: invalidate & refresh cached flavors, images & volume types
+        """
+        refreshed = 0
+        for region in queryset:
+            RegionCatalog(region).invalidate()
+            refresh_region_catalog(region.pk)
+            refreshed += 1
+        self.message_user(
+            request,
+            ngettext(
+                f"Catalog refresh queued for {refreshed} region.",
+                f"Catalog refresh queued for {refreshed} regions.",
+                refreshed,
+            ),
+        )
+
+    def inventory_report(self, request, queryset):
+        """
+        Admin action: count servers & volumes across all tenants (one listing per region)
+        """
+        for region in queryset:
+            try:
+                summary = RegionInventory(region).collect().summary()
+            except Exception as e:
+                self.message_user(
+                    request,
+                    f"Inventory failed for {region.name}: {e}",
+                    level=messages.ERROR,
+                )
+                continue
+            self.message_user(
+                request,
+                f"{region.name}: {summary['servers']} servers & {summary['volumes']} volumes "
+                f"in {summary['tenants']} tenants; {summary['unmatched_servers']} servers & "
+                f"{summary['unmatched_volumes']} volumes in other projects.",
+            )
+
+    def sync_mirrors(self, request, queryset):
+        """
+        Admin action: sync the local server & volume mirror
+        """
+        synced = 0
+        for region in queryset:
+            sync_region_mirror(region.pk)
+            synced += 1
+        self.message_user(
+            request,
+            ngettext(
+                f"Mirror sync queued for {synced} region.",
+                f"Mirror sync queued for {synced} regions.",
+                synced,
+            ),
+        )
+
 
 admin.site.register(Tenant, TenantAdmin)
 admin.site.register(Region, RegionAdmin)
 admin.site.register(ServerLease, ServerLeaseAdmin)
+admin.site.register(ServerCreationJob, ServerCreationJobAdmin)
 admin.site.register(ServerLeaseRequest, ServerLeaseRequestAdmin)
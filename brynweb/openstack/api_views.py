@@ -1,23 +1,51 @@
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
 from operator import methodcaller
 
+from asgiref.sync import sync_to_async
 from core import hashids
+from core.mixins import ConditionalGetMixin
 from core.permissions import IsOwner
 from core.utils import slack_post_templated_message
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import add_never_cache_headers
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
 from rest_framework import exceptions as drf_exceptions
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, renderers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from userdb.models import Team, TeamMember
+from userdb.authorization import get_authorization_context, team_membership_cache
+from userdb.models import TeamMember
 from userdb.permissions import IsTeamMemberPermission
 
+from .catalog import RegionCatalog
+from .coalescing import single_flight
+from .connections import connection_pools
+from .leases import get_default_lease_teammember
+from .mirror import (
+    MIRROR_SETTINGS,
+    get_server_ip,
+    get_volume_display_name,
+    read_from_mirror,
+    server_mirror,
+    volume_mirror,
+)
 from .models import (
     HypervisorStats,
     KeyPair,
     Region,
+    ServerCreationJob,
     ServerLease,
     ServerLeaseRequest,
     Tenant,
@@ -27,15 +55,21 @@ from .serializers import (
     FlavorSerializer,
     HypervisorStatsSerializer,
     ImageSerializer,
+    InstanceBulkActionSerializer,
     InstanceSerializer,
     KeyPairSerializer,
     RegionSerializer,
+    ServerCreationJobSerializer,
     ServerLeaseRequestSerializer,
     TenantSerializer,
     VolumeSerializer,
     VolumeTypeSerializer,
 )
 from .service import OpenstackException, OpenstackService, ServiceUnavailable
+from .sessions import session_pool
+from .tasks import create_server
+from .volume_pool import BootVolumePool
+from .watch import WATCH_SETTINGS, StreamLimitReached, get_changes, watch_registry
 
 User = get_user_model()
 
@@ -44,23 +78,19 @@ class InvalidTenant(drf_exceptions.PermissionDenied):
     default_detail = "The specified tenant does not exist, or the authenticated user does not have team membership."
 
 
-def get_tenant_for_user(user: User, tenant_id: int, team_id: int = None) -> Tenant:
+def get_tenant_for_request(request, tenant_id: int, team_id: int) -> Tenant:
     """
-    Return a tenant obj for a given user & tenant_id, only if that user is a team member.
-    If team_id is specified: will raise if the specified tenant does not belong to this team.
+    Return the tenant for tenant_id, only if it belongs to team_id & the request user is a
+    team member. The tenant's team, region & region settings are loaded with it.
     """
-    try:
-        tenant = Tenant.objects.get(pk=tenant_id)
-        TeamMember.objects.get(team_id=team_id, user=user)
-        if team_id:
-            assert tenant.team_id == team_id
-    except (Tenant.DoesNotExist, TeamMember.DoesNotExist, AssertionError):
+    context = get_authorization_context(request, team_id=team_id, tenant_id=tenant_id)
+    if context.tenant is None:
         raise InvalidTenant
 
-    if tenant.region.disabled:
+    if context.tenant.region.disabled:
         raise ServiceUnavailable
 
-    return tenant
+    return context.tenant
 
 
 class RegionListView(generics.ListAPIView):
@@ -80,6 +110,7 @@ class OpenstackAPIView(APIView):
     # You'll need to set these attributes on subclass
     service = None
     serializer_class = None
+    mirror = None  # optional local mirror (see openstack.mirror)
 
     def get_transform_func(self, tenant):
         """
@@ -94,6 +125,13 @@ class OpenstackAPIView(APIView):
 
         return transform_func
 
+    def get_transform_list_func(self, tenant):
+        """
+        Returns a func to map a list of openstack objects, by default with transform_func.
+        Override to batch db lookups.
+        """
+        return partial(map, self.get_transform_func(tenant))
+
     @property
     def entity_type(self):
         """
@@ -109,41 +147,50 @@ class OpenstackRetrieveView(OpenstackAPIView):
 
     @method_decorator(never_cache)
     def get(self, request, team_id, tenant_id, pk):
-        tenant = get_tenant_for_user(
-            request.user, tenant_id=tenant_id, team_id=team_id
+        tenant = get_tenant_for_request(
+            request, tenant_id=tenant_id, team_id=team_id
         )  # may raise
 
         openstack = OpenstackService(tenant=tenant)
         transform_func = self.get_transform_func(tenant)
         try:
             response = methodcaller("get", pk)(getattr(openstack, self.service.value))
-            data = transform_func(response)
-            serialized = self.serializer_class(data)
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             if getattr(e, "code", None) == 404:
                 raise drf_exceptions.NotFound
             raise OpenstackException(detail=str(e))
 
-        return Response(serialized.data)
+        return Response(self.serializer_class(transform_func(response)).data)
 
 
-class OpenstackListView(OpenstackAPIView):
+class OpenstackListView(ConditionalGetMixin, OpenstackAPIView):
     """
     Base class for simple openstack collection views.
     """
 
     @method_decorator(never_cache)
     def get(self, request, team_id, tenant_id):
-        tenant = get_tenant_for_user(
-            request.user, team_id=team_id, tenant_id=tenant_id
+        tenant = get_tenant_for_request(
+            request, team_id=team_id, tenant_id=tenant_id
         )  # may raise
 
+        if self.mirror and read_from_mirror(request):
+            data, last_synced = self.mirror.read(tenant)
+            if data is not None:
+                response = Response(self.serializer_class(data, many=True).data)
+                response["X-Last-Synced"] = last_synced.isoformat()
+                return response
+
         openstack = OpenstackService(tenant=tenant)
-        transform_func = self.get_transform_func(tenant)
+        transform_list_func = self.get_transform_list_func(tenant)
         try:
             response = methodcaller("get_list")(getattr(openstack, self.service.value))
-            data = map(transform_func, response)
+            data = transform_list_func(response)
             serialized = self.serializer_class(data, many=True)
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             raise OpenstackException(detail=str(e))
 
@@ -156,8 +203,8 @@ class OpenstackCreateMixin(OpenstackAPIView):
     """
 
     def post(self, request, team_id, tenant_id):
-        tenant = get_tenant_for_user(
-            request.user, team_id=team_id, tenant_id=tenant_id
+        tenant = get_tenant_for_request(
+            request, team_id=team_id, tenant_id=tenant_id
         )  # may raise
         openstack = OpenstackService(tenant=tenant)
         transform_func = self.get_transform_func(tenant)
@@ -172,7 +219,11 @@ class OpenstackCreateMixin(OpenstackAPIView):
             response = methodcaller("create", serialized_data)(
                 getattr(openstack, self.service.value)
             )
+            if self.mirror:
+                self.mirror.record(tenant, response)
             transformed_response = transform_func(response)
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             raise OpenstackException(detail=str(e))
 
@@ -195,8 +246,8 @@ class OpenstackDeleteMixin(OpenstackAPIView):
     """
 
     def delete(self, request, team_id, tenant_id, pk):
-        tenant = get_tenant_for_user(
-            request.user, team_id=team_id, tenant_id=tenant_id
+        tenant = get_tenant_for_request(
+            request, team_id=team_id, tenant_id=tenant_id
         )  # may raise
 
         openstack = OpenstackService(tenant=tenant)
@@ -204,11 +255,16 @@ class OpenstackDeleteMixin(OpenstackAPIView):
             _response, deleted = methodcaller("delete", pk)(
                 getattr(openstack, self.service.value)
             )
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             if getattr(e, "code", None) == 404:
                 raise drf_exceptions.NotFound
             raise OpenstackException(detail=str(e))
 
+        if self.mirror:
+            self.mirror.remove(pk)
+
         # Slack notification
         slack_template = "openstack/slack/entity_deleted.txt"
         slack_context = {
@@ -222,6 +278,310 @@ class OpenstackDeleteMixin(OpenstackAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+# Openstack client calls from async views are made in this executor; bounds in-flight
+# upstream calls per process
+upstream_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "OPENSTACK_ASYNC_MAX_WORKERS", 100),
+    thread_name_prefix="openstack-upstream",
+)
+
+
+async def call_upstream(func, *args):
+    """
+    Await a blocking openstack client call, made in the upstream executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        upstream_executor, call_and_close_db_connections, partial(func, *args)
+    )
+
+
+async def gather_upstream(funcs, max_concurrency):
+    """
+    Await blocking openstack client calls, at most max_concurrency at once, in the upstream
+    executor. Returns their results in order; exceptions are returned, not raised.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def call(func):
+        async with semaphore:
+            return await call_upstream(func)
+
+    return await asyncio.gather(*[call(func) for func in funcs], return_exceptions=True)
+
+
+def sync_to_orm(func):
+    """
+    Wrap a sync func (ORM access, authentication, templates) for async views; calls are run
+    in Django's thread-sensitive sync thread, as for sync views under ASGI.
+    """
+    return sync_to_async(func, thread_sensitive=True)
+
+
+class AsyncOpenstackAPIView(OpenstackAPIView):
+    """
+    Base class for async openstack api views.
+    Authentication, permissions & ORM access run via sync_to_orm; openstack client calls via
+    call_upstream, so that, under ASGI, a process can hold many in-flight upstream calls.
+    Handlers should be async: sync handlers (e.g. DRF's options) run via sync_to_orm, so
+    would serialize any upstream calls they make with the process's ORM access.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        # Django calls coroutine functions as async views (wrapped in async_to_sync under WSGI)
+        return wraps(view)(async_view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        As APIView.dispatch, awaiting the handler.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_orm(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            if method in self.http_method_names:
+                handler = getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_orm(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_orm(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def get_tenant(self, request, team_id, tenant_id):
+        return await sync_to_orm(get_tenant_for_request)(
+            request, team_id=team_id, tenant_id=tenant_id
+        )  # may raise
+
+    def serialize(self, tenant, obj):
+        return self.serializer_class(self.get_transform_func(tenant)(obj)).data
+
+    def serialize_list(self, tenant, objs):
+        data = self.get_transform_list_func(tenant)(objs)
+        return self.serializer_class(data, many=True).data
+
+
+class AsyncOpenstackRetrieveView(AsyncOpenstackAPIView):
+    """
+    Base class for simple async openstack detail views.
+    """
+
+    async def get(self, request, team_id, tenant_id, pk):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+        return await self.retrieve(tenant, pk)
+
+    async def retrieve(self, tenant, pk):
+        """
+        Response with a resource, live. Reads don't write to the mirror (see openstack.mirror),
+        and only upstream errors are reported as openstack errors.
+        """
+        openstack = OpenstackService(tenant=tenant)
+        try:
+            obj = await call_upstream(getattr(openstack, self.service.value).get, pk)
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            if getattr(e, "code", None) == 404:
+                raise drf_exceptions.NotFound
+            raise OpenstackException(detail=str(e))
+        data = await sync_to_orm(self.serialize)(tenant, obj)
+
+        response = Response(data)
+        add_never_cache_headers(response)
+        return response
+
+
+class AsyncOpenstackListView(ConditionalGetMixin, AsyncOpenstackAPIView):
+    """
+    Base class for simple async openstack collection views.
+    """
+
+    async def get(self, request, team_id, tenant_id):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+
+        if self.mirror and read_from_mirror(request):
+            data, last_synced = await sync_to_orm(self.mirror.read)(tenant)
+            if data is not None:
+                response = Response(self.serializer_class(data, many=True).data)
+                response["X-Last-Synced"] = last_synced.isoformat()
+                add_never_cache_headers(response)
+                return response
+
+        return await self.list(tenant)
+
+    async def list(self, tenant):
+        """Response listing the tenant's resources, live"""
+        openstack = OpenstackService(tenant=tenant)
+        try:
+            objs = await call_upstream(getattr(openstack, self.service.value).get_list)
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            raise OpenstackException(detail=str(e))
+        data = await sync_to_orm(self.serialize_list)(tenant, objs)
+
+        response = Response(data)
+        add_never_cache_headers(response)
+        return response
+
+
+class AsyncOpenstackCreateMixin(AsyncOpenstackAPIView):
+    """
+    Mixin to add an async create/post method to async openstack api views.
+    """
+
+    async def post(self, request, team_id, tenant_id):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+        openstack = OpenstackService(tenant=tenant)
+
+        serialized = self.serializer_class(data=request.data)
+        serialized.is_valid(raise_exception=True)
+        serialized_data = serialized.data
+        serialized_data["team"] = team_id
+        serialized_data["tenant_id"] = tenant_id
+
+        try:
+            obj = await call_upstream(
+                getattr(openstack, self.service.value).create, serialized_data
+            )
+            if self.mirror:
+                await sync_to_orm(self.mirror.record)(tenant, obj)
+            data = await sync_to_orm(self.serialize)(tenant, obj)
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            raise OpenstackException(detail=str(e))
+
+        # Slack notification
+        slack_template = "openstack/slack/entity_created.txt"
+        slack_context = {
+            "entity_type": self.entity_type,
+            "entity_name": serialized_data.get("name", "anonymous"),
+            "tenant": tenant,
+            "user": request.user,
+        }
+        await sync_to_orm(slack_post_templated_message)(slack_template, slack_context)
+
+        return Response(data)
+
+
+class AsyncOpenstackDeleteMixin(AsyncOpenstackAPIView):
+    """
+    Mixin to add an async delete method to async openstack api views.
+    """
+
+    async def delete(self, request, team_id, tenant_id, pk):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+
+        openstack = OpenstackService(tenant=tenant)
+        try:
+            _response, deleted = await call_upstream(
+                getattr(openstack, self.service.value).delete, pk
+            )
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            if getattr(e, "code", None) == 404:
+                raise drf_exceptions.NotFound
+            raise OpenstackException(detail=str(e))
+
+        if self.mirror:
+            await sync_to_orm(self.mirror.remove)(pk)
+
+        # Slack notification
+        slack_template = "openstack/slack/entity_deleted.txt"
+        slack_context = {
+            "entity_type": self.entity_type,
+            "entity_name": getattr(deleted, "name", "anonymous"),
+            "tenant": tenant,
+            "user": request.user,
+        }
+        await sync_to_orm(slack_post_templated_message)(slack_template, slack_context)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncOpenstackWaitMixin(AsyncOpenstackAPIView):
+    """
+    Mixin to add long-polling to async openstack detail views.
+    With ?wait=<seconds>, a GET is held until the resource has one of ?status=<statuses>
+    (comma-separated), or is gone (with no statuses), or the wait expires; the resource is
+    then retrieved as usual. Waiters share the tenant's watch poller (see openstack.watch),
+    so there is one upstream listing per tenant per interval, however many are waiting.
+    Waits only free the worker under ASGI; under WSGI, the request's thread is held, so
+    waits are limited to OPENSTACK_WATCH["MAX_WSGI_WAIT_SECONDS"]. With the watch disabled,
+    the wait is a plain delay, pacing clients' polling.
+    """
+
+    resource_type = None  # Watch snapshot resource type, e.g. "instance"
+    wait_check_seconds = 1  # Checks of the (cached) snapshot, not upstream calls
+
+    async def get(self, request, team_id, tenant_id, pk):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+        if "wait" in request.query_params:
+            seconds = self.get_wait_seconds()
+            if WATCH_SETTINGS.get("ENABLED", True):
+                await self.wait_for_status(
+                    tenant, pk, self.get_wait_statuses(), seconds
+                )
+            else:
+                await asyncio.sleep(seconds)
+        return await self.retrieve(tenant, pk)
+
+    def get_wait_seconds(self):
+        try:
+            seconds = float(self.request.query_params["wait"])
+        except ValueError:
+            raise drf_exceptions.ValidationError("wait must be a number of seconds")
+        if isinstance(self.request._request, ASGIRequest):
+            max_seconds = WATCH_SETTINGS.get("MAX_WAIT_SECONDS", 30)
+        else:
+            max_seconds = WATCH_SETTINGS.get("MAX_WSGI_WAIT_SECONDS", 5)
+        return max(0, min(seconds, max_seconds))
+
+    def get_wait_statuses(self):
+        statuses = self.request.query_params.get("status", "").split(",")
+        return {value.strip() for value in statuses if value.strip()}
+
+    async def wait_for_status(self, tenant, pk, statuses, timeout):
+        """
+        Wait for a snapshot, polled since the wait began, in which the resource has one of
+        statuses or is gone. Returns False if the wait expires first.
+        """
+        started = time.time()
+        deadline = time.monotonic() + timeout
+        poller = watch_registry.acquire(tenant, collect_tenant_resources)
+        try:
+            while True:
+                polled_at, snapshot = await call_upstream(poller.get_snapshot)
+                if polled_at is not None and polled_at >= started:
+                    resource = snapshot.get(self.resource_type, {}).get(pk)
+                    if resource is None or resource["status"] in statuses:
+                        return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                await asyncio.sleep(min(remaining, self.wait_check_seconds))
+        finally:
+            watch_registry.release(tenant.pk)
+
+
 class TenantListView(generics.ListAPIView):
     """
     Tenant list view.
@@ -230,85 +590,192 @@ class TenantListView(generics.ListAPIView):
     serializer_class = TenantSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        team = get_object_or_404(Team, pk=self.kwargs.get("team_id"))
-        try:
-            TeamMember.objects.get(team=team, user=user)
-        except TeamMember.DoesNotExist:
+        context = get_authorization_context(self.request)
+        if not context.is_member:
+            if not context.team_exists:
+                raise drf_exceptions.NotFound
             raise InvalidTenant
-        return team.tenants
+        return Tenant.objects.filter(team_id=context.team_id)
 
 
-def get_instance_transform_func(self, tenant):
+def get_instance_list_transform_func(self, tenant):
     """
-    Transform function factory for Instance views.
+    Transform function factory for lists of instances.
+    Leases for all servers are loaded in one query. Leases are created with servers, or by
+    reconciliation (see openstack.leases), so may be missing for servers created elsewhere.
     """
     public_netname = tenant.region.regionsettings.public_network_name
 
-    def transform_func(obj):
-        obj.tenant = tenant.pk
-        obj.team = tenant.team.pk
-        obj.flavor = obj.flavor["id"]
-
-        if self.request.method == "GET":
-            # 'Missing' lease for a legacy server: assign team admin member
-            assigned_teammember = TeamMember.objects.filter(
-                team=tenant.team, is_admin=True
-            ).first()
-        else:
-            # New server: assign logged in user's team membership
-            assigned_teammember = TeamMember.objects.get(
-                team=tenant.team, user=self.request.user
-            )
-
-        lease_defaults = {
-            "server_id": obj.id,
-            "server_name": obj.name,
-            "tenant": tenant,
-            "assigned_teammember": assigned_teammember,
-            "shelved": True if "SHELVED" in obj.status else False,
+    def transform_list_func(objs):
+        objs = list(objs)
+        leases = {
+            str(lease.server_id): lease
+            for lease in ServerLease.objects.filter(
+                server_id__in=[obj.id for obj in objs]
+            ).select_related("assigned_teammember")
         }
-        lease, _created = ServerLease.objects.get_or_create(
-            server_id=obj.id, defaults=lease_defaults
-        )
-        obj.lease_expiry = lease.expiry
-        obj.lease_renewal_url = lease.renewal_url
-        obj.lease_assigned_teammember = lease.assigned_teammember
+        for obj in objs:
+            obj.tenant = tenant.pk
+            obj.team = tenant.team_id
+            obj.flavor = obj.flavor["id"]
 
-        if public_netname in obj.addresses.keys():
-            obj.ip = obj.addresses[public_netname][0]["addr"]
-        else:
-            obj.ip = None
+            lease = leases.get(obj.id)
+            obj.lease_expiry = lease.expiry if lease else None
+            obj.lease_renewal_url = lease.renewal_url if lease else None
+            obj.lease_assigned_teammember = lease.assigned_teammember if lease else None
 
-        return obj
+            obj.ip = get_server_ip(obj, public_netname)
+        return objs
+
+    return transform_list_func
+
+
+def get_instance_transform_func(self, tenant):
+    """
+    Transform function factory for Instance views (see get_instance_list_transform_func).
+    """
+    transform_list_func = get_instance_list_transform_func(self, tenant)
+
+    def transform_func(obj):
+        return transform_list_func([obj])[0]
 
     return transform_func
 
 
-class InstanceListView(OpenstackCreateMixin, OpenstackListView):
+def get_server_lease(tenant, pk):
+    """
+    The lease for a tenant's server, or None. Raises NotFound for malformed server ids.
+    """
+    try:
+        uuid.UUID(str(pk))
+    except ValueError:
+        raise drf_exceptions.NotFound
+    return ServerLease.objects.filter(server_id=pk, tenant=tenant).first()
+
+
+def get_server(tenant, pk):
+    """
+    Fetch a tenant's server from nova. Raises NotFound if it is not found in the tenant.
+    """
+    try:
+        return OpenstackService(tenant=tenant).servers.get(pk)
+    except ServiceUnavailable:
+        raise
+    except Exception as e:
+        if getattr(e, "code", None) == 404:
+            raise drf_exceptions.NotFound
+        raise OpenstackException(detail=str(e))
+
+
+def create_server_lease(tenant, server, get_assigned_teammember):
+    """
+    Create a missing server lease (see ServerLeaseQuerySet.for_servers).
+    """
+    ServerLease.objects.for_servers(tenant, [server], get_assigned_teammember)
+    return ServerLease.objects.get(server_id=server.id)
+
+
+def get_or_create_server_lease(tenant, pk, get_assigned_teammember):
+    """
+    The lease for a tenant's server, created if missing.
+    Raises NotFound if there is no lease & the server is not found in the tenant.
+    """
+    lease = get_server_lease(tenant, pk)
+    if lease:
+        return lease
+    return create_server_lease(tenant, get_server(tenant, pk), get_assigned_teammember)
+
+
+class InstanceListView(AsyncOpenstackListView):
     """
     Instance list view.
+    Live listings are fetched incrementally (nova changes-since) if OPENSTACK_MIRROR["INCREMENTAL"],
+    and the tenant's mirror has been synced: changes are merged into the mirrored servers in
+    memory, so listings stay read-only (the high-water mark is advanced by mirror syncs).
     """
 
     serializer_class = InstanceSerializer
     service = OpenstackService.Services.SERVERS
+    mirror = server_mirror
     get_transform_func = get_instance_transform_func
+    get_transform_list_func = get_instance_list_transform_func
+    incremental = MIRROR_SETTINGS.get("INCREMENTAL", False)
+
+    async def list(self, tenant):
+        since = None
+        if self.incremental:
+            since = await sync_to_orm(server_mirror.get_changes_since)(tenant)
+        if since is None:
+            return await super().list(tenant)
+
+        openstack = OpenstackService(tenant=tenant)
+        try:
+            servers = await call_upstream(server_mirror.fetch_changes, openstack, since)
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            raise OpenstackException(detail=str(e))
+        data = await sync_to_orm(server_mirror.read_changes)(tenant, servers)
 
-    def post(self, request, *args, **kwargs):
+        response = Response(self.serializer_class(data, many=True).data)
+        add_never_cache_headers(response)
+        return response
+
+    async def post(self, request, team_id, tenant_id):
+        """
+        Queue server creation (see openstack.tasks.create_server).
+        Responds immediately with the job; progress via ServerCreationJobDetailView.
+        """
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+        data = await sync_to_orm(self.create_job)(request, tenant, team_id)
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    def create_job(self, request, tenant, team_id):
+        """Create & queue a ServerCreationJob, returning its serializer data"""
         # Grab local keypair, append public key to data dict
-        keypair_local = get_object_or_404(KeyPair, pk=request.data["keypair"])
+        keypair_local = get_object_or_404(KeyPair, pk=request.data.get("keypair"))
         request.data["public_key"] = keypair_local.public_key
-        return super().post(request, *args, **kwargs)
 
+        serialized = self.serializer_class(data=request.data)
+        serialized.is_valid(raise_exception=True)
+        params = {**serialized.data, "team": team_id}
+
+        job = ServerCreationJob.objects.create(
+            tenant=tenant, user=request.user, name=params["name"], params=params
+        )
+        create_server(job.pk)
+        job.refresh_from_db()  # huey immediate mode (DEBUG) runs the task inline
+        return ServerCreationJobSerializer(job).data
 
-class InstanceDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
+
+class ServerCreationJobDetailView(APIView):
+    """
+    Server creation job detail view: progress (keypair, volume, boot) & errors.
+    """
+
+    @method_decorator(never_cache)
+    def get(self, request, team_id, tenant_id, pk):
+        tenant = get_tenant_for_request(
+            request, team_id=team_id, tenant_id=tenant_id
+        )  # may raise
+        job = get_object_or_404(ServerCreationJob, pk=pk, tenant=tenant)
+        return Response(ServerCreationJobSerializer(job).data)
+
+
+class InstanceDetailView(
+    AsyncOpenstackWaitMixin, AsyncOpenstackDeleteMixin, AsyncOpenstackRetrieveView
+):
     """
     Instance detail view.
     """
 
+    resource_type = "instance"
+
     serializer_class = InstanceSerializer
     service = OpenstackService.Services.SERVERS
+    mirror = server_mirror
     get_transform_func = get_instance_transform_func
+    get_transform_list_func = get_instance_list_transform_func
 
     # Define allowed state transitions & associated method names
     # top level is current status, 1st level is target status
@@ -319,45 +786,97 @@ class InstanceDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
         "SHELVED_OFFLOADED": {"ACTIVE": "unshelve"},
     }
 
-    def delete(self, request, team_id, tenant_id, pk):
-        response = super().delete(request, team_id, tenant_id, pk)
+    # Mirrored status, assuming the transition succeeds
+    optimistic_statuses = {
+        "reboot": "HARD_REBOOT",
+        "stop": "SHUTOFF",
+        "start": "ACTIVE",
+        "shelve": "SHELVED_OFFLOADED",
+        "unshelve": "ACTIVE",
+    }
+
+    async def delete(self, request, team_id, tenant_id, pk):
+        response = await super().delete(request, team_id, tenant_id, pk)
         # Update lease after deletion
-        lease = get_object_or_404(ServerLease, server_id=pk)
-        lease.deleted = True
-        lease.save()
+        await sync_to_orm(self.delete_lease)(pk)
         return response
 
-    def _state_transition(self, target_status, request, team_id, tenant_id, pk):
-        tenant = get_tenant_for_user(
-            request.user, team_id=team_id, tenant_id=tenant_id
-        )  # may raise
-        openstack = OpenstackService(tenant=tenant)
-        service = getattr(openstack, self.service.value)
+    @staticmethod
+    def delete_lease(pk):
+        """Mark any lease deleted (servers created elsewhere may not have one yet)"""
+        ServerLease.objects.filter(server_id=pk).update(deleted=True)
+
+    @classmethod
+    def call_state_transition(cls, service, tenant, target_status, pk):
+        """
+        Fetch a server & call the method for its transition to target_status.
+        Returns (server, current status, method name).
+        """
+        server = service.get(pk)
+        current_status = server.status
+        if (
+            current_status in ["SHELVED", "SHELVED_OFFLOADED"]
+            and tenant.region.unshelving_disabled
+        ):
+            raise drf_exceptions.PermissionDenied(
+                f"Unshelving is disabled at {tenant.region.description}"
+            )
         try:
-            server = service.get(pk)
-            current_status = server.status
-            if (
-                current_status in ["SHELVED", "SHELVED_OFFLOADED"]
-                and tenant.region.unshelving_disabled
+            method_name = cls.state_transitions[current_status][target_status]
+        except KeyError:
+            raise drf_exceptions.ValidationError(
+                f"Cannot change status from {current_status} to {target_status}"
+            )
+        methodcaller(method_name, server)(service)
+        return server, current_status, method_name
+
+    @staticmethod
+    def update_leases(transitions, target_status, user):
+        """
+        Update leases for shelved & unshelved servers, in one transaction.
+        transitions is a list of (server id, previous status); unshelving renews the lease.
+        """
+        server_ids = [
+            pk
+            for pk, current_status in transitions
+            if "SHELVED" in target_status or "SHELVED" in current_status
+        ]
+        if not server_ids:
+            return
+        unshelved = {
+            pk for pk, current_status in transitions if "SHELVED" in current_status
+        }
+        with transaction.atomic():
+            for lease in ServerLease.objects.select_for_update().filter(
+                server_id__in=server_ids
             ):
-                raise drf_exceptions.PermissionDenied(
-                    f"Unshelving is disabled at {tenant.region.description}"
-                )
-            method_name = self.state_transitions[current_status][target_status]
-            methodcaller(method_name, server)(service)
+                lease.shelved = "SHELVED" in target_status
+                if str(lease.server_id) in unshelved:
+                    lease.renew_lease(user=user)  # saves
+                else:
+                    lease.save()
+
+    async def _state_transition(self, target_status, request, tenant, pk):
+        service = getattr(OpenstackService(tenant=tenant), self.service.value)
+        try:
+            server, current_status, method_name = await call_upstream(
+                self.call_state_transition, service, tenant, target_status, pk
+            )
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             if getattr(e, "code", None) == 404:
                 raise drf_exceptions.NotFound
             raise OpenstackException(detail=str(e))
 
-        if "SHELVED" in target_status or "SHELVED" in current_status:
-            # Update lease
-            lease = get_object_or_404(ServerLease, server_id=pk)
-            lease.shelved = "SHELVED" in target_status
-            lease.save()
-            if "SHELVED" in current_status:
-                # Renew lease on unshelve
-                lease.renew_lease(user=request.user)
+        await sync_to_orm(self.mirror.update)(
+            pk, status=self.optimistic_statuses[method_name]
+        )
+
+        # Servers without a lease yet are left to lease reconciliation
+        await sync_to_orm(self.update_leases)(
+            [(pk, current_status)], target_status, request.user
+        )
 
         # Slack notification
         slack_template = "openstack/slack/server_action.txt"
@@ -368,11 +887,10 @@ class InstanceDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
             "tenant": tenant,
             "user": request.user,
         }
-        slack_post_templated_message(slack_template, slack_context)
+        await sync_to_orm(slack_post_templated_message)(slack_template, slack_context)
 
-    def _assign_lease_teammember(
-        self, teammember_hashid, request, team_id, tenant_id, pk
-    ):
+    @staticmethod
+    def get_assignable_teammember(teammember_hashid, request, team_id):
         # Check request user is team admin
         try:
             TeamMember.objects.get(user=request.user, team_id=team_id, is_admin=True)
@@ -382,18 +900,28 @@ class InstanceDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
         # Check assigned user is team member
         try:
             teammember_id = hashids.decode(teammember_hashid)
-            teammember = TeamMember.objects.get(pk=teammember_id, team_id=team_id)
+            return TeamMember.objects.get(pk=teammember_id, team_id=team_id)
         except TeamMember.DoesNotExist:
             raise drf_exceptions.ValidationError(
                 "Not a member of the team to which this server belongs"
             )
 
-        # Update lease
-        lease = ServerLease.objects.get(server_id=pk)
+    async def _assign_lease_teammember(self, teammember_hashid, request, tenant, pk):
+        teammember = await sync_to_orm(self.get_assignable_teammember)(
+            teammember_hashid, request, tenant.team_id
+        )
+
+        # Update lease, created if missing
+        lease = await sync_to_orm(get_server_lease)(tenant, pk)
+        if not lease:
+            server = await call_upstream(get_server, tenant, pk)
+            lease = await sync_to_orm(create_server_lease)(
+                tenant, server, lambda: teammember
+            )
         lease.assigned_teammember = teammember
-        lease.save()
+        await sync_to_orm(lease.save)()
 
-    def patch(self, request, team_id, tenant_id, pk):
+    async def patch(self, request, team_id, tenant_id, pk):
         # Check for allowed updates
         target_status = request.data.get("status")
         lease_assigned_teammember = request.data.get("lease_assigned_teammember")
@@ -403,21 +931,133 @@ class InstanceDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
                 "Only 'status' and 'leaseAssignedTeammember' fields can be updated via PATCH."
             )
 
-        # State transition
-        if target_status:
-            self._state_transition(target_status, request, team_id, tenant_id, pk)
+        tenant = await self.get_tenant(request, team_id, tenant_id)
 
-        # Lease TeamMember assignment
+        # Lease TeamMember assignment, first, so nothing is changed if it isn't permitted
         if lease_assigned_teammember:
-            self._assign_lease_teammember(
-                lease_assigned_teammember, request, team_id, tenant_id, pk
+            await self._assign_lease_teammember(
+                lease_assigned_teammember, request, tenant, pk
             )
 
+        # State transition
+        if target_status:
+            await self._state_transition(target_status, request, tenant, pk)
+
         # Don't return detail representation, to avoid extra openstack api call
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FlavorListView(OpenstackListView):
+class InstanceBulkActionView(AsyncOpenstackAPIView):
+    """
+    Change the status of several instances at once (e.g. shelve a whole project).
+    Transitions are called concurrently (at most max_workers at once), sharing one session;
+    leases are updated in one transaction, and a single Slack notification is posted.
+    Responds with a result per server: the action called, or an error.
+    """
+
+    max_workers = getattr(settings, "OPENSTACK_BULK_ACTION_MAX_WORKERS", 5)
+
+    async def post(self, request, team_id, tenant_id):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+        serialized = InstanceBulkActionSerializer(data=request.data)
+        serialized.is_valid(raise_exception=True)
+        target_status = serialized.validated_data["status"]
+        server_ids = list(
+            dict.fromkeys(str(pk) for pk in serialized.validated_data["servers"])
+        )
+
+        openstack = OpenstackService(tenant=tenant)
+        transition = partial(
+            InstanceDetailView.call_state_transition,
+            openstack.servers,
+            tenant,
+            target_status,
+        )
+        outcomes = await gather_upstream(
+            [partial(transition, pk) for pk in server_ids], self.max_workers
+        )
+        return Response(
+            await sync_to_orm(self.record_outcomes)(
+                request, tenant, target_status, dict(zip(server_ids, outcomes))
+            )
+        )
+
+    @staticmethod
+    def record_outcomes(request, tenant, target_status, outcomes):
+        """
+        Update the mirror & leases, & notify Slack, for the outcome (transition or
+        exception) of each server's transition. Returns the results per server.
+        """
+        results = []
+        transitions = []
+        succeeded = []
+        for pk, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                detail = getattr(outcome, "detail", None)
+                if getattr(outcome, "code", None) == 404:
+                    error = "Not found."
+                elif isinstance(detail, list):  # ValidationError
+                    error = str(detail[0])
+                else:
+                    error = str(detail or outcome)
+                results.append({"id": pk, "action": None, "error": error})
+                continue
+            server, current_status, method_name = outcome
+            server_mirror.update(
+                pk, status=InstanceDetailView.optimistic_statuses[method_name]
+            )
+            transitions.append((pk, current_status))
+            succeeded.append({"name": server.name, "action": method_name})
+            results.append({"id": pk, "action": method_name, "error": None})
+
+        InstanceDetailView.update_leases(transitions, target_status, request.user)
+
+        if succeeded:
+            slack_template = "openstack/slack/server_bulk_action.txt"
+            slack_context = {
+                "servers": succeeded,
+                "failed_count": len(results) - len(succeeded),
+                "target_status": target_status,
+                "tenant": tenant,
+                "user": request.user,
+            }
+            slack_post_templated_message(slack_template, slack_context)
+
+        return results
+
+
+def get_catalog_data_for_tenant(items, tenant):
+    """
+    Add tenant & team to region catalog items.
+    """
+    return [{**item, "tenant": tenant.pk, "team": tenant.team_id} for item in items]
+
+
+class CatalogListView(AsyncOpenstackAPIView):
+    """
+    Base class for region catalog collection views (flavors, images, volume types).
+    Served from the region catalog cache; data age in seconds is given in the X-Catalog-Age header.
+    """
+
+    async def get(self, request, team_id, tenant_id):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+
+        catalog = RegionCatalog(tenant.region, OpenstackService(tenant=tenant))
+        try:
+            items, age = await call_upstream(catalog.get, self.service.value)
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            raise OpenstackException(detail=str(e))
+
+        data = get_catalog_data_for_tenant(items, tenant)
+        response = Response(self.serializer_class(data, many=True).data)
+        response["X-Catalog-Age"] = int(age)
+        add_never_cache_headers(response)
+        return response
+
+
+class FlavorListView(CatalogListView):
     """
     Flavor list view.
     """
@@ -426,7 +1066,7 @@ class FlavorListView(OpenstackListView):
     service = OpenstackService.Services.FLAVORS
 
 
-class ImageListView(OpenstackListView):
+class ImageListView(CatalogListView):
     """
     Image list view.
     """
@@ -435,7 +1075,7 @@ class ImageListView(OpenstackListView):
     service = OpenstackService.Services.IMAGES
 
 
-class KeyPairListView(generics.ListCreateAPIView):
+class KeyPairListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     SSH key pair list view.
     """
@@ -477,29 +1117,28 @@ def get_volume_transform_func(self, tenant):
         as_dict = obj.to_dict()
         as_dict["tenant"] = tenant.pk
         as_dict["team"] = tenant.team.pk
-        as_dict["name"] = (
-            obj.name.replace(tenant.created_tenant_name, "")
-            if obj.name
-            else str(obj.id)
-        )
+        as_dict["name"] = get_volume_display_name(obj, tenant)
         return as_dict
 
     return transform_func
 
 
-class VolumeDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
+class VolumeDetailView(
+    AsyncOpenstackWaitMixin, AsyncOpenstackDeleteMixin, AsyncOpenstackRetrieveView
+):
     """
     Volume detail view.
     """
 
+    resource_type = "volume"
+
     serializer_class = VolumeSerializer
     service = OpenstackService.Services.VOLUMES
+    mirror = volume_mirror
     get_transform_func = get_volume_transform_func
 
-    def patch(self, request, team_id, tenant_id, pk):
-        tenant = get_tenant_for_user(
-            request.user, team_id=team_id, tenant_id=tenant_id
-        )  # may raise
+    async def patch(self, request, team_id, tenant_id, pk):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
 
         openstack = OpenstackService(tenant=tenant)
         service = getattr(openstack, self.service.value)
@@ -507,13 +1146,22 @@ class VolumeDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
         try:
             if attachments is not None and len(attachments) == 0:
                 # Detach
-                methodcaller("detach", pk)(service)
+                await call_upstream(service.detach, pk)
+                await sync_to_orm(self.mirror.update)(
+                    pk, status="available", attachments=[]
+                )
             elif attachments:
                 # Create attachment
                 serialized_attachment = AttachmentSerializer(attachments[0])
-                methodcaller("attach", pk, serialized_attachment.data["server_id"])(
-                    service
+                server_id = serialized_attachment.data["server_id"]
+                await call_upstream(service.attach, pk, server_id)
+                await sync_to_orm(self.mirror.update)(
+                    pk,
+                    status="in-use",
+                    attachments=[{"id": pk, "volume_id": pk, "server_id": server_id}],
                 )
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             if getattr(e, "code", None) == 404:
                 raise drf_exceptions.NotFound
@@ -522,17 +1170,18 @@ class VolumeDetailView(OpenstackDeleteMixin, OpenstackRetrieveView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class VolumeListView(OpenstackCreateMixin, OpenstackListView):
+class VolumeListView(AsyncOpenstackCreateMixin, AsyncOpenstackListView):
     """
     Volume list view.
     """
 
     serializer_class = VolumeSerializer
     service = OpenstackService.Services.VOLUMES
+    mirror = volume_mirror
     get_transform_func = get_volume_transform_func
 
 
-class VolumeTypeListView(OpenstackListView):
+class VolumeTypeListView(CatalogListView):
     """
     Volume type list view.
     """
@@ -541,6 +1190,234 @@ class VolumeTypeListView(OpenstackListView):
     service = OpenstackService.Services.VOLUME_TYPES
 
 
+def call_and_close_db_connections(func):
+    """
+    Call func in a worker thread, closing any db connections opened by the thread.
+    """
+    try:
+        return func()
+    finally:
+        connections.close_all()
+
+
+class TenantSnapshotView(AsyncOpenstackAPIView):
+    """
+    Tenant snapshot view: instances, volumes, flavors, images & volume types in a single payload.
+    Upstream calls are made concurrently, sharing one session. Errors are reported per section.
+    Optionally limited to a comma separated list of ?sections=
+    In mirror read mode, instances & volumes are served from the local mirror where synced.
+    Otherwise instances are fetched incrementally, if OPENSTACK_MIRROR["INCREMENTAL"].
+    """
+
+    sections = {
+        "instances": InstanceSerializer,
+        "volumes": VolumeSerializer,
+        "flavors": FlavorSerializer,
+        "images": ImageSerializer,
+        "volume_types": VolumeTypeSerializer,
+    }
+
+    mirrors = {"instances": server_mirror, "volumes": volume_mirror}
+    incremental = MIRROR_SETTINGS.get("INCREMENTAL", False)
+
+    max_workers = getattr(settings, "OPENSTACK_SNAPSHOT_MAX_WORKERS", 5)
+
+    def get_requested_sections(self):
+        requested = self.request.query_params.get("sections")
+        if not requested:
+            return list(self.sections)
+        requested = [section.strip() for section in requested.split(",")]
+        unknown = set(requested) - set(self.sections)
+        if unknown:
+            raise drf_exceptions.ValidationError(
+                f"Unknown sections: {', '.join(sorted(unknown))}"
+            )
+        return requested
+
+    async def get(self, request, team_id, tenant_id):
+        tenant = await self.get_tenant(request, team_id, tenant_id)
+        sections = self.get_requested_sections()
+        data = {"errors": {}, "last_synced": {}}
+
+        # Mirrored sections
+        if read_from_mirror(request):
+            await sync_to_orm(self.read_mirrors)(tenant, sections, data)
+
+        openstack = OpenstackService(tenant=tenant)
+        catalog = RegionCatalog(tenant.region, openstack)
+        since = None
+        if self.incremental and "instances" in sections:
+            # High-water mark, if synced; the changes are merged below
+            since = await sync_to_orm(server_mirror.get_changes_since)(tenant)
+        fetchers = {
+            "instances": partial(server_mirror.fetch_changes, openstack, since)
+            if since
+            else openstack.servers.get_list,
+            "volumes": openstack.volumes.get_list,
+            "flavors": partial(catalog.get, "flavors"),
+            "images": partial(catalog.get, "images"),
+            "volume_types": partial(catalog.get, "volume_types"),
+        }
+
+        # Upstream calls in parallel
+        results = await gather_upstream(
+            [fetchers[section] for section in sections], self.max_workers
+        )
+
+        # Transform & serialize (transforms may query the db)
+        await sync_to_orm(self.serialize_sections)(
+            tenant, dict(zip(sections, results)), data, since
+        )
+        response = Response(data)
+        add_never_cache_headers(response)
+        return response
+
+    def read_mirrors(self, tenant, sections, data):
+        """Add mirrored sections to data, where synced, removing them from sections"""
+        for section, mirror in self.mirrors.items():
+            if section not in sections:
+                continue
+            items, last_synced = mirror.read(tenant)
+            if items is not None:
+                data[section] = self.sections[section](items, many=True).data
+                data["last_synced"][section] = last_synced
+                sections.remove(section)
+
+    def serialize_sections(self, tenant, results, data, since):
+        """
+        Add fetched sections (or their errors) to data. Instances fetched incrementally
+        (with `since` set) are merged with the mirrored servers.
+        """
+        transform_list_funcs = {
+            "instances": get_instance_list_transform_func(self, tenant),
+            "volumes": partial(map, get_volume_transform_func(self, tenant)),
+        }
+        for section, result in results.items():
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                if section == "instances" and since:
+                    items = server_mirror.read_changes(tenant, result)
+                elif section in transform_list_funcs:
+                    items = transform_list_funcs[section](result)
+                else:
+                    items = get_catalog_data_for_tenant(result[0], tenant)
+                data[section] = self.sections[section](items, many=True).data
+            except Exception as e:
+                data[section] = None
+                data["errors"][section] = str(e)
+
+
+def collect_tenant_resources(tenant):
+    """
+    A tenant's instances & volumes, rendered as for the API & keyed by id, for the tenant's
+    watch poller (see openstack.watch).
+    """
+    openstack = OpenstackService(tenant=tenant)
+    servers = get_instance_list_transform_func(None, tenant)(
+        openstack.servers.get_list()
+    )
+    volumes = map(get_volume_transform_func(None, tenant), openstack.volumes.get_list())
+    renderer = CamelCaseJSONRenderer()
+    return {
+        resource_type: {
+            obj["id"]: obj
+            for obj in json.loads(
+                renderer.render(serializer_class(objs, many=True).data)
+            )
+        }
+        for resource_type, serializer_class, objs in (
+            ("instance", InstanceSerializer, servers),
+            ("volume", VolumeSerializer, volumes),
+        )
+    }
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """
+    Event stream views return streaming responses; only errors are rendered, as JSON.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class EventStream:
+    """
+    Streaming content which closes its subscription when the response is closed, even if
+    it was never iterated (e.g., the client disconnected first).
+    """
+
+    def __init__(self, events, subscription):
+        self.events = events
+        self.subscription = subscription
+
+    def __iter__(self):
+        return self.events
+
+    def close(self):
+        self.events.close()
+        self.subscription.close()
+
+
+class TenantEventsView(APIView):
+    """
+    Server-Sent Events stream of changes to a tenant's instances & volumes, from a poller
+    shared by all subscribers to the tenant (see openstack.watch). The last snapshot is sent
+    on connect, then new, changed (status) & deleted resources as they are polled.
+    Streams end after OPENSTACK_WATCH["STREAM_SECONDS"], and EventSource reconnects.
+    Each open stream holds a (gthread) worker thread, so streams are limited to
+    OPENSTACK_WATCH["MAX_STREAMS"] per process, leaving threads for other requests; beyond
+    that, the response is 503 and the frontend falls back to long-polling.
+    """
+
+    renderer_classes = [EventStreamRenderer]
+
+    def get(self, request, team_id, tenant_id):
+        if not WATCH_SETTINGS.get("ENABLED", True):
+            raise drf_exceptions.NotFound
+        tenant = get_tenant_for_request(
+            request, team_id=team_id, tenant_id=tenant_id
+        )  # may raise
+        try:
+            subscription, snapshot = watch_registry.subscribe(
+                tenant, collect_tenant_resources
+            )
+        except StreamLimitReached:
+            raise ServiceUnavailable("Too many event streams, poll instead.")
+        response = StreamingHttpResponse(
+            EventStream(self.stream(subscription, snapshot), subscription),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Don't buffer in nginx
+        return response
+
+    @staticmethod
+    def format_event(message):
+        return f"data: {json.dumps(message)}\n\n"
+
+    def stream(self, subscription, snapshot):
+        yield f"retry: {WATCH_SETTINGS.get('RETRY_MILLISECONDS', 3000)}\n\n"
+        if snapshot:
+            for message in get_changes(None, snapshot):
+                yield self.format_event(message)
+        heartbeat = WATCH_SETTINGS.get("HEARTBEAT_SECONDS", 15)
+        deadline = time.monotonic() + WATCH_SETTINGS.get("STREAM_SECONDS", 55)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = subscription.get(timeout=min(remaining, heartbeat))
+            if message is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield self.format_event(message)
+
+
 class HypervisorStatsListView(generics.ListAPIView):
     """
     Hypervisor stats list view.
@@ -550,6 +1427,31 @@ class HypervisorStatsListView(generics.ListAPIView):
     queryset = HypervisorStats.objects.all()
 
 
+class ServiceStatsView(APIView):
+    """
+    Openstack keystone session, connection pool, call coalescing, watch & boot volume pool
+    statistics, with team membership cache statistics. Staff only.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    @method_decorator(never_cache)
+    def get(self, request):
+        return Response(
+            {
+                "sessions": session_pool.stats(),
+                "connections": connection_pools.stats(),
+                "coalescing": single_flight.stats(),
+                "watch": watch_registry.stats(),
+                "team_memberships": team_membership_cache.stats(),
+                "boot_volume_pools": {
+                    region.name: BootVolumePool(region).stats()
+                    for region in Region.objects.filter(disabled=False)
+                },
+            }
+        )
+
+
 class ServerLeaseRequestCreateView(generics.CreateAPIView):
     """
     ServerListRequest create view.
@@ -561,11 +1463,17 @@ class ServerLeaseRequestCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         """
-        Set server_lease id from instance_id lookup, user from request.
-        Send admin notification email.
+        Set server_lease id from instance_id lookup (creating the lease if missing),
+        user from request. Send admin notification email.
         """
-        server_lease = get_object_or_404(
-            ServerLease, server_id=self.request.resolver_match.kwargs["instance_id"]
+        kwargs = self.request.resolver_match.kwargs
+        tenant = get_tenant_for_request(
+            self.request, team_id=kwargs["team_id"], tenant_id=kwargs["tenant_id"]
+        )  # may raise
+        server_lease = get_or_create_server_lease(
+            tenant,
+            kwargs["instance_id"],
+            lambda: get_default_lease_teammember(tenant),
         )
         server_lease_request = serializer.save(
             server_lease=server_lease, user=self.request.user
@@ -0,0 +1,426 @@
+"""
+API throughput & latency benchmark (see the `benchmark_api` management command).
+
+A fleet of teams, members, tenants, servers & leases is seeded, with the servers held by
+a FakeCloud (openstack.fake); the main API endpoints are then driven concurrently through
+the full Django request path, recording latency, status & SQL query count per request.
+"""
+
+import contextlib
+import io
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from huey.contrib.djhuey import HUEY
+
+from userdb.models import Profile, Region, Team, TeamMember
+from .fake import FakeNova, use_fake_cloud
+from .models import RegionSettings, ServerLease, Tenant
+
+User = get_user_model()
+
+REGION_NAME = "benchmark"
+
+PERCENTILES = (50, 95, 99)
+
+
+class Fleet:
+    """Seeded benchmark data: teams, with their members, tenant & servers"""
+
+    def __init__(self, teams):
+        self.teams = (
+            teams  # [{"team": Team, "members": [TeamMember], "tenant": Tenant}]
+        )
+        self.servers = defaultdict(list)  # {tenant id: [server ids]}
+
+    def choose(self, rng):
+        """A random (team member, tenant, server id) target"""
+        entry = rng.choice(self.teams)
+        member = rng.choice(entry["members"])
+        tenant = entry["tenant"]
+        servers = self.servers[tenant.pk]
+        return member, tenant, rng.choice(servers) if servers else None
+
+
+def seed_fleet(teams=10, members=3, servers=5, fake_settings=None):
+    """
+    Seed `teams` teams, each with `members` members (the first an admin), a tenant at the
+    benchmark region & `servers` servers (in a new FakeCloud) with leases.
+    Signals are bypassed (bulk_create), so no emails are sent.
+    """
+    region, _created = Region.objects.get_or_create(
+        name=REGION_NAME, defaults={"description": "Benchmark"}
+    )
+    RegionSettings.objects.get_or_create(
+        region=region,
+        defaults={"public_network_name": "public", "public_network_id": "public"},
+    )
+    cloud = use_fake_cloud(
+        REGION_NAME,
+        **{**(fake_settings or {}), "SEED_SERVERS": servers},
+        PUBLIC_NETWORK_NAME="public",
+    )
+
+    team_objs = Team.objects.bulk_create(
+        Team(
+            name=f"benchmark-{n}",
+            position="Benchmark",
+            department="Benchmark",
+            institution="Benchmark",
+            phone_number="+441234567890",
+            research_interests="Benchmark",
+            verified=True,
+            tenants_available=True,
+        )
+        for n in range(teams)
+    )
+    if not all(
+        team.pk for team in team_objs
+    ):  # bulk_create doesn't set pks on all backends
+        team_objs = list(
+            Team.objects.filter(name__startswith="benchmark-").order_by("pk")
+        )
+
+    users = User.objects.bulk_create(
+        User(username=f"benchmark-{t}-{m}", email=f"benchmark-{t}-{m}@example.com")
+        for t in range(teams)
+        for m in range(members)
+    )
+    if not all(user.pk for user in users):
+        users = list(
+            User.objects.filter(username__startswith="benchmark-").order_by("pk")
+        )
+    Profile.objects.bulk_create(
+        Profile(user=user, email_validated=True) for user in users
+    )
+    TeamMember.objects.bulk_create(
+        TeamMember(team=team, user=users[t * members + m], is_admin=m == 0)
+        for t, team in enumerate(team_objs)
+        for m in range(members)
+    )
+    Tenant.objects.bulk_create(
+        Tenant(
+            team=team,
+            region=region,
+            created_tenant_id=f"benchmark-{team.pk}",
+            created_tenant_name=f"bryn:benchmark-{team.pk}",
+        )
+        for team in team_objs
+    )
+
+    memberships = defaultdict(list)
+    for member in TeamMember.objects.filter(team__in=team_objs).order_by("pk"):
+        memberships[member.team_id].append(member)
+    tenants = Tenant.objects.filter(region=region).select_related("team", "region")
+    fleet = Fleet(
+        [
+            {
+                "team": tenant.team,
+                "members": memberships[tenant.team_id],
+                "tenant": tenant,
+            }
+            for tenant in tenants
+        ]
+    )
+
+    leases = []
+    for entry in fleet.teams:
+        tenant = entry["tenant"]
+        for server in cloud.client(FakeNova, tenant.created_tenant_id).servers.list():
+            fleet.servers[tenant.pk].append(server.id)
+            leases.append(
+                ServerLease(
+                    server_id=server.id,
+                    server_name=server.name,
+                    tenant=tenant,
+                    assigned_teammember=entry["members"][0],
+                )
+            )
+    ServerLease.objects.bulk_create(leases)
+    return fleet
+
+
+def team_list(member, tenant, server_id):
+    return "get", reverse("api:teams"), None
+
+
+def tenant_list(member, tenant, server_id):
+    return "get", reverse("api:tenants", kwargs={"team_id": tenant.team_id}), None
+
+
+def tenant_kwargs(tenant, **kwargs):
+    return {"team_id": tenant.team_id, "tenant_id": tenant.pk, **kwargs}
+
+
+def instance_list(member, tenant, server_id, source="live"):
+    url = reverse("api:instances", kwargs=tenant_kwargs(tenant))
+    return "get", url, {"source": source}
+
+
+def instance_detail(member, tenant, server_id):
+    url = reverse("api:instances", kwargs=tenant_kwargs(tenant, pk=server_id))
+    return "get", url, None
+
+
+def volume_list(member, tenant, server_id, source="live"):
+    url = reverse("api:volumes", kwargs=tenant_kwargs(tenant))
+    return "get", url, {"source": source}
+
+
+def instance_patch(member, tenant, server_id):
+    """Reboot (ACTIVE -> ACTIVE), so every request is a valid transition"""
+    url = reverse("api:instances", kwargs=tenant_kwargs(tenant, pk=server_id))
+    return "patch", url, {"status": "ACTIVE"}
+
+
+def lease_renewal(member, tenant, server_id):
+    renewal_count = (
+        ServerLease.objects.filter(server_id=server_id)
+        .values_list("renewal_count", flat=True)
+        .first()
+    )
+    url = reverse(
+        "openstack:server_lease_renewal",
+        kwargs={"server_id": server_id, "renewal_count": renewal_count or 0},
+    )
+    return "post", url, None
+
+
+# Endpoints, with their relative weights in the request mix
+ENDPOINTS = {
+    "team_list": (team_list, 2),
+    "tenant_list": (tenant_list, 2),
+    "instance_list": (instance_list, 4),
+    "instance_detail": (instance_detail, 3),
+    "volume_list": (volume_list, 2),
+    "instance_patch": (instance_patch, 1),
+    "lease_renewal": (lease_renewal, 1),
+}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Recorder:
+    """Thread-safe collection of per-request results"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, endpoint, latency, queries, status_code):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            self.queries[endpoint].append(queries)
+            self.statuses[endpoint][status_code] += 1
+
+    def summary(self, elapsed):
+        """Stats per endpoint; errors are all non-2xx responses"""
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": sum(
+                    n for code, n in statuses.items() if not 200 <= code < 300
+                ),
+                "throughput": len(latencies) / elapsed,
+                **{f"p{p}_ms": percentile(latencies, p) * 1000 for p in PERCENTILES},
+                "mean_queries": sum(self.queries[endpoint]) / len(latencies),
+                "statuses": {str(code): n for code, n in sorted(statuses.items())},
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "requests": total,
+            "errors": sum(stats["errors"] for stats in endpoints.values()),
+            "elapsed_seconds": elapsed,
+            "throughput": total / elapsed if elapsed else None,
+            "endpoints": endpoints,
+        }
+
+
+def run_benchmark(
+    fleet, requests=1000, concurrency=8, endpoints=None, source="live", seed=None
+):
+    """
+    Make `requests` requests to a weighted mix of `endpoints` (default: all), from
+    `concurrency` threads, each logged in as a random member of a random team.
+    With concurrency=1, requests are made in the calling thread.
+    Returns a summary dict (see Recorder.summary).
+    """
+    endpoints = endpoints or list(ENDPOINTS)
+    weights = [ENDPOINTS[name][1] for name in endpoints]
+    recorder = Recorder()
+    counter = iter(range(requests))
+    counter_lock = threading.Lock()
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        clients = {}  # One logged in client per user
+        try:
+            while True:
+                with counter_lock:
+                    if next(counter, None) is None:
+                        return
+                name = rng.choices(endpoints, weights)[0]
+                member, tenant, server_id = fleet.choose(rng)
+                if name in ("instance_patch", "lease_renewal"):
+                    member = fleet_admin(fleet, tenant)
+                if member.user_id not in clients:
+                    clients[member.user_id] = Client()
+                    clients[member.user_id].force_login(member.user)
+                client = clients[member.user_id]
+
+                func = ENDPOINTS[name][0]
+                if name in ("instance_list", "volume_list"):
+                    method, url, data = func(member, tenant, server_id, source=source)
+                else:
+                    method, url, data = func(member, tenant, server_id)
+                kwargs = (
+                    {"content_type": "application/json"} if method == "patch" else {}
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(url, data, **kwargs)
+                    latency = time.perf_counter() - start
+                recorder.record(name, latency, len(queries), response.status_code)
+        finally:
+            if concurrency > 1:
+                connections.close_all()
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker(rng.random())
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [
+                executor.submit(worker, rng.random()) for _n in range(concurrency)
+            ]:
+                future.result()
+    return recorder.summary(time.perf_counter() - start)
+
+
+def fleet_admin(fleet, tenant):
+    for entry in fleet.teams:
+        if entry["tenant"].pk == tenant.pk:
+            return entry["members"][0]
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Compare results to a baseline (both from run_benchmark). Returns a list of
+    (endpoint, metric, baseline value, current value, regressed) tuples: latency
+    percentiles & overall throughput regress beyond `tolerance` (a proportion); mean SQL
+    queries regress if up by more than half a query, error rates if up by more than 1%.
+    """
+    rows = []
+    for endpoint, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if not previous:
+            continue
+        for p in PERCENTILES:
+            metric = f"p{p}_ms"
+            rows.append(
+                (
+                    endpoint,
+                    metric,
+                    previous[metric],
+                    current[metric],
+                    current[metric] > previous[metric] * (1 + tolerance),
+                )
+            )
+        rows.append(
+            (
+                endpoint,
+                "error_rate",
+                previous["errors"] / previous["requests"],
+                current["errors"] / current["requests"],
+                current["errors"] / current["requests"]
+                > previous["errors"] / previous["requests"] + 0.01,
+            )
+        )
+        rows.append(
+            (
+                endpoint,
+                "mean_queries",
+                previous["mean_queries"],
+                current["mean_queries"],
+                current["mean_queries"] > previous["mean_queries"] + 0.5,
+            )
+        )
+    if baseline.get("throughput") and results["throughput"]:
+        rows.append(
+            (
+                "all",
+                "throughput",
+                baseline["throughput"],
+                results["throughput"],
+                results["throughput"] < baseline["throughput"] * (1 - tolerance),
+            )
+        )
+    return rows
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    """
+    Run against a throwaway database (created as for the test runner), so benchmark data
+    never reaches the real one. For sqlite a temporary file is used, so threads share it.
+    """
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    original_test_name = test_settings.get("NAME")
+    tmpdir = None
+    if connection.vendor == "sqlite" and not original_test_name:
+        tmpdir = tempfile.TemporaryDirectory()
+        test_settings["NAME"] = os.path.join(tmpdir.name, "benchmark.sqlite3")
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings["NAME"] = original_test_name
+        if tmpdir:
+            tmpdir.cleanup()
+
+
+@contextlib.contextmanager
+def benchmark_environment():
+    """
+    As for the test runner: the test client's host is allowed & emails go to a local
+    outbox. Tasks run inline, as with DEBUG, rather than being queued for the consumer;
+    Slack messages printed to the console (Slack disabled) are dropped.
+    """
+    setup_test_environment()
+    immediate = HUEY.immediate
+    HUEY.immediate = True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        HUEY.immediate = immediate
+        teardown_test_environment()
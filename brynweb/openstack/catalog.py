@@ -0,0 +1,165 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SETTINGS = getattr(settings, "OPENSTACK_CATALOG_CACHE", {})
+TTL = CATALOG_SETTINGS.get("TTL_SECONDS", 3600)
+STALE_TTL = CATALOG_SETTINGS.get("STALE_TTL_SECONDS", 86400)
+PRIVATE_TTL = CATALOG_SETTINGS.get("PRIVATE_TTL_SECONDS", 300)
+
+
+def flavor_to_dict(flavor):
+    return {
+        "id": flavor.id,
+        "name": flavor.name,
+        "ram": flavor.ram,
+        "vcpus": flavor.vcpus,
+    }
+
+
+def is_public_flavor(flavor):
+    return getattr(flavor, "is_public", True)
+
+
+def image_to_dict(image):
+    return {"id": image.id, "name": image.name}
+
+
+def volume_type_to_dict(volume_type):
+    return {
+        "id": volume_type.id,
+        "name": volume_type.name,
+        "is_default": getattr(volume_type, "is_default", False),
+    }
+
+
+class RegionCatalog:
+    """
+    Cache of slow-changing region catalog data: flavors, images & volume types.
+
+    Entries are fresh for TTL seconds. For a further STALE_TTL seconds, stale entries are served
+    while a background (huey) task refreshes them. Beyond that, entries are refreshed synchronously.
+    Only public flavors & images are cached region-wide, since entries are shared by all tenants
+    in the region. With a tenant's OpenstackService, the tenant's private (& shared) flavors and
+    images are fetched with its own session, cached per tenant for PRIVATE_TTL seconds, and
+    included; private flavors only where the tenant's project has flavor access.
+    """
+
+    SECTIONS = ("flavors", "images", "volume_types")
+    PRIVATE_SECTIONS = ("flavors", "images")  # Sections with per-project items
+
+    def __init__(self, region, openstack=None):
+        self.region = region
+        self.openstack = openstack  # OpenstackService, required to fetch
+
+    @property
+    def tenant(self):
+        return getattr(self.openstack, "tenant", None)
+
+    def _key(self, section, tenant=None):
+        key = f"openstack:catalog:{self.region.pk}:{section}"
+        return f"{key}:tenant:{tenant.pk}" if tenant else key
+
+    def get(self, section):
+        """
+        Return a tuple of (items, age in seconds) for a catalog section.
+        The age is that of the region-wide (public) entry.
+        """
+        entry = cache.get(self._key(section))
+        if entry is None:
+            entry = self.refresh(section)
+        age = time.time() - entry["fetched_at"]
+        if age > TTL:
+            self._refresh_in_background(section)
+        items = entry["items"]
+        if self.tenant and section in self.PRIVATE_SECTIONS:
+            items = items + self.get_private(section)
+        return items, age
+
+    def get_private(self, section):
+        """Return the tenant's private (& shared) items for a catalog section"""
+        key = self._key(section, self.tenant)
+        items = cache.get(key)
+        if items is None:
+            items = self._fetch_private(section)
+            cache.set(key, items, timeout=PRIVATE_TTL)
+        return items
+
+    def default_volume_type(self):
+        """Return the id of the region default volume type"""
+        volume_types, _age = self.get("volume_types")
+        for volume_type in volume_types:
+            if volume_type["is_default"]:
+                return volume_type["id"]
+        return None
+
+    def refresh(self, section=None):
+        """
+        Fetch & cache one (or all) catalog sections. Returns the (last) cache entry.
+        """
+        for section in [section] if section else self.SECTIONS:
+            entry = {"fetched_at": time.time(), "items": self._fetch(section)}
+            cache.set(self._key(section), entry, timeout=TTL + STALE_TTL)
+            cache.delete(f"{self._key(section)}:refreshing")
+            logger.info(f"Refreshed {section} catalog for {self.region.name}")
+        return entry
+
+    def invalidate(self):
+        """Invalidate region-wide entries; per-tenant entries expire after PRIVATE_TTL"""
+        cache.delete_many([self._key(section) for section in self.SECTIONS])
+
+    def _fetch(self, section):
+        if section == "flavors":
+            return [
+                flavor_to_dict(flavor)
+                for flavor in self.openstack.flavors.get_list()
+                if is_public_flavor(flavor)
+            ]
+        if section == "images":
+            return [
+                image_to_dict(image)
+                for image in self.openstack.images.get_list(
+                    filters={"visibility": "public"}
+                )
+            ]
+        if section == "volume_types":
+            return [
+                volume_type_to_dict(volume_type)
+                for volume_type in self.openstack.volume_types.get_list()
+            ]
+        raise ValueError(f"Unknown catalog section '{section}'")
+
+    def _fetch_private(self, section):
+        if section == "flavors":
+            # The service user has the admin role, so sees every project's private flavors
+            project_id = self.tenant.created_tenant_id
+            return [
+                flavor_to_dict(flavor)
+                for flavor in self.openstack.flavors.get_list(is_public=None)
+                if not is_public_flavor(flavor)
+                and self._has_flavor_access(flavor, project_id)
+            ]
+        if section == "images":
+            return [
+                image_to_dict(image)
+                for image in self.openstack.images.get_list()
+                if getattr(image, "visibility", "public") != "public"
+            ]
+        raise ValueError(f"No private items for catalog section '{section}'")
+
+    def _has_flavor_access(self, flavor, project_id):
+        return any(
+            access.tenant_id == project_id
+            for access in self.openstack.flavors.get_access_list(flavor)
+        )
+
+    def _refresh_in_background(self, section):
+        """Enqueue a refresh, unless one is already pending"""
+        from .tasks import refresh_region_catalog  # avoid circular import
+
+        if cache.add(f"{self._key(section)}:refreshing", True, timeout=60):
+            refresh_region_catalog(self.region.pk, section)
@@ -0,0 +1,135 @@
+import copy
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+COALESCING_SETTINGS = getattr(settings, "OPENSTACK_COALESCING", {})
+
+
+def clone(obj):
+    """
+    Shallow copy of an openstack resource, so callers sharing a result can't see each other's
+    changes (e.g. transforms set attributes). copy.copy recurses in novaclient's lazy-loading
+    __getattr__, so instance dicts are copied directly.
+    """
+    if not hasattr(obj, "__dict__"):
+        return copy.copy(obj)
+    cloned = object.__new__(type(obj))
+    cloned.__dict__.update(obj.__dict__)
+    return cloned
+
+
+def clone_result(result):
+    if isinstance(result, list):
+        return [clone(obj) for obj in result]
+    return clone(result)
+
+
+class InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Thread-safe, process-wide coalescing of identical concurrent calls.
+
+    The first caller for a key makes the call, and concurrent callers with the same key wait for
+    it & share its result (or exception). Results may be reused for `result_ttl` seconds after
+    the call completes; by default only in-flight calls are shared.
+    Each caller is given its own shallow copy of the result.
+    """
+
+    def __init__(self, result_ttl=0, enabled=True):
+        self.result_ttl = result_ttl
+        self.enabled = enabled
+        self._in_flight = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "coalesced": 0, "cached": 0}
+
+    def call(self, key, func, *args, **kwargs):
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        with self._lock:
+            cached = self._results.get(key)
+            if cached and cached[0] > time.monotonic():
+                self._counts["cached"] += 1
+                return clone_result(cached[1])
+            in_flight = self._in_flight.get(key)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = self._in_flight[key] = InFlightCall()
+                self._counts["calls"] += 1
+            else:
+                self._counts["coalesced"] += 1
+
+        if is_leader:
+            try:
+                in_flight.result = func(*args, **kwargs)
+            except Exception as e:
+                in_flight.error = e
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                    if self.result_ttl and in_flight.error is None:
+                        self._evict_expired()
+                        self._results[key] = (
+                            time.monotonic() + self.result_ttl,
+                            in_flight.result,
+                        )
+                in_flight.done.set()
+        else:
+            in_flight.done.wait()
+
+        if in_flight.error is not None:
+            raise in_flight.error
+        return clone_result(in_flight.result)
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [
+            key for key, (expires, _) in self._results.items() if expires <= now
+        ]:
+            del self._results[key]
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        requested = sum(counts.values())
+        shared = counts["coalesced"] + counts["cached"]
+        return {
+            **counts,
+            "coalescing_rate": shared / requested if requested else None,
+        }
+
+
+single_flight = SingleFlight(
+    result_ttl=COALESCING_SETTINGS.get("RESULT_TTL_SECONDS", 0),
+    enabled=COALESCING_SETTINGS.get("ENABLED", True),
+)
+
+
+def coalesced(method):
+    """
+    Decorator for OpenstackService sub-service methods: identical concurrent calls for the same
+    region & project share one upstream call (see SingleFlight).
+    """
+
+    @wraps(method)
+    def wrapper(self, *args):
+        openstack = self.openstack
+        project_id = openstack.tenant.created_tenant_id if openstack.tenant else None
+        key = (openstack.region.name, project_id, method.__qualname__, args)
+        return single_flight.call(key, method, self, *args)
+
+    return wrapper
@@ -0,0 +1,116 @@
+import socket
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SETTINGS = getattr(settings, "OPENSTACK_CONNECTION_POOL", {})
+
+DEFAULTS = {
+    "POOL_CONNECTIONS": 10,  # Number of hosts (endpoints) to keep pools for
+    "POOL_MAXSIZE": 20,  # Maximum connections kept per host
+    "MAX_RETRIES": 2,  # Retries on connection errors only; requests are never re-sent
+    "KEEPALIVE_IDLE_SECONDS": 60,  # TCP keep-alive; None to disable
+}
+
+
+def get_region_pool_settings(region_name):
+    """Pool settings for a region: defaults, overridden by global & per-region settings"""
+    region_overrides = POOL_SETTINGS.get("REGIONS", {}).get(region_name, {})
+    return {
+        key: region_overrides.get(key, POOL_SETTINGS.get(key, default))
+        for key, default in DEFAULTS.items()
+    }
+
+
+class RegionHTTPAdapter(HTTPAdapter):
+    """
+    Requests adapter with configurable connection pool size, connection retries & TCP keep-alive.
+    """
+
+    def __init__(self, keepalive_idle=60, **kwargs):
+        self.keepalive_idle = keepalive_idle
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        # Keep Nagle's algorithm off (requests default)
+        socket_options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+        if self.keepalive_idle:
+            socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                socket_options.append(
+                    (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keepalive_idle)
+                )
+            if hasattr(socket, "TCP_KEEPINTVL"):
+                socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 15))
+            if hasattr(socket, "TCP_KEEPCNT"):
+                socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 4))
+        kwargs["socket_options"] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def stats(self):
+        """Per-host connection pool statistics"""
+        pools = self.poolmanager.pools
+        stats = {}
+        for key in pools.keys():
+            pool = pools[key]
+            queue = list(pool.pool.queue) if pool.pool else []  # None = free slot
+            stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle_connections": sum(1 for conn in queue if conn),
+                "maxsize": pool.pool.maxsize if pool.pool else 0,
+            }
+        return stats
+
+
+class RegionConnectionPools:
+    """
+    Thread-safe registry of requests sessions, one per region.
+    Shared by all keystone sessions (& so all clients) for that region, so connections are reused.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._adapters = {}
+        self._lock = threading.Lock()
+
+    def get(self, region_name):
+        with self._lock:
+            if region_name not in self._sessions:
+                self._sessions[region_name] = self._build_session(region_name)
+            return self._sessions[region_name]
+
+    def _build_session(self, region_name):
+        pool_settings = get_region_pool_settings(region_name)
+        retries = Retry(
+            total=pool_settings["MAX_RETRIES"],
+            connect=pool_settings["MAX_RETRIES"],
+            read=0,
+            redirect=0,
+            status=0,
+            backoff_factor=0.2,
+        )
+        adapter = RegionHTTPAdapter(
+            keepalive_idle=pool_settings["KEEPALIVE_IDLE_SECONDS"],
+            pool_connections=pool_settings["POOL_CONNECTIONS"],
+            pool_maxsize=pool_settings["POOL_MAXSIZE"],
+            max_retries=retries,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self._adapters[region_name] = adapter
+        return session
+
+    def stats(self):
+        with self._lock:
+            return {
+                region_name: adapter.stats()
+                for region_name, adapter in self._adapters.items()
+            }
+
+
+connection_pools = RegionConnectionPools()
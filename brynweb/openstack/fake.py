@@ -0,0 +1,743 @@
+import copy
+import datetime
+import random
+import threading
+import time
+import uuid
+from functools import wraps
+
+from cinderclient import exceptions as cinder_exceptions
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from novaclient import exceptions as nova_exceptions
+
+FAKE_SETTINGS = getattr(settings, "OPENSTACK_FAKE_BACKEND", {})
+
+DEFAULTS = {
+    "LATENCY_SECONDS": 0.05,  # Per call
+    "LATENCY_JITTER_SECONDS": 0.02,  # Latency is uniformly distributed, +/- jitter
+    "ERROR_RATE": 0.0,  # Proportion of calls failing with ERROR_STATUS
+    "ERROR_STATUS": 503,
+    "BUILD_SECONDS": 0,  # Time for new servers & volumes to become active/available
+    "PUBLIC_NETWORK_NAME": "public",  # Should match RegionSettings.public_network_name
+    "SEED_SERVERS": 0,  # Servers (& boot volumes) created in each new project
+    "CALLS": {},  # Per call overrides, e.g. {"nova.servers.list": {"LATENCY_SECONDS": 1}}
+}
+
+FLAVORS = [
+    ("climb.user", 2, 4096),
+    ("climb.group", 8, 32768),
+    ("climb.large", 16, 65536),
+]
+IMAGES = ["Ubuntu 20.04", "CentOS 8", "GVL 4.4"]
+VOLUME_TYPES = ["standard", "ssd"]
+
+
+def get_region_fake_settings(region_name):
+    """Fake backend settings for a region: defaults, overridden by global & per-region settings"""
+    region_overrides = FAKE_SETTINGS.get("REGIONS", {}).get(region_name, {})
+    return {
+        key: region_overrides.get(key, FAKE_SETTINGS.get(key, default))
+        for key, default in DEFAULTS.items()
+    }
+
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def timestamp(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeError(Exception):
+    """An injected (or simulated) upstream error"""
+
+    def __init__(self, message, code=503):
+        super().__init__(message)
+        self.code = code
+        self.http_status = code
+
+
+def fake_call(func):
+    """Manager method decorator: simulate latency & inject errors, per call settings"""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self.cloud.simulate(f"{self.call_prefix}.{func.__name__}")
+        return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class FakeResource:
+    """A snapshot of a resource, as returned by the openstack clients"""
+
+    def __init__(self, manager, info):
+        self.manager = manager
+        self._info = copy.deepcopy(info)
+        self.__dict__.update(self._info)
+
+    def to_dict(self):
+        return copy.deepcopy(self._info)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self._info.get('id')}>"
+
+
+class FakeServer(FakeResource):
+    def delete(self):
+        return self.manager.delete(self.id)
+
+    def reboot(self, reboot_type="SOFT"):
+        self.manager.action(self.id, "reboot")
+
+    def stop(self):
+        self.manager.action(self.id, "stop")
+
+    def start(self):
+        self.manager.action(self.id, "start")
+
+    def shelve(self):
+        self.manager.action(self.id, "shelve")
+
+    def unshelve(self):
+        self.manager.action(self.id, "unshelve")
+
+
+class FakeVolume(FakeResource):
+    def delete(self):
+        return self.manager.delete(self.id)
+
+
+class FakeKeypair(FakeResource):
+    def delete(self):
+        return self.manager.delete(self.name)
+
+
+class FakeManager:
+    resource_class = FakeResource
+
+    def __init__(self, client, name):
+        self.client = client
+        self.cloud = client.cloud
+        self.project_id = client.project_id
+        self.call_prefix = f"{client.name}.{name}"
+
+    def wrap(self, info):
+        return self.resource_class(self, info)
+
+
+def paginate(items, marker=None, limit=None):
+    """Marker/limit pagination, as nova & cinder"""
+    if marker:
+        ids = [item["id"] for item in items]
+        items = items[ids.index(marker) + 1 :] if marker in ids else []
+    return items[:limit] if limit else items
+
+
+class FakeServerManager(FakeManager):
+    resource_class = FakeServer
+
+    # Target status for each action
+    ACTIONS = {
+        "reboot": "ACTIVE",
+        "stop": "SHUTOFF",
+        "start": "ACTIVE",
+        "shelve": "SHELVED_OFFLOADED",
+        "unshelve": "ACTIVE",
+    }
+
+    def _get(self, server_id):
+        server = self.cloud.servers.get(server_id)
+        if (
+            not server
+            or server["status"] == "DELETED"
+            or server["tenant_id"] != self.project_id
+        ):
+            raise nova_exceptions.NotFound(404, f"Server {server_id} not found")
+        return server
+
+    @fake_call
+    def get(self, server_id):
+        with self.cloud.lock:
+            return self.wrap(self.cloud.refresh(self._get(server_id)))
+
+    @fake_call
+    def list(self, detailed=True, search_opts=None, marker=None, limit=None):
+        search_opts = search_opts or {}
+        since = search_opts.get("changes-since")
+        with self.cloud.lock:
+            servers = [
+                self.cloud.refresh(server)
+                for server in self.cloud.servers.values()
+                if search_opts.get("all_tenants")
+                or server["tenant_id"] == self.project_id
+            ]
+        if since:
+            since = parse_datetime(since)
+            servers = [
+                server
+                for server in servers
+                if parse_datetime(server["updated"]) >= since
+            ]
+        else:
+            servers = [server for server in servers if server["status"] != "DELETED"]
+        servers.sort(key=lambda server: server["created"], reverse=True)
+        return [self.wrap(server) for server in paginate(servers, marker, limit)]
+
+    @fake_call
+    def create(self, name, image, flavor=None, nics=None, key_name=None, **kwargs):
+        bdm = kwargs.get("block_device_mapping_v2") or []
+        with self.cloud.lock:
+            server = self.cloud.create_server(
+                self.project_id,
+                name,
+                flavor,
+                key_name=key_name,
+                volume_ids=[mapping["uuid"] for mapping in bdm],
+            )
+            return self.wrap(server)
+
+    @fake_call
+    def delete(self, server_id):
+        with self.cloud.lock:
+            server = self._get(server_id)
+            self.cloud.delete_server(server)
+
+    @fake_call
+    def action(self, server_id, action):
+        with self.cloud.lock:
+            server = self.cloud.refresh(self._get(server_id))
+            self.cloud.touch(server, status=self.ACTIONS[action])
+
+
+class FakeFlavorManager(FakeManager):
+    @fake_call
+    def list(self, is_public=True):
+        return [self.wrap(flavor) for flavor in self.cloud.flavors]
+
+
+class FakeKeypairManager(FakeManager):
+    resource_class = FakeKeypair
+
+    @fake_call
+    def get(self, name):
+        with self.cloud.lock:
+            keypair = self.cloud.keypairs.get((self.project_id, name))
+        if not keypair:
+            raise nova_exceptions.NotFound(404, f"Keypair {name} not found")
+        return self.wrap(keypair)
+
+    @fake_call
+    def list(self):
+        with self.cloud.lock:
+            keypairs = [
+                keypair
+                for (project_id, _name), keypair in self.cloud.keypairs.items()
+                if project_id == self.project_id
+            ]
+        return [self.wrap(keypair) for keypair in keypairs]
+
+    @fake_call
+    def create(self, name, public_key=None):
+        keypair = {"id": name, "name": name, "public_key": public_key}
+        with self.cloud.lock:
+            self.cloud.keypairs[(self.project_id, name)] = keypair
+        return self.wrap(keypair)
+
+    @fake_call
+    def delete(self, name):
+        with self.cloud.lock:
+            self.cloud.keypairs.pop((self.project_id, name), None)
+
+
+class FakeServerVolumeManager(FakeManager):
+    @fake_call
+    def create_server_volume(self, server_id, volume_id, device=None):
+        with self.cloud.lock:
+            volume = self.cloud.volumes[volume_id]
+            attachment = {
+                "id": volume_id,
+                "attachment_id": str(uuid.uuid4()),
+                "volume_id": volume_id,
+                "server_id": server_id,
+                "device": device or "/dev/vdb",
+                "attached_at": timestamp(now()),
+            }
+            self.cloud.touch(volume, status="in-use", attachments=[attachment])
+            return self.wrap(attachment)
+
+    @fake_call
+    def delete_server_volume(self, server_id, volume_id):
+        with self.cloud.lock:
+            volume = self.cloud.volumes[volume_id]
+            self.cloud.touch(volume, status="available", attachments=[])
+
+
+class FakeHypervisorManager(FakeManager):
+    @fake_call
+    def statistics(self):
+        with self.cloud.lock:
+            return self.wrap(self.cloud.hypervisor_statistics())
+
+
+class FakeQuotaManager(FakeManager):
+    @fake_call
+    def update(self, project_id, **quotas):
+        with self.cloud.lock:
+            self.cloud.quotas.setdefault(project_id, {}).update(quotas)
+
+
+class FakeVolumeManager(FakeManager):
+    resource_class = FakeVolume
+
+    def _get(self, volume_id):
+        volume = self.cloud.volumes.get(volume_id)
+        if not volume or volume["os-vol-tenant-attr:tenant_id"] != self.project_id:
+            raise cinder_exceptions.NotFound(404, f"Volume {volume_id} not found")
+        return volume
+
+    @fake_call
+    def get(self, volume_id):
+        with self.cloud.lock:
+            return self.wrap(self.cloud.refresh(self._get(volume_id)))
+
+    @fake_call
+    def list(self, search_opts=None, marker=None, limit=None):
+        search_opts = search_opts or {}
+        with self.cloud.lock:
+            volumes = [
+                self.cloud.refresh(volume)
+                for volume in self.cloud.volumes.values()
+                if search_opts.get("all_tenants")
+                or volume["os-vol-tenant-attr:tenant_id"] == self.project_id
+            ]
+        volumes.sort(key=lambda volume: volume["created_at"], reverse=True)
+        return [self.wrap(volume) for volume in paginate(volumes, marker, limit)]
+
+    @fake_call
+    def create(self, size, name=None, imageRef=None, volume_type=None, **kwargs):
+        with self.cloud.lock:
+            return self.wrap(
+                self.cloud.create_volume(
+                    self.project_id, size, name, imageRef, volume_type
+                )
+            )
+
+    @fake_call
+    def set_bootable(self, volume, flag):
+        with self.cloud.lock:
+            self.cloud.touch(self._get(volume.id), bootable=str(flag).lower())
+
+    @fake_call
+    def update(self, volume_id, **fields):
+        with self.cloud.lock:
+            self.cloud.touch(self._get(volume_id), **fields)
+
+    @fake_call
+    def delete(self, volume_id):
+        with self.cloud.lock:
+            self.cloud.volumes.pop(self._get(volume_id)["id"])
+
+
+class FakeVolumeTypeManager(FakeManager):
+    @fake_call
+    def list(self, is_public=True):
+        return [self.wrap(volume_type) for volume_type in self.cloud.volume_types]
+
+    @fake_call
+    def default(self):
+        return self.wrap(self.cloud.volume_types[0])
+
+
+class FakeTransferManager(FakeManager):
+    @fake_call
+    def create(self, volume_id, name=None):
+        transfer = {
+            "id": str(uuid.uuid4()),
+            "auth_key": uuid.uuid4().hex,
+            "volume_id": volume_id,
+            "name": name,
+        }
+        with self.cloud.lock:
+            self.cloud.transfers[transfer["id"]] = transfer
+        return self.wrap(transfer)
+
+    @fake_call
+    def accept(self, transfer_id, auth_key):
+        with self.cloud.lock:
+            transfer = self.cloud.transfers.pop(transfer_id)
+            if transfer["auth_key"] != auth_key:
+                raise FakeError("Invalid auth key", code=400)
+            volume = self.cloud.volumes[transfer["volume_id"]]
+            self.cloud.touch(
+                volume, **{"os-vol-tenant-attr:tenant_id": self.project_id}
+            )
+            return self.wrap(transfer)
+
+    @fake_call
+    def delete(self, transfer_id):
+        with self.cloud.lock:
+            if not self.cloud.transfers.pop(transfer_id, None):
+                raise cinder_exceptions.NotFound(
+                    404, f"Transfer {transfer_id} not found"
+                )
+
+
+class FakeImageManager(FakeManager):
+    @fake_call
+    def list(self, filters=None):
+        return [self.wrap(image) for image in self.cloud.images]
+
+
+class FakeProjectManager(FakeManager):
+    @fake_call
+    def create(self, name, domain, enabled=True, **kwargs):
+        with self.cloud.lock:
+            return self.wrap(self.cloud.add_project(uuid.uuid4().hex, name))
+
+    @fake_call
+    def list(self, **kwargs):
+        with self.cloud.lock:
+            return [self.wrap(project) for project in self.cloud.projects.values()]
+
+
+class FakeUserManager(FakeManager):
+    @fake_call
+    def list(self, name="", **kwargs):
+        return [
+            self.wrap({"id": uuid.uuid5(uuid.NAMESPACE_DNS, name).hex, "name": name})
+        ]
+
+
+class FakeRoleManager(FakeManager):
+    @fake_call
+    def list(self, name="", **kwargs):
+        return [
+            self.wrap({"id": uuid.uuid5(uuid.NAMESPACE_DNS, name).hex, "name": name})
+        ]
+
+    @fake_call
+    def grant(self, role, user=None, project=None, **kwargs):
+        pass
+
+
+class FakeClient:
+    """A fake openstack client (nova, cinder, glance or keystone) for a project"""
+
+    managers = {}
+
+    def __init__(self, cloud, project_id):
+        self.cloud = cloud
+        self.project_id = project_id
+        for attr, manager_class in self.managers.items():
+            setattr(self, attr, manager_class(self, attr))
+
+
+class FakeNova(FakeClient):
+    name = "nova"
+    managers = {
+        "servers": FakeServerManager,
+        "flavors": FakeFlavorManager,
+        "keypairs": FakeKeypairManager,
+        "volumes": FakeServerVolumeManager,
+        "hypervisors": FakeHypervisorManager,
+        "quotas": FakeQuotaManager,
+    }
+
+
+class FakeCinder(FakeClient):
+    name = "cinder"
+    managers = {
+        "volumes": FakeVolumeManager,
+        "volume_types": FakeVolumeTypeManager,
+        "transfers": FakeTransferManager,
+        "quotas": FakeQuotaManager,
+    }
+
+
+class FakeGlance(FakeClient):
+    name = "glance"
+    managers = {"images": FakeImageManager}
+
+
+class FakeKeystone(FakeClient):
+    name = "keystone"
+    managers = {
+        "projects": FakeProjectManager,
+        "users": FakeUserManager,
+        "roles": FakeRoleManager,
+    }
+
+
+class FakeNeutron(FakeClient):
+    """Neutron's client is not manager based; only the calls used by Bryn are faked"""
+
+    name = "neutron"
+    call_prefix = "neutron"
+
+    def list_security_groups(self, name=None, **kwargs):
+        self.cloud.simulate("neutron.list_security_groups")
+        group_id = uuid.uuid5(uuid.NAMESPACE_DNS, f"{self.project_id}:{name}")
+        return {"security_groups": [{"id": str(group_id), "name": name}]}
+
+    def create_security_group_rule(self, body):
+        self.cloud.simulate("neutron.create_security_group_rule")
+        return {"security_group_rule": {"id": str(uuid.uuid4()), **body}}
+
+
+class FakeCloud:
+    """
+    Stateful, in-process fake of an openstack region, shared by all OpenstackServices
+    for the region (in this process). Every call sleeps for the configured latency, and
+    fails with a FakeError at the configured error rate.
+    """
+
+    ADMIN_PROJECT_ID = "admin"
+
+    def __init__(self, region_name, fake_settings=None):
+        self.region_name = region_name
+        self.settings = fake_settings or get_region_fake_settings(region_name)
+        self.lock = threading.RLock()
+        self.random = random.Random()
+        self.calls = 0
+        self.errors = 0
+        self.auth_settings = {
+            "SERVICE_USERNAME": "bryn-service",
+            "ADMIN_USERNAME": "bryn-admin",
+            "TENANT_NAME": self.ADMIN_PROJECT_ID,
+        }
+        self.projects = {}
+        self.servers = {}
+        self.volumes = {}
+        self.builds = {}  # {resource id: (ready time, ready status)}
+        self.server_volumes = {}  # {server id: [boot volume ids]}
+        self.addresses = 0
+        self.keypairs = {}
+        self.transfers = {}
+        self.quotas = {}
+        self.flavors = [
+            {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{region_name}:{name}")),
+                "name": name,
+                "vcpus": vcpus,
+                "ram": ram,
+            }
+            for name, vcpus, ram in FLAVORS
+        ]
+        self.images = [
+            {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{region_name}:{name}")),
+                "name": name,
+                "visibility": "public",
+            }
+            for name in IMAGES
+        ]
+        self.volume_types = [
+            {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{region_name}:{name}")),
+                "name": name,
+            }
+            for name in VOLUME_TYPES
+        ]
+
+    def client(self, client_class, project_id=None):
+        """A fake client (e.g. FakeNova) for a project; the admin project by default"""
+        project_id = project_id or self.ADMIN_PROJECT_ID
+        with self.lock:
+            if project_id not in self.projects:
+                self.add_project(project_id, seed=project_id != self.ADMIN_PROJECT_ID)
+        return client_class(self, project_id)
+
+    def get_call_settings(self, call):
+        return {**self.settings, **self.settings["CALLS"].get(call, {})}
+
+    def simulate(self, call):
+        """Sleep for the call's latency; raise a FakeError at the call's error rate"""
+        call_settings = self.get_call_settings(call)
+        latency = call_settings["LATENCY_SECONDS"]
+        jitter = call_settings["LATENCY_JITTER_SECONDS"]
+        with self.lock:
+            self.calls += 1
+            delay = max(0, self.random.uniform(latency - jitter, latency + jitter))
+            failed = self.random.random() < call_settings["ERROR_RATE"]
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise FakeError(
+                f"Injected error for {call} at {self.region_name}",
+                code=call_settings["ERROR_STATUS"],
+            )
+
+    # State changes; callers hold the lock
+
+    def add_project(self, project_id, name=None, seed=True):
+        """Register a project, seeded with SEED_SERVERS servers"""
+        self.projects[project_id] = {"id": project_id, "name": name or project_id}
+        if seed:
+            self.seed_project(project_id)
+        return self.projects[project_id]
+
+    def touch(self, resource, **fields):
+        resource.update(fields)
+        key = "updated" if "updated" in resource else "updated_at"
+        resource[key] = timestamp(now())
+
+    def refresh(self, resource):
+        """Complete the resource's build, if it has finished"""
+        build = self.builds.get(resource["id"])
+        if build and time.time() >= build[0]:
+            del self.builds[resource["id"]]
+            self.touch(resource, status=build[1])
+        return resource
+
+    def start_build(self, resource, building, ready):
+        """Set the resource status; `ready` after BUILD_SECONDS"""
+        if self.settings["BUILD_SECONDS"]:
+            resource["status"] = building
+            self.builds[resource["id"]] = (
+                time.time() + self.settings["BUILD_SECONDS"],
+                ready,
+            )
+        else:
+            resource["status"] = ready
+
+    def next_ip(self):
+        self.addresses += 1
+        n = self.addresses
+        return f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"
+
+    def create_volume(self, project_id, size, name, image_id=None, volume_type=None):
+        created = timestamp(now())
+        volume = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "size": size,
+            "bootable": "false",
+            "volume_type": volume_type or self.volume_types[0]["name"],
+            "attachments": [],
+            "created_at": created,
+            "updated_at": created,
+            "os-vol-tenant-attr:tenant_id": project_id,
+            "volume_image_metadata": {"image_id": image_id} if image_id else {},
+        }
+        self.start_build(volume, "creating", "available")
+        self.volumes[volume["id"]] = volume
+        return volume
+
+    def create_server(self, project_id, name, flavor_id, key_name=None, volume_ids=()):
+        created = timestamp(now())
+        server = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "tenant_id": project_id,
+            "flavor": {"id": str(flavor_id)},
+            "key_name": key_name,
+            "addresses": {
+                self.settings["PUBLIC_NETWORK_NAME"]: [{"addr": self.next_ip()}]
+            },
+            "created": created,
+            "updated": created,
+        }
+        self.start_build(server, "BUILD", "ACTIVE")
+        self.servers[server["id"]] = server
+        self.server_volumes[server["id"]] = list(volume_ids)
+        for volume_id in volume_ids:
+            attachment = {"server_id": server["id"], "volume_id": volume_id}
+            self.touch(
+                self.volumes[volume_id], status="in-use", attachments=[attachment]
+            )
+        return server
+
+    def delete_server(self, server):
+        """Servers are kept, with status DELETED, for changes-since listings"""
+        for volume_id in self.server_volumes.pop(server["id"], []):
+            self.volumes.pop(volume_id, None)  # delete_on_termination
+        self.builds.pop(server["id"], None)
+        self.touch(server, status="DELETED")
+
+    def seed_project(self, project_id, servers=None):
+        """Create servers, each with a boot volume, in a project"""
+        count = self.settings["SEED_SERVERS"] if servers is None else servers
+        for n in range(count):
+            volume = self.create_volume(
+                project_id, 120, f"bryn:seed_{n}_boot_volume", self.images[0]["id"]
+            )
+            volume["bootable"] = "true"
+            flavor = self.flavors[n % len(self.flavors)]
+            self.create_server(
+                project_id, f"seed-{n}", flavor["id"], volume_ids=[volume["id"]]
+            )
+
+    def hypervisor_statistics(self):
+        flavors = {flavor["id"]: flavor for flavor in self.flavors}
+        running = [
+            flavors.get(s["flavor"]["id"], self.flavors[0])
+            for s in self.servers.values()
+            if s["status"] == "ACTIVE"
+        ]
+        vcpus_used = sum(flavor["vcpus"] for flavor in running)
+        memory_mb_used = sum(flavor["ram"] for flavor in running)
+        count = 10
+        return {
+            "count": count,
+            "vcpus": count * 64,
+            "vcpus_used": vcpus_used,
+            "memory_mb": count * 512 * 1024,
+            "memory_mb_used": memory_mb_used,
+            "free_ram_mb": count * 512 * 1024 - memory_mb_used,
+            "local_gb": count * 2000,
+            "local_gb_used": 0,
+            "free_disk_gb": count * 2000,
+            "disk_available_least": count * 2000,
+            "running_vms": len(running),
+        }
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "projects": len(self.projects),
+                "servers": sum(
+                    1 for s in self.servers.values() if s["status"] != "DELETED"
+                ),
+                "volumes": len(self.volumes),
+            }
+
+
+_clouds = {}
+_clouds_lock = threading.Lock()
+
+
+def get_fake_cloud(region_name):
+    """
+    The FakeCloud for a region, or None if the region is not faked
+    (listed in OPENSTACK_FAKE_BACKEND["REGIONS"], or set up with `use_fake_cloud`).
+    """
+    with _clouds_lock:
+        if region_name not in _clouds:
+            if region_name not in FAKE_SETTINGS.get("REGIONS", {}):
+                return None
+            _clouds[region_name] = FakeCloud(region_name)
+        return _clouds[region_name]
+
+
+def use_fake_cloud(region_name, **overrides):
+    """
+    Serve a region from a new FakeCloud (in this process), regardless of settings,
+    e.g. for benchmarks. `overrides` take precedence over the region's fake settings.
+    """
+    fake_settings = {**get_region_fake_settings(region_name), **overrides}
+    with _clouds_lock:
+        _clouds[region_name] = FakeCloud(region_name, fake_settings)
+        return _clouds[region_name]
+
+
+def reset_fake_clouds():
+    """Discard all fake state"""
+    with _clouds_lock:
+        _clouds.clear()
@@ -0,0 +1,121 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import Tenant
+from .service import OpenstackService
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = getattr(settings, "OPENSTACK_INVENTORY_PAGE_SIZE", 500)
+
+
+def get_server_project_id(server):
+    return getattr(server, "tenant_id", None)
+
+
+def get_volume_project_id(volume):
+    return getattr(volume, "os-vol-tenant-attr:tenant_id", None)
+
+
+def list_all_pages(list_func, page_size=PAGE_SIZE, **kwargs):
+    """
+    Yield every resource from a paginated novaclient/cinderclient list function,
+    following markers until an empty page is returned. A short page isn't taken as the last,
+    since the server caps pages at its own limit (osapi_max_limit), which may be below page_size.
+    """
+    marker = None
+    while True:
+        page = list_func(marker=marker, limit=page_size, **kwargs)
+        if not page:
+            return
+        yield from page
+        marker = page[-1].id
+
+
+class Inventory:
+    """
+    Servers & volumes for a region, partitioned by project (Tenant.created_tenant_id).
+    Resources in projects without a Bryn tenant are held under `unmatched`.
+    """
+
+    def __init__(self, region, tenants, servers, volumes):
+        self.region = region
+        self.tenants = {tenant.created_tenant_id: tenant for tenant in tenants}
+        self.servers, self.unmatched_servers = self._partition(
+            servers, get_server_project_id
+        )
+        self.volumes, self.unmatched_volumes = self._partition(
+            volumes, get_volume_project_id
+        )
+
+    def _partition(self, resources, get_project_id):
+        partitioned = defaultdict(list)
+        unmatched = []
+        for resource in resources:
+            project_id = get_project_id(resource)
+            if project_id in self.tenants:
+                partitioned[project_id].append(resource)
+            else:
+                unmatched.append(resource)
+        return partitioned, unmatched
+
+    def servers_for_tenant(self, tenant):
+        return self.servers.get(tenant.created_tenant_id, [])
+
+    def volumes_for_tenant(self, tenant):
+        return self.volumes.get(tenant.created_tenant_id, [])
+
+    def summary(self):
+        return {
+            "tenants": len(self.tenants),
+            "servers": sum(len(servers) for servers in self.servers.values()),
+            "volumes": sum(len(volumes) for volumes in self.volumes.values()),
+            "unmatched_servers": len(self.unmatched_servers),
+            "unmatched_volumes": len(self.unmatched_volumes),
+        }
+
+
+class RegionInventory:
+    """
+    Region-wide inventory of servers & volumes, listed with the admin service (all_tenants).
+    One paginated upstream listing per resource type per region, rather than one per tenant.
+    """
+
+    def __init__(self, region, openstack=None, page_size=PAGE_SIZE):
+        self.region = region
+        self.openstack = openstack or OpenstackService(region=region)
+        self.page_size = page_size
+
+    def list_servers(self):
+        return list_all_pages(
+            self.openstack.nova.servers.list,
+            page_size=self.page_size,
+            detailed=True,
+            search_opts={"all_tenants": True},
+        )
+
+    def list_volumes(self):
+        return list_all_pages(
+            self.openstack.cinder.volumes.list,
+            page_size=self.page_size,
+            detailed=True,
+            search_opts={"all_tenants": True},
+        )
+
+    def get_tenants(self):
+        return Tenant.objects.filter(region=self.region).select_related("team")
+
+    def collect(self, servers=True, volumes=True):
+        """Return an Inventory for the region"""
+        inventory = Inventory(
+            self.region,
+            self.get_tenants(),
+            self.list_servers() if servers else [],
+            self.list_volumes() if volumes else [],
+        )
+        logger.info(
+            f"Collected inventory for {self.region.name}: {inventory.summary()}"
+        )
+        return inventory
@@ -0,0 +1,92 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from userdb.models import TeamMember
+from .inventory import RegionInventory
+from .mirror import DELETED_SERVER_STATUSES
+from .models import ServerLease
+
+logger = logging.getLogger(__name__)
+
+RECONCILIATION_SETTINGS = getattr(settings, "OPENSTACK_LEASE_RECONCILIATION", {})
+
+
+def get_default_lease_teammember(tenant):
+    """Team member assigned leases for servers not created through Bryn: an admin, if any"""
+    return (
+        TeamMember.objects.filter(team=tenant.team_id)
+        .order_by("-is_admin", "pk")
+        .first()
+    )
+
+
+@transaction.atomic
+def reconcile_tenant_leases(tenant, servers, listed_at):
+    """
+    Reconcile a tenant's leases with its servers, as listed by nova at `listed_at`:
+    create missing leases, mark leases for vanished servers deleted & sync shelved state.
+    Leases created since the listing are left alone.
+    """
+    servers = [
+        server for server in servers if server.status not in DELETED_SERVER_STATUSES
+    ]
+    leases = {
+        str(lease.server_id): lease
+        for lease in ServerLease.objects.filter(
+            server_id__in=[server.id for server in servers]
+        )
+    }
+
+    # Shelved state
+    shelved = []
+    for server in servers:
+        lease = leases.get(server.id)
+        is_shelved = "SHELVED" in server.status
+        if lease and lease.shelved != is_shelved:
+            lease.shelved = is_shelved
+            shelved.append(lease)
+    ServerLease.objects.bulk_update(shelved, ["shelved"])
+
+    # Missing leases (servers not created through Bryn)
+    missing = [server for server in servers if server.id not in leases]
+    created = 0
+    if missing:
+        teammember = get_default_lease_teammember(tenant)
+        if teammember:
+            ServerLease.objects.for_servers(tenant, missing, lambda: teammember)
+            created = len(missing)
+        else:
+            logger.warning(
+                f"No team member to assign {len(missing)} leases at {tenant}"
+            )
+
+    # Vanished servers
+    deleted = (
+        ServerLease.objects.filter(
+            tenant=tenant, deleted=False, created_at__lt=listed_at
+        )
+        .exclude(server_id__in=[server.id for server in servers])
+        .update(deleted=True)
+    )
+
+    return {"created": created, "deleted": deleted, "shelved": len(shelved)}
+
+
+def reconcile_region_leases(region, inventory=None):
+    """
+    Reconcile leases for every tenant in a region, from a region-wide server listing.
+    """
+    listed_at = timezone.now()
+    inventory = inventory or RegionInventory(region).collect(volumes=False)
+    totals = {"created": 0, "deleted": 0, "shelved": 0}
+    for tenant in inventory.tenants.values():
+        counts = reconcile_tenant_leases(
+            tenant, inventory.servers_for_tenant(tenant), listed_at
+        )
+        for key, count in counts.items():
+            totals[key] += count
+    logger.info(f"Reconciled server leases for {region.name}: {totals}")
+    return totals
@@ -0,0 +1,151 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from openstack.benchmark import (
+    ENDPOINTS,
+    benchmark_database,
+    benchmark_environment,
+    compare_to_baseline,
+    run_benchmark,
+    seed_fleet,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark API throughput & latency against a fake openstack backend, "
+        "in a throwaway database. Reports p50/p95/p99 latency, throughput & SQL query "
+        "counts per endpoint, optionally compared against a saved JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teams", type=int, default=20)
+        parser.add_argument("--members", type=int, default=3, help="Per team")
+        parser.add_argument("--servers", type=int, default=10, help="Per tenant")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Simulated openstack latency per call (seconds)",
+        )
+        parser.add_argument(
+            "--endpoints",
+            nargs="+",
+            choices=list(ENDPOINTS),
+            help="Endpoints to include (default: all)",
+        )
+        parser.add_argument(
+            "--source",
+            choices=["live", "mirror"],
+            default="live",
+            help="Source for instance & volume listings",
+        )
+        parser.add_argument("--seed", type=int, help="Random seed for the request mix")
+        parser.add_argument("--baseline", help="Baseline JSON file to compare against")
+        parser.add_argument("--save-baseline", help="Save results to this JSON file")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed latency/throughput regression against the baseline",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit non-zero if any metric regresses against the baseline",
+        )
+
+    def handle(self, *args, **options):
+        if getattr(settings, "SLACK_ENABLED", False):
+            raise CommandError(
+                "Refusing to benchmark with SLACK_ENABLED (server actions post to Slack)."
+            )
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        fake_settings = {"LATENCY_SECONDS": options["latency"]}
+        if not options["latency"]:
+            fake_settings["LATENCY_JITTER_SECONDS"] = 0
+
+        with benchmark_database(), benchmark_environment():
+            fleet = seed_fleet(
+                teams=options["teams"],
+                members=options["members"],
+                servers=options["servers"],
+                fake_settings=fake_settings,
+            )
+            results = run_benchmark(
+                fleet,
+                requests=options["requests"],
+                concurrency=options["concurrency"],
+                endpoints=options["endpoints"],
+                source=options["source"],
+                seed=options["seed"],
+            )
+
+        results["options"] = {
+            key: options[key]
+            for key in (
+                "teams",
+                "members",
+                "servers",
+                "requests",
+                "concurrency",
+                "latency",
+                "source",
+            )
+        }
+        self.report(results)
+        if results["errors"]:
+            # Latencies of failed requests aren't comparable, so neither are the results
+            raise CommandError(
+                f"{results['errors']} request(s) failed (non-2xx); results are invalid"
+            )
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Saved baseline to {options['save_baseline']}")
+
+        if baseline:
+            regressed = self.report_comparison(
+                compare_to_baseline(results, baseline, options["tolerance"])
+            )
+            if regressed and options["fail_on_regression"]:
+                raise CommandError(f"{regressed} metric(s) regressed against baseline")
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'endpoint':<18}{'reqs':>7}{'errs':>6}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'queries':>9}{'req/s':>9}"
+        )
+        for endpoint, r in results["endpoints"].items():
+            self.stdout.write(
+                f"{endpoint:<18}{r['requests']:>7}{r['errors']:>6}{r['p50_ms']:>9.1f}"
+                f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['mean_queries']:>9.1f}"
+                f"{r['throughput']:>9.1f}"
+            )
+        self.stdout.write(
+            f"Total: {results['requests']} requests in {results['elapsed_seconds']:.1f}s "
+            f"({results['throughput']:.1f} req/s)"
+        )
+
+    def report_comparison(self, rows):
+        """Write baseline comparison; returns the number of regressed metrics"""
+        regressed = 0
+        self.stdout.write("\nAgainst baseline:")
+        for endpoint, metric, previous, current, is_regression in rows:
+            line = f"{endpoint:<18}{metric:<14}{previous:>10.1f} -> {current:>10.1f}"
+            if is_regression:
+                regressed += 1
+                self.stdout.write(self.style.ERROR(f"{line}  REGRESSED"))
+            else:
+                self.stdout.write(line)
+        return regressed
@@ -0,0 +1,99 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    multiprocess,
+)
+
+LABELS = ["region", "service", "method"]
+
+# Seconds; server creation (waiting on the boot volume) takes minutes
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, float("inf"))
+
+
+class CallMetrics:
+    """
+    Latency histogram, error counter & in-progress gauge for a type of openstack call,
+    labelled by region, service & method.
+    """
+
+    def __init__(self, name, description):
+        self.duration = Histogram(
+            f"{name}_duration_seconds",
+            f"{description} duration",
+            LABELS,
+            buckets=BUCKETS,
+        )
+        self.errors = Counter(f"{name}_errors", f"{description} errors", LABELS)
+        self.in_progress = Gauge(
+            f"{name}_in_progress",
+            f"{description}s in progress",
+            LABELS,
+            multiprocess_mode="livesum",
+        )
+
+    @contextmanager
+    def track(self, region, service, method):
+        """Time a call; exceptions are counted as errors"""
+        in_progress = self.in_progress.labels(region, service, method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors.labels(region, service, method).inc()
+            raise
+        finally:
+            self.duration.labels(region, service, method).observe(
+                time.perf_counter() - start
+            )
+            in_progress.dec()
+
+
+# OpenstackService sub-service methods, e.g. ("servers", "get_list")
+service_calls = CallMetrics("bryn_openstack_call", "Openstack service call")
+
+# Upstream API requests, by keystone service type & HTTP method, e.g. ("compute", "GET")
+api_requests = CallMetrics("bryn_openstack_api_request", "Openstack API request")
+
+
+def instrumented(service):
+    """
+    Class decorator for OpenstackService sub-services: public methods are tracked by
+    `service_calls`, with the region of the sub-service's OpenstackService.
+    """
+
+    def wrap(method_name, func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with service_calls.track(self.openstack.region.name, service, method_name):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    def decorate(cls):
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith("_") and callable(attr):
+                setattr(cls, name, wrap(name, attr))
+        return cls
+
+    return decorate
+
+
+def get_registry():
+    """
+    The registry to expose. Where the prometheus_multiproc_dir environment variable is set
+    (gunicorn workers & the huey consumer), metrics are aggregated across processes.
+    """
+    if "prometheus_multiproc_dir" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
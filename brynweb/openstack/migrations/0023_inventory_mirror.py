@@ -0,0 +1,88 @@
+# Generated by Django 3.1.1 on 2026-10-18 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("openstack", "0022_auto_20210517_1836"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantMirrorState",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("servers_synced_at", models.DateTimeField(blank=True, null=True)),
+                ("volumes_synced_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mirror_state",
+                        to="openstack.tenant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CachedVolume",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("size", models.PositiveIntegerField()),
+                ("status", models.CharField(max_length=20)),
+                ("bootable", models.BooleanField(default=False)),
+                ("volume_type", models.CharField(blank=True, max_length=255)),
+                ("attachments", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(blank=True, null=True)),
+                ("last_synced", models.DateTimeField()),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cached_volumes",
+                        to="openstack.tenant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CachedServer",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("flavor", models.CharField(blank=True, max_length=50)),
+                ("status", models.CharField(max_length=20)),
+                ("ip", models.GenericIPAddressField(blank=True, null=True)),
+                ("created", models.DateTimeField(blank=True, null=True)),
+                ("updated", models.DateTimeField(blank=True, null=True)),
+                ("last_synced", models.DateTimeField()),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cached_servers",
+                        to="openstack.tenant",
+                    ),
+                ),
+            ],
+        ),
+    ]
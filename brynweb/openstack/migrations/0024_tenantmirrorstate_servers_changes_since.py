@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("openstack", "0023_inventory_mirror"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenantmirrorstate",
+            name="servers_changes_since",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.1.1 on 2026-10-18 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userdb", "0024_auto_20210406_1525"),
+        ("openstack", "0025_servercreationjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="servercreationjob",
+            name="pooled_volume",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="PooledBootVolume",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("volume_id", models.UUIDField(editable=False, unique=True)),
+                ("image_id", models.CharField(max_length=50)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("BUILDING", "Building"),
+                            ("READY", "Ready"),
+                            ("CLAIMED", "Claimed"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="BUILDING",
+                        max_length=10,
+                    ),
+                ),
+                ("requested_at", models.DateTimeField(auto_now_add=True)),
+                ("ready_at", models.DateTimeField(blank=True, null=True)),
+                ("claimed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "region",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pooled_boot_volumes",
+                        to="userdb.region",
+                    ),
+                ),
+            ],
+        ),
+    ]
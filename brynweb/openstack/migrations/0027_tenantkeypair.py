@@ -0,0 +1,48 @@
+# Generated by Django 3.1.1 on 2026-10-18 12:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("openstack", "0026_pooledbootvolume"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantKeyPair",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "keypair",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tenant_index",
+                        to="openstack.keypair",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="keypair_index",
+                        to="openstack.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("tenant", "keypair")},
+            },
+        ),
+    ]
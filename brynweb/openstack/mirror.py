@@ -0,0 +1,351 @@
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .inventory import RegionInventory
+from .models import (
+    CachedServer,
+    CachedVolume,
+    ServerLease,
+    TenantMirrorState,
+)
+
+logger = logging.getLogger(__name__)
+
+MIRROR_SETTINGS = getattr(settings, "OPENSTACK_MIRROR", {})
+
+DELETED_SERVER_STATUSES = ("DELETED", "SOFT_DELETED")
+
+# Allowance for clock skew, where there is no nova timestamp for an initial high-water mark
+CLOCK_SKEW_SECONDS = MIRROR_SETTINGS.get("CLOCK_SKEW_SECONDS", 60)
+
+
+def parse_openstack_datetime(value):
+    """Parse an openstack timestamp (naive timestamps are UTC)"""
+    if not value:
+        return None
+    if not isinstance(value, datetime.datetime):
+        value = parse_datetime(value)
+    if value and timezone.is_naive(value):
+        value = timezone.make_aware(value, datetime.timezone.utc)
+    return value
+
+
+def get_server_ip(server, public_netname):
+    addresses = getattr(server, "addresses", None) or {}
+    if public_netname in addresses:
+        return addresses[public_netname][0]["addr"]
+    return None
+
+
+def get_volume_display_name(volume, tenant):
+    return (
+        volume.name.replace(tenant.created_tenant_name, "")
+        if volume.name
+        else str(volume.id)
+    )
+
+
+def get_high_water_mark(servers, since, started):
+    """
+    The latest 'updated' time reported by nova for servers (so unaffected by clock skew),
+    or the previous mark (else started, less CLOCK_SKEW_SECONDS) if there are none.
+    """
+    updated = [
+        parse_openstack_datetime(getattr(server, "updated", None)) for server in servers
+    ]
+    return max(
+        filter(None, updated),
+        default=since or started - datetime.timedelta(seconds=CLOCK_SKEW_SECONDS),
+    )
+
+
+def read_from_mirror(request):
+    """
+    Should list requests be served from the mirror?
+    Set by OPENSTACK_MIRROR["READ"]; overridden per request with ?source=mirror|live
+    """
+    source = request.query_params.get("source")
+    if source:
+        return source == "mirror"
+    return MIRROR_SETTINGS.get("READ", False)
+
+
+class Mirror:
+    """
+    Local mirror of one type of openstack resource, held in `model`.
+
+    Rows are replaced by periodic syncs (`sync_tenant`), and updated optimistically by write
+    actions (`record`, `update` & `remove`). Rows written after a sync began are left untouched
+    by that sync, so optimistic updates aren't lost to a listing which predates them.
+    """
+
+    model = None
+    synced_at_field = None  # TenantMirrorState field
+    fields = ()
+    ordering = ()
+
+    def get_fields(self, obj, tenant):
+        """Mirrored field values for an openstack resource"""
+        raise NotImplementedError
+
+    def to_dict(self, cached, tenant):
+        """Serializer data for a mirrored row"""
+        return {
+            "id": cached.id,
+            "tenant": tenant.pk,
+            "team": tenant.team_id,
+            **{field: getattr(cached, field) for field in self.fields},
+        }
+
+    def read(self, tenant):
+        """
+        Return a tuple of (list of serializer data, last synced time) for a tenant.
+        Returns (None, None) if the tenant has not yet been synced.
+        """
+        state = TenantMirrorState.objects.filter(tenant=tenant).first()
+        synced_at = getattr(state, self.synced_at_field, None)
+        if synced_at is None:
+            return None, None
+        rows = self.model.objects.filter(tenant=tenant).order_by(*self.ordering)
+        return [self.to_dict(cached, tenant) for cached in rows], synced_at
+
+    @transaction.atomic
+    def sync_tenant(self, tenant, resources, synced_at):
+        """
+        Replace the mirrored resources for a tenant, with those listed at `synced_at`.
+        """
+        incoming = {str(obj.id): self.get_fields(obj, tenant) for obj in resources}
+        existing = {
+            str(cached.id): cached
+            for cached in self.model.objects.select_for_update().filter(tenant=tenant)
+        }
+        now = timezone.now()
+
+        created, updated, removed = [], [], []
+        for pk, cached in existing.items():
+            if cached.last_synced > synced_at:
+                continue  # written since the listing
+            if pk in incoming:
+                for field, value in incoming[pk].items():
+                    setattr(cached, field, value)
+                cached.last_synced = now
+                updated.append(cached)
+            else:
+                removed.append(pk)
+        for pk, fields in incoming.items():
+            if pk not in existing:
+                created.append(
+                    self.model(id=pk, tenant=tenant, last_synced=now, **fields)
+                )
+
+        self.model.objects.bulk_create(created)
+        self.model.objects.bulk_update(updated, [*self.fields, "last_synced"])
+        self.model.objects.filter(pk__in=removed).delete()
+        TenantMirrorState.objects.update_or_create(
+            tenant=tenant, defaults={self.synced_at_field: synced_at}
+        )
+        return {
+            "created": len(created),
+            "updated": len(updated),
+            "removed": len(removed),
+        }
+
+    def record(self, tenant, obj):
+        """Mirror a single resource, e.g. following create (not reads, which may be concurrent)"""
+        self.model.objects.update_or_create(
+            id=obj.id,
+            defaults={
+                "tenant": tenant,
+                "last_synced": timezone.now(),
+                **self.get_fields(obj, tenant),
+            },
+        )
+
+    def update(self, pk, **fields):
+        """Optimistically update a mirrored resource, following a write action"""
+        self.model.objects.filter(pk=pk).update(last_synced=timezone.now(), **fields)
+
+    def remove(self, pk):
+        self.model.objects.filter(pk=pk).delete()
+
+
+class ServerMirror(Mirror):
+    model = CachedServer
+    synced_at_field = "servers_synced_at"
+    fields = ("name", "flavor", "status", "ip", "created", "updated")
+    ordering = ("-created",)
+
+    def get_fields(self, server, tenant):
+        flavor = getattr(server, "flavor", None) or {}
+        return {
+            "name": server.name,
+            "flavor": flavor["id"] if isinstance(flavor, dict) else flavor,
+            "status": server.status,
+            "ip": get_server_ip(
+                server, tenant.region.regionsettings.public_network_name
+            ),
+            "created": parse_openstack_datetime(getattr(server, "created", None)),
+            "updated": parse_openstack_datetime(getattr(server, "updated", None)),
+        }
+
+    @transaction.atomic
+    def sync_tenant(self, tenant, resources, synced_at):
+        """
+        As Mirror.sync_tenant, also setting the high-water mark for incremental listings.
+        """
+        resources = list(resources)
+        counts = super().sync_tenant(tenant, resources, synced_at)
+        TenantMirrorState.objects.filter(tenant=tenant).update(
+            servers_changes_since=get_high_water_mark(resources, None, synced_at)
+        )
+        return counts
+
+    def get_changes_since(self, tenant):
+        """The tenant's high-water mark for incremental syncs; None if a full sync is required"""
+        return (
+            TenantMirrorState.objects.filter(tenant=tenant)
+            .values_list("servers_changes_since", flat=True)
+            .first()
+        )
+
+    def fetch_changes(self, openstack, since):
+        """Servers changed since a high-water mark, or all servers if there is no mark"""
+        if since is None:
+            return openstack.servers.get_list()
+        return openstack.servers.get_changes_since(since)
+
+    @transaction.atomic
+    def apply_changes(self, tenant, servers, since, started):
+        """
+        Merge servers fetched with `fetch_changes` into the mirror & advance the high-water mark.
+        Returns the changed servers which have not been deleted.
+
+        The mark is the latest 'updated' time reported by nova, so is unaffected by clock skew.
+        changes-since is inclusive, so servers updated at the mark are fetched again (harmlessly).
+        """
+        if since is None:
+            self.sync_tenant(tenant, servers, started)
+        else:
+            deleted = [
+                server.id
+                for server in servers
+                if server.status in DELETED_SERVER_STATUSES
+            ]
+            self.model.objects.filter(pk__in=deleted).delete()
+            for server in servers:
+                if server.id not in deleted:
+                    self.record(tenant, server)
+
+        TenantMirrorState.objects.update_or_create(
+            tenant=tenant,
+            defaults={
+                "servers_changes_since": get_high_water_mark(servers, since, started),
+                "servers_synced_at": started,
+            },
+        )
+        return [
+            server for server in servers if server.status not in DELETED_SERVER_STATUSES
+        ]
+
+    def sync_changes(self, tenant, openstack):
+        """Incrementally sync a tenant's servers. Returns the changed servers"""
+        since = self.get_changes_since(tenant)
+        started = timezone.now()
+        servers = self.fetch_changes(openstack, since)
+        return self.apply_changes(tenant, servers, since, started)
+
+    def read_changes(self, tenant, servers):
+        """
+        Serializer data for a tenant's mirrored servers, with servers fetched by `fetch_changes`
+        merged in memory: the mirror is only written by syncs & write actions, not by reads.
+        """
+        rows = {
+            str(cached.id): cached
+            for cached in self.model.objects.filter(tenant=tenant)
+        }
+        for server in servers:
+            if server.status in DELETED_SERVER_STATUSES:
+                rows.pop(str(server.id), None)
+            else:
+                rows[str(server.id)] = self.model(
+                    id=server.id, tenant=tenant, **self.get_fields(server, tenant)
+                )
+        oldest = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+        rows = sorted(
+            rows.values(), key=lambda cached: cached.created or oldest, reverse=True
+        )
+        return self.add_lease_fields([self.to_dict(cached, tenant) for cached in rows])
+
+    def read(self, tenant):
+        data, synced_at = super().read(tenant)
+        if data is None:
+            return data, synced_at
+        return self.add_lease_fields(data), synced_at
+
+    def add_lease_fields(self, data):
+        """Add lease fields to serializer data, in a single query"""
+        leases = ServerLease.objects.filter(
+            server_id__in=[item["id"] for item in data]
+        ).select_related("assigned_teammember")
+        leases = {lease.server_id: lease for lease in leases}
+        for item in data:
+            lease = leases.get(item["id"])
+            item["lease_expiry"] = lease.expiry if lease else None
+            item["lease_renewal_url"] = lease.renewal_url if lease else None
+            item["lease_assigned_teammember"] = (
+                lease.assigned_teammember if lease else None
+            )
+        return data
+
+
+class VolumeMirror(Mirror):
+    model = CachedVolume
+    synced_at_field = "volumes_synced_at"
+    fields = (
+        "name",
+        "size",
+        "status",
+        "bootable",
+        "volume_type",
+        "attachments",
+        "created_at",
+        "updated_at",
+    )
+    ordering = ("-created_at",)
+
+    def get_fields(self, volume, tenant):
+        return {
+            "name": get_volume_display_name(volume, tenant),
+            "size": volume.size,
+            "status": volume.status,
+            "bootable": str(getattr(volume, "bootable", False)).lower() == "true",
+            "volume_type": getattr(volume, "volume_type", None) or "",
+            "attachments": getattr(volume, "attachments", None) or [],
+            "created_at": parse_openstack_datetime(getattr(volume, "created_at", None)),
+            "updated_at": parse_openstack_datetime(getattr(volume, "updated_at", None)),
+        }
+
+
+server_mirror = ServerMirror()
+volume_mirror = VolumeMirror()
+
+
+def sync_region(region, inventory=None):
+    """
+    Sync the mirror for every tenant in a region, from a region-wide inventory.
+    """
+    synced_at = timezone.now()
+    inventory = inventory or RegionInventory(region).collect()
+    for tenant in inventory.tenants.values():
+        server_mirror.sync_tenant(
+            tenant, inventory.servers_for_tenant(tenant), synced_at
+        )
+        volume_mirror.sync_tenant(
+            tenant, inventory.volumes_for_tenant(tenant), synced_at
+        )
+    logger.info(f"Synced mirror for {len(inventory.tenants)} tenants in {region.name}")
@@ -75,6 +75,24 @@ class KeyPair(models.Model):
         return self.name
 
 
+class TenantKeyPair(models.Model):
+    """Index of the KeyPairs which have been pushed to openstack for a Tenant"""
+
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, related_name="keypair_index"
+    )
+    keypair = models.ForeignKey(
+        KeyPair, on_delete=models.CASCADE, related_name="tenant_index"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, editable=False)
+
+    class Meta:
+        unique_together = [["tenant", "keypair"]]
+
+    def __str__(self):
+        return f"{self.keypair} at {self.tenant}"
+
+
 def get_default_server_lease_expiry():
     return timezone.now() + datetime.timedelta(days=settings.SERVER_LEASE_DEFAULT_DAYS)
 
@@ -104,6 +122,37 @@ class ServerLeaseQuerySet(models.QuerySet):
     def inactive(self):
         return self.filter(Q(deleted=True) | Q(shelved=True))
 
+    def for_servers(self, tenant, servers, get_assigned_teammember):
+        """
+        Leases for a list of openstack servers, as a dict keyed by server id (str).
+        Loaded in one query; any missing leases (e.g. legacy servers) are created in bulk,
+        assigned to get_assigned_teammember(), which is only called if required.
+        """
+        leases = {
+            str(lease.server_id): lease
+            for lease in self.filter(
+                server_id__in=[server.id for server in servers]
+            ).select_related("assigned_teammember")
+        }
+        missing = [server for server in servers if server.id not in leases]
+        if missing:
+            assigned_teammember = get_assigned_teammember()
+            created = self.bulk_create(
+                [
+                    self.model(
+                        server_id=server.id,
+                        server_name=server.name,
+                        tenant=tenant,
+                        assigned_teammember=assigned_teammember,
+                        shelved="SHELVED" in str(getattr(server, "status", "")),
+                    )
+                    for server in missing
+                ],
+                ignore_conflicts=True,  # created by a concurrent request
+            )
+            leases.update({str(lease.server_id): lease for lease in created})
+        return leases
+
 
 class ServerLease(models.Model):
     server_id = models.UUIDField(unique=True, editable=False)
@@ -324,6 +373,148 @@ class HypervisorStats(models.Model):
         verbose_name_plural = "Hypervisor Stats"
 
 
+class ServerCreationJob(models.Model):
+    """
+    An asynchronous server creation (see openstack.tasks.create_server), with progress by step.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING"
+        RUNNING = "RUNNING"
+        COMPLETE = "COMPLETE"
+        FAILED = "FAILED"
+
+    class Step(models.TextChoices):
+        QUEUED = "queued"
+        KEYPAIR = "keypair"
+        VOLUME = "volume"
+        BOOT = "boot"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, related_name="server_creation_jobs"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="server_creation_jobs"
+    )
+    name = models.CharField(max_length=255)
+    params = models.JSONField(default=dict)  # ServersService.create data
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    step = models.CharField(max_length=10, choices=Step.choices, default=Step.QUEUED)
+    volume_id = models.UUIDField(null=True, blank=True)
+    pooled_volume = models.BooleanField(default=False)  # boot volume claimed from pool
+    server_id = models.UUIDField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, editable=False)
+
+    def set_step(self, step, **fields):
+        """Record progress; used as the ServersService.create progress callback"""
+        self.status = self.Status.RUNNING
+        self.step = step
+        for field, value in fields.items():
+            setattr(self, field, value)
+        self.save()
+
+    def complete(self, server_id):
+        self.status = self.Status.COMPLETE
+        self.server_id = server_id
+        self.save()
+
+    def fail(self, error):
+        self.status = self.Status.FAILED
+        self.error = error
+        self.save()
+
+    def __str__(self):
+        return f"Creation of server '{self.name}' ({self.get_status_display()})"
+
+
+class PooledBootVolume(models.Model):
+    """
+    A bootable volume, pre-built from an image in the region admin project (see openstack.volume_pool).
+    Claimed volumes are transferred to the tenant project of a new server.
+    """
+
+    class Status(models.TextChoices):
+        BUILDING = "BUILDING"
+        READY = "READY"
+        CLAIMED = "CLAIMED"
+        FAILED = "FAILED"
+
+    volume_id = models.UUIDField(unique=True, editable=False)
+    region = models.ForeignKey(
+        Region, on_delete=models.CASCADE, related_name="pooled_boot_volumes"
+    )
+    image_id = models.CharField(max_length=50)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.BUILDING
+    )
+    requested_at = models.DateTimeField(auto_now_add=True, editable=False)
+    ready_at = models.DateTimeField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Pooled boot volume for image {self.image_id} at {self.region.name}"
+
+
+class TenantMirrorState(models.Model):
+    """Time of the last sync of a tenant's servers & volumes into the local mirror"""
+
+    tenant = models.OneToOneField(
+        Tenant, on_delete=models.CASCADE, related_name="mirror_state"
+    )
+    servers_synced_at = models.DateTimeField(null=True, blank=True)
+    volumes_synced_at = models.DateTimeField(null=True, blank=True)
+    # High-water mark for incremental server syncs (nova changes-since)
+    servers_changes_since = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return str(self.tenant)
+
+
+class CachedServer(models.Model):
+    """Local mirror of an openstack server, holding the fields required by InstanceSerializer"""
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, related_name="cached_servers"
+    )
+    name = models.CharField(max_length=255)
+    flavor = models.CharField(max_length=50, blank=True)
+    status = models.CharField(max_length=20)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    created = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(null=True, blank=True)
+    last_synced = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+
+class CachedVolume(models.Model):
+    """Local mirror of an openstack volume, holding the fields required by VolumeSerializer"""
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, related_name="cached_volumes"
+    )
+    name = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    status = models.CharField(max_length=20)
+    bootable = models.BooleanField(default=False)
+    volume_type = models.CharField(max_length=255, blank=True)
+    attachments = models.JSONField(default=list)
+    created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    last_synced = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+
 class RegionSettings(models.Model):
     region = models.OneToOneField(Region, on_delete=models.CASCADE)
     public_network_name = models.CharField(max_length=50)
@@ -7,10 +7,12 @@ from .models import (
     KeyPair,
     Region,
     RegionSettings,
+    ServerCreationJob,
     ServerLease,
     ServerLeaseRequest,
     Tenant,
 )
+from .service import CircuitBreaker
 
 
 class RegionSettingsSerializer(serializers.ModelSerializer):
@@ -23,6 +25,7 @@ class RegionSettingsSerializer(serializers.ModelSerializer):
 class RegionSerializer(serializers.ModelSerializer):
     id = HashidsIntegerField(read_only=True)
     settings = RegionSettingsSerializer(source="regionsettings")
+    circuit_breakers = serializers.SerializerMethodField()
 
     class Meta:
         model = Region
@@ -31,11 +34,16 @@ class RegionSerializer(serializers.ModelSerializer):
             "name",
             "description",
             "disabled",
+            "circuit_breakers",
             "new_instances_disabled",
             "unshelving_disabled",
             "settings",
         ]
 
+    def get_circuit_breakers(self, obj):
+        """Breaker state (closed, open or half_open) per openstack service"""
+        return CircuitBreaker.get_states(obj.name)
+
 
 class TenantSerializer(serializers.ModelSerializer):
     id = HashidsIntegerField(read_only=True)
@@ -77,6 +85,37 @@ class InstanceSerializer(OpenstackBaseSerializer):
     )
 
 
+class InstanceBulkActionSerializer(serializers.Serializer):
+    servers = serializers.ListField(
+        child=serializers.UUIDField(), min_length=1, max_length=100
+    )
+    status = serializers.ChoiceField(choices=["ACTIVE", "SHUTOFF", "SHELVED"])
+
+
+class ServerCreationJobSerializer(serializers.ModelSerializer):
+    tenant = serializers.PrimaryKeyRelatedField(
+        pk_field=HashidsIntegerField(), read_only=True
+    )
+    team = HashidsIntegerField(source="tenant.team_id", read_only=True)
+
+    class Meta:
+        model = ServerCreationJob
+        fields = [
+            "id",
+            "team",
+            "tenant",
+            "name",
+            "status",
+            "step",
+            "volume_id",
+            "server_id",
+            "error",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
 class ImageSerializer(OpenstackBaseSerializer):
     id = serializers.UUIDField(read_only=True)
     name = serializers.CharField()
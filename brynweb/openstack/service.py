@@ -1,7 +1,13 @@
+import logging
+import sys
 import time
 
+from django.conf import settings
+from django.core.cache import cache
 from neutronclient.v2_0 import client as neutronclient
 from novaclient import client as novaclient
+from novaclient import exceptions as nova_exceptions
+from keystoneauth1 import exceptions as keystone_exceptions
 from keystoneauth1 import session as keystonesession
 from keystoneauth1.identity import v3
 
@@ -14,6 +20,32 @@ from rest_framework import exceptions as drf_exceptions
 from rest_framework import status
 
 from . import auth_settings
+from .catalog import RegionCatalog
+from .coalescing import coalesced
+from .connections import connection_pools
+from .metrics import api_requests, instrumented
+from .models import TenantKeyPair
+from .sessions import session_pool
+
+logger = logging.getLogger(__name__)
+
+BOOT_VOLUME_SIZE_GB = 120
+
+BREAKER_SETTINGS = getattr(settings, "OPENSTACK_CIRCUIT_BREAKER", {})
+
+FAKE_BACKEND_SETTINGS = getattr(settings, "OPENSTACK_FAKE_BACKEND", {})
+
+BREAKER_DEFAULTS = {
+    "ENABLED": True,
+    "CONNECT_TIMEOUT_SECONDS": 5,
+    "READ_TIMEOUT_SECONDS": 60,
+    "FAILURE_THRESHOLD": 5,  # Consecutive failures before the breaker opens
+    "FAILURE_WINDOW_SECONDS": 60,  # Failures older than this are forgotten
+    "RESET_TIMEOUT_SECONDS": 30,  # Time open, before a single probe request is allowed
+}
+
+# Keystone service types reported in Region API data; requests without one are to keystone
+BREAKER_SERVICES = ("identity", "compute", "volumev3", "image", "network")
 
 
 class ServiceUnavailable(drf_exceptions.APIException):
@@ -28,6 +60,182 @@ class OpenstackException(drf_exceptions.APIException):
     default_code = "openstack_exception"
 
 
+def get_fake_cloud(region_name):
+    """
+    The fake cloud for a region, or None. openstack.fake is only imported when fake regions
+    are configured (or it has been imported already, e.g. by benchmarks & tests).
+    """
+    if not FAKE_BACKEND_SETTINGS.get("REGIONS") and "openstack.fake" not in sys.modules:
+        return None
+    from .fake import get_fake_cloud
+
+    return get_fake_cloud(region_name)
+
+
+def get_region_breaker_settings(region_name):
+    """Breaker settings for a region: defaults, overridden by global & per-region settings"""
+    region_overrides = BREAKER_SETTINGS.get("REGIONS", {}).get(region_name, {})
+    return {
+        key: region_overrides.get(key, BREAKER_SETTINGS.get(key, default))
+        for key, default in BREAKER_DEFAULTS.items()
+    }
+
+
+class CircuitOpen(ServiceUnavailable):
+    default_code = "circuit_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one openstack service (e.g. compute) in a region.
+
+    State is held in the shared cache, so is shared by all workers. The breaker opens after
+    FAILURE_THRESHOLD consecutive failures (connection errors, timeouts & 5xx responses),
+    and requests fail fast with CircuitOpen. After RESET_TIMEOUT_SECONDS it is half-open:
+    a single probe request is let through, which closes the breaker on success.
+    The single probe & failure counts rely on the cache's add & incr being atomic across
+    processes, as with Redis (see CACHES); with other backends (e.g. file-based), they are
+    best-effort only, and several workers may probe at once.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, region_name, service):
+        self.region_name = region_name
+        self.service = service
+        self.settings = get_region_breaker_settings(region_name)
+        prefix = f"openstack:breaker:{region_name}:{service}"
+        self.failures_key = f"{prefix}:failures"
+        self.open_key = f"{prefix}:open"
+        self.probe_key = f"{prefix}:probe"
+
+    @classmethod
+    def get_states(cls, region_name, services=BREAKER_SERVICES):
+        """Return a dict of {service: state} for a region, from a single cache read"""
+        breakers = [cls(region_name, service) for service in services]
+        keys = [key for b in breakers for key in (b.failures_key, b.open_key)]
+        values = cache.get_many(keys)
+        return {
+            b.service: b._get_state(values.get(b.failures_key), values.get(b.open_key))
+            for b in breakers
+        }
+
+    def _get_state(self, failures, opened):
+        if opened:
+            return self.OPEN
+        if (failures or 0) >= self.settings["FAILURE_THRESHOLD"]:
+            return self.HALF_OPEN
+        return self.CLOSED
+
+    @property
+    def state(self):
+        return self._get_state(cache.get(self.failures_key), cache.get(self.open_key))
+
+    def before_request(self):
+        """Raise CircuitOpen, unless the breaker is closed or this is the half-open probe"""
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and cache.add(
+            self.probe_key, True, timeout=self.settings["READ_TIMEOUT_SECONDS"]
+        ):
+            return
+        raise CircuitOpen(
+            f"The {self.service} service at {self.region_name} is unavailable, "
+            "try again later."
+        )
+
+    def record_status(self, status_code):
+        """Record the outcome of a request from its HTTP status; 5xx is a failure"""
+        if status_code and status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self):
+        if cache.get(self.failures_key):
+            cache.delete_many([self.failures_key, self.probe_key])
+            logger.info(f"Circuit closed for {self.service} at {self.region_name}")
+
+    def record_failure(self):
+        # Failures are counted while within FAILURE_WINDOW_SECONDS of each other
+        window = self.settings["FAILURE_WINDOW_SECONDS"]
+        cache.add(self.failures_key, 0, timeout=window)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:  # expired since
+            failures = 1
+            cache.set(self.failures_key, failures, timeout=window)
+        if failures < self.settings["FAILURE_THRESHOLD"]:
+            cache.touch(self.failures_key, timeout=window)
+            return
+        # Open; failures are kept (no expiry) so the breaker is half-open once reset
+        cache.set(self.failures_key, failures, timeout=None)
+        cache.set(self.open_key, True, timeout=self.settings["RESET_TIMEOUT_SECONDS"])
+        cache.delete(self.probe_key)
+        logger.warning(f"Circuit opened for {self.service} at {self.region_name}")
+
+
+class BreakerSession(keystonesession.Session):
+    """
+    Keystone session for a region, with connect/read timeouts & a circuit breaker per service.
+    A pooled session (with `pool_key`) is discarded from the session pool if a request is
+    unauthorized (after keystoneauth's own re-authentication), e.g. if its token is revoked.
+    """
+
+    def __init__(self, region_name, pool_key=None, **kwargs):
+        super().__init__(**kwargs)
+        self.region_name = region_name
+        self.pool_key = pool_key
+        self.breaker_settings = get_region_breaker_settings(region_name)
+
+    def invalidate_pooled(self):
+        if self.pool_key is not None:
+            logger.warning(f"Discarding unauthorized session for {self.pool_key}")
+            session_pool.invalidate(self.pool_key, session=self)
+
+    def request(self, url, method, endpoint_filter=None, **kwargs):
+        kwargs.setdefault(
+            "timeout",
+            (
+                self.breaker_settings["CONNECT_TIMEOUT_SECONDS"],
+                self.breaker_settings["READ_TIMEOUT_SECONDS"],
+            ),
+        )
+        service = (endpoint_filter or {}).get("service_type") or "identity"
+        labels = (self.region_name, service, method.upper())
+        breaker = None
+        if self.breaker_settings["ENABLED"]:
+            breaker = CircuitBreaker(self.region_name, service)
+            breaker.before_request()
+
+        with api_requests.track(*labels):
+            try:
+                response = super().request(
+                    url, method, endpoint_filter=endpoint_filter, **kwargs
+                )
+            except keystone_exceptions.ConnectionError:  # includes timeouts
+                if breaker:
+                    breaker.record_failure()
+                raise
+            except keystone_exceptions.HttpError as e:
+                if e.http_status == 401:
+                    self.invalidate_pooled()
+                if breaker:
+                    breaker.record_status(e.http_status)
+                raise
+
+        if response.status_code == 401:  # Clients which don't raise (raise_exc=False)
+            self.invalidate_pooled()
+        if response.status_code >= 500:
+            api_requests.errors.labels(*labels).inc()
+        if breaker:
+            breaker.record_status(response.status_code)
+        return response
+
+
 class OpenstackService:
     class Services(Enum):
         IMAGES = "images"
@@ -56,7 +264,12 @@ class OpenstackService:
         self._glance = None
         self._keystone = None
 
-        self.auth_settings = auth_settings.AUTHENTICATION[self.region.name]
+        # In-process fake, for regions in OPENSTACK_FAKE_BACKEND["REGIONS"]
+        self.fake = get_fake_cloud(self.region.name)
+        if self.fake:
+            self.auth_settings = self.fake.auth_settings
+        else:
+            self.auth_settings = auth_settings.AUTHENTICATION[self.region.name]
         self.images = ImagesService(self)
         self.flavors = FlavorsService(self)
         self.keypairs = KeypairsService(self)
@@ -64,59 +277,111 @@ class OpenstackService:
         self.volumes = VolumesService(self)
         self.volume_types = VolumeTypesService(self)
 
+    @property
+    def session_key(self):
+        """Key (region, project, user) for this service's session in the session pool"""
+        if self.tenant:
+            return (
+                self.region.name,
+                self.tenant.created_tenant_id,
+                self.auth_settings["SERVICE_USERNAME"],
+            )
+        return (
+            self.region.name,
+            self.auth_settings["TENANT_NAME"],
+            self.auth_settings["ADMIN_USERNAME"],
+        )
+
+    def get_auth(self):
+        if self.tenant:  # Service user for project operations
+            username = self.auth_settings["SERVICE_USERNAME"]
+            password = self.auth_settings["SERVICE_PASSWORD"]
+            project_id = self.tenant.created_tenant_id
+            project_name = None
+        else:  # Admin user for domain operations
+            username = self.auth_settings["ADMIN_USERNAME"]
+            password = self.auth_settings["ADMIN_PASSWORD"]
+            project_id = None
+            project_name = self.auth_settings["TENANT_NAME"]
+        return v3.Password(
+            auth_url=self.auth_settings["AUTH_URL"],
+            username=username,
+            password=password,
+            project_id=project_id,
+            project_name=project_name,
+            user_domain_id="default",
+            project_domain_id="default",
+        )
+
     @property
     def session(self):
         if not self._session:
-            if self.tenant:  # Service user for project operations
-                username = self.auth_settings["SERVICE_USERNAME"]
-                password = self.auth_settings["SERVICE_PASSWORD"]
-                project_id = self.tenant.created_tenant_id
-                project_name = None
-            else:  # Admin user for domain operations
-                username = self.auth_settings["ADMIN_USERNAME"]
-                password = self.auth_settings["ADMIN_PASSWORD"]
-                project_id = None
-                project_name = self.auth_settings["TENANT_NAME"]
-            auth = v3.Password(
-                auth_url=self.auth_settings["AUTH_URL"],
-                username=username,
-                password=password,
-                project_id=project_id,
-                project_name=project_name,
-                user_domain_id="default",
-                project_domain_id="default",
+            self._session = session_pool.get(
+                self.session_key,
+                self.get_auth,
+                session_class=BreakerSession,
+                region_name=self.region.name,
+                pool_key=self.session_key,
+                session=connection_pools.get(self.region.name),
             )
-            self._session = keystonesession.Session(auth=auth)
         return self._session
 
+    def get_fake_client(self, client_class):
+        project_id = self.tenant.created_tenant_id if self.tenant else None
+        return self.fake.client(client_class, project_id)
+
     @property
     def neutron(self):
         if not self._neutron:
-            self._neutron = neutronclient.Client(session=self.session)
+            if self.fake:
+                from .fake import FakeNeutron
+
+                self._neutron = self.get_fake_client(FakeNeutron)
+            else:
+                self._neutron = neutronclient.Client(session=self.session)
         return self._neutron
 
     @property
     def nova(self):
         if not self._nova:
-            self._nova = novaclient.Client(2, session=self.session)
+            if self.fake:
+                from .fake import FakeNova
+
+                self._nova = self.get_fake_client(FakeNova)
+            else:
+                self._nova = novaclient.Client(2, session=self.session)
         return self._nova
 
     @property
     def cinder(self):
         if not self._cinder:
-            self._cinder = cinderclient.Client(3, session=self.session)
+            if self.fake:
+                from .fake import FakeCinder
+
+                self._cinder = self.get_fake_client(FakeCinder)
+            else:
+                self._cinder = cinderclient.Client(3, session=self.session)
         return self._cinder
 
     @property
     def glance(self):
         if not self._glance:
-            self._glance = GlanceClient(2, session=self.session)
+            if self.fake:
+                from .fake import FakeGlance
+
+                self._glance = self.get_fake_client(FakeGlance)
+            else:
+                self._glance = GlanceClient(2, session=self.session)
         return self._glance
 
     @property
     def keystone(self):
         if not self._keystone:
-            if "ADMIN_URL" in self.auth_settings:
+            if self.fake:
+                from .fake import FakeKeystone
+
+                self._keystone = self.get_fake_client(FakeKeystone)
+            elif "ADMIN_URL" in self.auth_settings:
                 self._keystone = keystoneclient.Client(
                     token=self.session.get_token(),
                     endpoint=self.auth_settings["ADMIN_URL"],
@@ -126,6 +391,7 @@ class OpenstackService:
         return self._keystone
 
 
+@instrumented("keypairs")
 class KeypairsService:
     def __init__(self, openstack):
         self.openstack = openstack
@@ -143,11 +409,16 @@ class KeypairsService:
         """
         Create an openstack KeyPair for the tenant, unless it already exists.
         Local instance id (UUID) used for the openstack name.
+        Keypairs known to exist are indexed (TenantKeyPair), so only a miss calls openstack.
         """
-        for existing in self.get_list():
-            if existing.name == name:
-                return existing
-        return self.create({"name": name, "public_key": public_key})
+        tenant = self.openstack.tenant
+        if TenantKeyPair.objects.filter(tenant=tenant, keypair_id=name).exists():
+            return
+        try:
+            self.get(name)
+        except nova_exceptions.NotFound:
+            self.create({"name": name, "public_key": public_key})
+        TenantKeyPair.objects.get_or_create(tenant=tenant, keypair_id=name)
 
     def get(self, keypair_id):
         return self.nova.keypairs.get(keypair_id)
@@ -160,6 +431,7 @@ class KeypairsService:
         return (keypair.delete(), keypair)
 
 
+@instrumented("images")
 class ImagesService:
     def __init__(self, openstack):
         self.openstack = openstack
@@ -168,10 +440,11 @@ class ImagesService:
     def glance(self):
         return self.openstack.glance
 
-    def get_list(self):
-        return self.glance.images.list()
+    def get_list(self, filters=None):
+        return self.glance.images.list(filters=filters or {})
 
 
+@instrumented("flavors")
 class FlavorsService:
     def __init__(self, openstack):
         self.openstack = openstack
@@ -180,10 +453,19 @@ class FlavorsService:
     def nova(self):
         return self.openstack.nova
 
-    def get_list(self):
-        return self.nova.flavors.list()
+    def get_list(self, is_public=True):
+        """
+        Public flavors, by default; with None, all flavors visible to the session (for a
+        user with the admin role, every project's private flavors)
+        """
+        return self.nova.flavors.list(is_public=is_public)
 
+    def get_access_list(self, flavor):
+        """Projects with access to a private flavor"""
+        return self.nova.flavor_access.list(flavor=flavor)
 
+
+@instrumented("volumes")
 class VolumesService:
     def __init__(self, openstack):
         self.openstack = openstack
@@ -199,6 +481,7 @@ class VolumesService:
     def get(self, volume_id):
         return self.cinder.volumes.get(volume_id)
 
+    @coalesced
     def get_list(self):
         return self.cinder.volumes.list()
 
@@ -207,7 +490,8 @@ class VolumesService:
             imageRef=data.get("image"),
             name=data.get("name"),
             size=data.get("size"),
-            volume_type=data.get("volumeType", self.openstack.volume_types.default),
+            volume_type=data.get("volume_type")
+            or self.openstack.volume_types.cached_default,
         )
 
     def delete(self, volume_id):
@@ -230,6 +514,7 @@ class VolumesService:
         return self.nova.volumes.delete_server_volume(server_id, volume_id)
 
 
+@instrumented("volume_types")
 class VolumeTypesService:
     def __init__(self, openstack):
         self.openstack = openstack
@@ -245,6 +530,13 @@ class VolumeTypesService:
             self._default = self.cinder.volume_types.default().id
         return self._default
 
+    @property
+    def cached_default(self):
+        """Default volume type id, from the region catalog cache"""
+        return RegionCatalog(
+            self.openstack.region, self.openstack
+        ).default_volume_type()
+
     def get_list(self):
         volume_types = self.cinder.volume_types.list(is_public=True)
         for volume_type in volume_types:
@@ -252,6 +544,7 @@ class VolumeTypesService:
         return volume_types
 
 
+@instrumented("servers")
 class ServersService:
     def __init__(self, openstack):
         self.openstack = openstack
@@ -271,35 +564,49 @@ class ServersService:
     def get(self, uuid):
         return self.nova.servers.get(uuid)
 
+    @coalesced
     def get_list(self):
         return self.nova.servers.list(detailed=True)
 
-    def create(self, data):
+    def get_changes_since(self, since):
+        """
+        Servers created, updated or deleted since a datetime (deleted servers have status DELETED).
+        """
+        return self.nova.servers.list(
+            detailed=True, search_opts={"changes-since": since.isoformat()}
+        )
+
+    def create(self, data, progress=None, claim_volume=None):
+        """
+        Create a server, booting from a new volume. Blocks until the boot volume is available,
+        so call from a background task (see openstack.tasks.create_server).
+        `progress` is called with each step name ("keypair", "volume", "boot") & any ids.
+        `claim_volume(image, name)` may return a ready boot volume, e.g. from a BootVolumePool.
+        """
         flavor = data["flavor"]
         image = data["image"]
         keypair = data["keypair"]
         public_key = data["public_key"]
         name = data["name"]
         team = data["team"]
+        progress = progress or (lambda step, **fields: None)
 
         # Create keypair if it doesn't yet exist for this tenant
+        progress("keypair")
         self.openstack.keypairs.find_or_create(keypair, public_key)
 
-        # Create boot volume
-        volume = self.cinder.volumes.create(
-            imageRef=image,
-            name=f"bryn:{team}_{name}_boot_volume",
-            size=120,
-        )
-        self.cinder.volumes.set_bootable(volume, True)
-
-        # Wait for boot volume availability
-        for n in range(120):
-            # TODO: move volume creation to frontend, otherwise tidy up a bit
-            v = self.cinder.volumes.get(volume.id)
-            if v.status == "available":
-                break
-            time.sleep(2)
+        # Claim or create boot volume
+        volume_name = f"bryn:{team}_{name}_boot_volume"
+        volume = claim_volume(image, volume_name) if claim_volume else None
+        if volume:
+            progress("volume", volume_id=volume.id, pooled_volume=True)
+        else:
+            volume = self.cinder.volumes.create(
+                imageRef=image, name=volume_name, size=BOOT_VOLUME_SIZE_GB
+            )
+            progress("volume", volume_id=volume.id)
+            self.cinder.volumes.set_bootable(volume, True)
+            self.wait_for_volume(volume.id)
 
         # Block device mapping
         bdm = [
@@ -313,6 +620,7 @@ class ServersService:
         ]
 
         # Create server
+        progress("boot")
         return self.nova.servers.create(
             name,
             "",
@@ -322,6 +630,17 @@ class ServersService:
             block_device_mapping_v2=bdm,
         )
 
+    def wait_for_volume(self, volume_id, attempts=120, interval=2):
+        """Wait for volume availability"""
+        for _attempt in range(attempts):
+            volume = self.cinder.volumes.get(volume_id)
+            if volume.status == "available":
+                return volume
+            if volume.status == "error":
+                raise OpenstackException(detail="Boot volume creation failed.")
+            time.sleep(interval)
+        raise OpenstackException(detail="Timed out waiting for boot volume.")
+
     def delete(self, server_id):
         server = self.get(server_id)
         return (server.delete(), server)
@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from keystoneauth1 import session as keystonesession
+
+from .token_cache import get_token_cache
+
+logger = logging.getLogger(__name__)
+
+POOL_SETTINGS = getattr(settings, "OPENSTACK_SESSION_POOL", {})
+
+
+class PooledSession:
+    """
+    An authenticated keystone session held by the SessionPool.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    @property
+    def auth(self):
+        return self.session.auth
+
+    def expires_within(self, seconds):
+        """True if there is no token yet, or the current token expires within `seconds`"""
+        auth_ref = self.auth.auth_ref
+        return auth_ref is None or auth_ref.will_expire_soon(seconds)
+
+
+class SessionPool:
+    """
+    Thread-safe, process-wide pool of authenticated keystone sessions.
+
+    Sessions are keyed by (region name, project, username). Tokens are reused until they are within
+    `refresh_margin` seconds of expiry, when they are renewed before the session is handed out.
+    Sessions unused for `idle_timeout` seconds are evicted.
+    If a TokenCache is supplied, tokens are also shared between processes.
+    """
+
+    def __init__(
+        self,
+        refresh_margin=300,
+        idle_timeout=1800,
+        eviction_interval=60,
+        token_cache=None,
+    ):
+        self.refresh_margin = refresh_margin
+        self.idle_timeout = idle_timeout
+        self.eviction_interval = eviction_interval
+        self.token_cache = token_cache
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+        self._counts = {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "evictions": 0,
+            "shared_hits": 0,
+            "invalidations": 0,
+        }
+
+    def get(
+        self, key, auth_factory, session_class=keystonesession.Session, **session_kwargs
+    ):
+        """
+        Return an authenticated session for key.
+        `auth_factory` is called to build the auth plugin, if there is no pooled session for key;
+        any `session_kwargs` are passed to the new `session_class` (a keystone Session).
+        """
+        self._evict_idle_if_due()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = PooledSession(
+                    session_class(auth=auth_factory(), **session_kwargs)
+                )
+                self._entries[key] = entry
+                self._counts["misses"] += 1
+            else:
+                self._counts["hits"] += 1
+            entry.last_used = time.monotonic()
+
+        self._refresh_if_due(key, entry)
+        return entry.session
+
+    def _refresh_if_due(self, key, entry):
+        """
+        Authenticate, or re-authenticate ahead of expiry (one thread per session).
+        With a token cache, a token refreshed by another process is used where available.
+        """
+        with entry.lock:
+            if not entry.expires_within(self.refresh_margin):
+                return
+
+            def authenticate():
+                if entry.auth.auth_ref is not None:
+                    logger.info(f"Refreshing keystone token for {key}")
+                    entry.auth.invalidate()
+                    with self._lock:
+                        self._counts["refreshes"] += 1
+                entry.session.get_token()
+
+            if self.token_cache is None:
+                authenticate()
+                return
+
+            cache_key = self.token_cache.get_key(*key)
+            if self.token_cache.load(
+                cache_key, entry.auth
+            ) and not entry.expires_within(self.refresh_margin):
+                with self._lock:
+                    self._counts["shared_hits"] += 1
+                return
+            self.token_cache.refresh(cache_key, entry.auth, authenticate)
+
+    def _evict_idle_if_due(self):
+        now = time.monotonic()
+        if now - self._last_eviction < self.eviction_interval:
+            return
+        self.evict_idle(now)
+
+    def evict_idle(self, now=None):
+        """Remove sessions which have not been used within the idle timeout"""
+        now = now or time.monotonic()
+        with self._lock:
+            self._last_eviction = now
+            idle = [
+                key
+                for key, entry in self._entries.items()
+                if now - entry.last_used > self.idle_timeout
+            ]
+            for key in idle:
+                del self._entries[key]
+            self._counts["evictions"] += len(idle)
+        return len(idle)
+
+    def invalidate(self, key, session=None):
+        """
+        Discard a pooled session, e.g. following an authentication failure.
+        If `session` is given, the pooled session is only discarded if it is that session (not
+        a replacement, created by another thread since).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (session is not None and entry.session is not session):
+                return
+            del self._entries[key]
+            self._counts["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), **self._counts}
+
+
+session_pool = SessionPool(
+    refresh_margin=POOL_SETTINGS.get("REFRESH_MARGIN_SECONDS", 300),
+    idle_timeout=POOL_SETTINGS.get("IDLE_TIMEOUT_SECONDS", 1800),
+    token_cache=get_token_cache(),
+)
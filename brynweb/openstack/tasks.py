@@ -1,14 +1,24 @@
 import logging
+from functools import partial
 
 from django.conf import settings
 from django.utils import timezone
 
 from huey import crontab
-from huey.contrib.djhuey import db_periodic_task
+from huey.contrib.djhuey import db_periodic_task, db_task
 
 from core.utils import slack_post_templated_message
-from .models import HypervisorStats, Region, ServerLease
+from userdb.models import TeamMember
+from .catalog import RegionCatalog
+from .leases import (
+    RECONCILIATION_SETTINGS,
+    get_default_lease_teammember,
+    reconcile_region_leases,
+)
+from .mirror import server_mirror, sync_region
+from .models import HypervisorStats, Region, ServerCreationJob, ServerLease
 from .service import OpenstackService
+from .volume_pool import BootVolumePool
 
 logger = logging.getLogger("huey")
 
@@ -64,3 +74,134 @@ if getattr(settings, "SERVER_LEASE_SCHEDULED_EMAILS", False):
     db_periodic_task(crontab(minute="0", hour="9,14"))(
         send_server_lease_expiry_reminder_emails
     )
+
+
+@db_task(retries=2, retry_delay=30)
+def refresh_region_catalog(region_id, section=None):
+    """Refresh one (or all) catalog sections for a region"""
+    region = Region.objects.get(pk=region_id)
+    RegionCatalog(region, OpenstackService(region=region)).refresh(section)
+
+
+def warm_region_catalogs():
+    """Refresh catalogs for all enabled regions, ahead of expiry"""
+    for region in Region.objects.filter(disabled=False):
+        try:
+            RegionCatalog(region, OpenstackService(region=region)).refresh()
+        except Exception as e:
+            logger.error(f"Failed to refresh catalog for {region.name}: {e}")
+
+
+if getattr(settings, "OPENSTACK_CATALOG_CACHE", {}).get("WARM", False):
+    db_periodic_task(crontab(minute="*/30"))(warm_region_catalogs)
+
+
+@db_task(retries=1, retry_delay=60)
+def sync_region_mirror(region_id):
+    """Sync the local server & volume mirror for a region"""
+    sync_region(Region.objects.get(pk=region_id))
+
+
+def sync_mirrors():
+    """Sync the local server & volume mirror for all enabled regions"""
+    for region in Region.objects.filter(disabled=False):
+        try:
+            sync_region(region)
+        except Exception as e:
+            logger.error(f"Failed to sync mirror for {region.name}: {e}")
+
+
+MIRROR_SETTINGS = getattr(settings, "OPENSTACK_MIRROR", {})
+if MIRROR_SETTINGS.get("SYNC", False):
+    db_periodic_task(
+        crontab(minute=f"*/{MIRROR_SETTINGS.get('SYNC_INTERVAL_MINUTES', 5)}")
+    )(sync_mirrors)
+
+
+def reconcile_leases():
+    """Reconcile server leases with nova's servers, for all enabled regions"""
+    for region in Region.objects.filter(disabled=False):
+        try:
+            reconcile_region_leases(region)
+        except Exception as e:
+            logger.error(f"Failed to reconcile server leases for {region.name}: {e}")
+
+
+if RECONCILIATION_SETTINGS.get("ENABLED", False):
+    db_periodic_task(
+        crontab(minute=f"*/{RECONCILIATION_SETTINGS.get('INTERVAL_MINUTES', 15)}")
+    )(reconcile_leases)
+
+
+@db_task()
+def create_server(job_id):
+    """
+    Create a server for a ServerCreationJob, recording progress & any error on the job.
+    """
+    job = ServerCreationJob.objects.select_related(
+        "tenant__team", "tenant__region", "user"
+    ).get(pk=job_id)
+    tenant = job.tenant
+    openstack = OpenstackService(tenant=tenant)
+    claim_volume = None
+    if getattr(settings, "OPENSTACK_BOOT_VOLUME_POOL", {}).get("ENABLED", False):
+        claim_volume = partial(BootVolumePool(tenant.region).claim, openstack)
+    try:
+        server = openstack.servers.create(
+            job.params, progress=job.set_step, claim_volume=claim_volume
+        )
+    except Exception as e:
+        logger.error(f"Failed to create server '{job.name}' for {tenant}: {e}")
+        job.fail(str(getattr(e, "detail", e)))
+        return
+
+    # Lease, assigned to the requesting user's team membership (or, if they have
+    # since left the team, as for servers not created through Bryn)
+    server.name = job.name  # not in nova's create response
+    try:
+        teammember = TeamMember.objects.filter(
+            team=tenant.team, user=job.user
+        ).first() or get_default_lease_teammember(tenant)
+        if teammember:
+            ServerLease.objects.for_servers(tenant, [server], lambda: teammember)
+        else:
+            logger.warning(f"No team member to assign lease for '{job.name}'")
+    except Exception as e:
+        logger.error(f"Failed to create lease for server '{job.name}': {e}")
+    job.complete(server.id)
+    try:
+        server_mirror.record(tenant, openstack.servers.get(server.id))
+    except Exception as e:
+        logger.warning(f"Failed to mirror new server '{job.name}': {e}")
+
+    # Slack notification
+    slack_template = "openstack/slack/entity_created.txt"
+    slack_context = {
+        "entity_type": "server",
+        "entity_name": job.name,
+        "tenant": tenant,
+        "user": job.user,
+    }
+    slack_post_templated_message(slack_template, slack_context)
+
+
+def refill_boot_volume_pools():
+    """Top up the boot volume pool for all enabled regions"""
+    for region in Region.objects.filter(disabled=False):
+        started = timezone.now()
+        try:
+            requested = BootVolumePool(region).refill()
+        except Exception as e:
+            logger.error(f"Failed to refill boot volume pool for {region.name}: {e}")
+            continue
+        logger.info(
+            f"Requested {requested} pooled boot volumes for {region.name} "
+            f"in {(timezone.now() - started).total_seconds():.1f}s"
+        )
+
+
+VOLUME_POOL_SETTINGS = getattr(settings, "OPENSTACK_BOOT_VOLUME_POOL", {})
+if VOLUME_POOL_SETTINGS.get("ENABLED", False):
+    db_periodic_task(
+        crontab(minute=f"*/{VOLUME_POOL_SETTINGS.get('REFILL_INTERVAL_MINUTES', 5)}")
+    )(refill_boot_volume_pools)
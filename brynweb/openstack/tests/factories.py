@@ -1,6 +1,6 @@
 import factory
 
-from userdb.tests.factories import UserFactory
+from userdb.tests.factories import TeamFactory, UserFactory
 
 
 class KeyPairFactory(factory.django.DjangoModelFactory):
@@ -19,3 +19,51 @@ class KeyPairFactory(factory.django.DjangoModelFactory):
         )
     )
     user = factory.SubFactory(UserFactory)
+
+
+class FixedLengthKeyPairFactory(factory.django.DjangoModelFactory):
+    """
+    As KeyPairFactory, but public keys stay valid however many are created (KeyPairFactory's are
+    only valid base64 for its first 10 in a test run); a separate sequence, for the same reason.
+    """
+
+    class Meta:
+        model = "openstack.KeyPair"
+
+    name = factory.Sequence(lambda n: "keypair%d" % n)
+    public_key = factory.Sequence(
+        lambda n: KeyPairFactory.public_key.function(0).replace(
+            "b0k0", f"{n % 10000:04d}"
+        )
+    )
+    user = factory.SubFactory(UserFactory)
+
+
+class RegionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = "userdb.Region"
+
+    name = factory.Sequence(lambda n: "region%d" % n)
+    description = factory.Sequence(lambda n: "Region %d" % n)
+    regionsettings = factory.RelatedFactory(
+        "openstack.tests.factories.RegionSettingsFactory", factory_related_name="region"
+    )
+
+
+class RegionSettingsFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = "openstack.RegionSettings"
+
+    region = factory.SubFactory(RegionFactory, regionsettings=None)
+    public_network_name = "public"
+    public_network_id = factory.Sequence(lambda n: "network%d" % n)
+
+
+class TenantFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = "openstack.Tenant"
+
+    team = factory.SubFactory(TeamFactory)
+    region = factory.SubFactory(RegionFactory)
+    created_tenant_id = factory.Sequence(lambda n: "project%d" % n)
+    created_tenant_name = factory.Sequence(lambda n: "bryn:%d_team" % n)
@@ -1,11 +1,34 @@
+import asyncio
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import DatabaseError
 from django.urls import reverse
 
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+from userdb.models import TeamMember
 from userdb.tests.factories import UserFactory
-from ..models import KeyPair
-from .factories import KeyPairFactory
+from .. import api_views
+from ..api_views import (
+    AsyncOpenstackAPIView,
+    VolumeDetailView,
+    VolumeListView,
+    call_upstream,
+)
+from ..models import (
+    CachedVolume,
+    KeyPair,
+    ServerCreationJob,
+    ServerLease,
+    TenantKeyPair,
+)
+from ..service import CircuitBreaker, CircuitOpen, OpenstackException
+from ..tasks import create_server
+from .factories import FixedLengthKeyPairFactory, KeyPairFactory, TenantFactory
 
 
 class TestKeyPairAPI(APITestCase):
@@ -64,6 +87,18 @@ class TestKeyPairAPI(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(KeyPair.objects.count(), 1)
 
+    def test_keypair_deletion_removes_tenant_index(self):
+        """Does deleting a keypair remove it from the tenant keypair index?"""
+        user = UserFactory()
+        keypair = FixedLengthKeyPairFactory(user=user)
+        TenantKeyPair.objects.create(tenant=TenantFactory(), keypair=keypair)
+        self.client.force_login(user=user)
+        response = self.client.delete(
+            reverse(self.path_name, kwargs={"pk": keypair.pk})
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(TenantKeyPair.objects.exists())
+
     # Auto default
 
     # No duplicates
@@ -71,3 +106,440 @@ class TestKeyPairAPI(APITestCase):
     # Deletion
 
     # Security for detail endpoint
+
+
+class TestServiceStatsAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.path_name = "api:service_stats"
+        cls.user = UserFactory()
+        cls.staff_user = UserFactory(is_staff=True)
+
+    def test_non_staff_cannot_view_service_stats(self):
+        """Are service stats restricted to staff?"""
+        self.client.force_login(user=self.user)
+        response = self.client.get(reverse(self.path_name))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_staff_can_view_service_stats(self):
+        """Can staff view session & connection pool stats?"""
+        self.client.force_login(user=self.staff_user)
+        response = self.client.get(reverse(self.path_name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("sessions", response.data)
+        self.assertIn("connections", response.data)
+
+
+class TestTenantSnapshotAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.path_name = "api:tenant_snapshot"
+
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory()
+        TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+
+    def get_url(self):
+        return reverse(
+            self.path_name,
+            kwargs={"team_id": self.tenant.team_id, "tenant_id": self.tenant.id},
+        )
+
+    def test_non_member_cannot_view_snapshot(self):
+        """Are users forbidden from snapshots of other teams' tenants?"""
+        self.client.force_login(user=UserFactory())
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unknown_section_is_rejected(self):
+        """Is an unknown section a bad request?"""
+        self.client.force_login(user=self.user)
+        response = self.client.get(self.get_url(), {"sections": "instances,foo"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_section_errors_are_reported_individually(self, service):
+        """Does a failing section leave the other sections intact?"""
+        service.return_value.servers.get_list.side_effect = Exception("timeout")
+        service.return_value.volumes.get_list.return_value = []
+        self.client.force_login(user=self.user)
+        response = self.client.get(self.get_url(), {"sections": "instances,volumes"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["volumes"], [])
+        self.assertIsNone(response.data["instances"])
+        self.assertEqual(response.data["errors"], {"instances": "timeout"})
+        self.assertNotIn("flavors", response.data)
+
+
+class TestServerCreationJobAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory()
+        TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+        cls.keypair = FixedLengthKeyPairFactory(user=cls.user)
+
+    def create_instance(self):
+        url = reverse(
+            "api:instances",
+            kwargs={"team_id": self.tenant.team_id, "tenant_id": self.tenant.id},
+        )
+        data = {
+            "name": "server",
+            "flavor": "5f0c2e67-4f9d-4d0c-9b43-3d8f2b8a0c11",
+            "image": "e1d0b5c4-7a8e-4b59-9c0f-2f7b1d6a3e22",
+            "keypair": str(self.keypair.id),
+        }
+        self.client.force_login(user=self.user)
+        return self.client.post(url, data)
+
+    @mock.patch("openstack.tasks.OpenstackService")
+    def test_create_returns_job(self, service):
+        """Does server creation respond with a job, completed by the task?"""
+        server_id = "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c9d"
+        service.return_value.servers.create.return_value = mock.Mock(id=server_id)
+        service.return_value.servers.get.side_effect = Exception("not found")
+
+        response = self.create_instance()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ServerCreationJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, ServerCreationJob.Status.COMPLETE)
+        self.assertEqual(str(job.server_id), server_id)
+        self.assertEqual(job.params["public_key"], self.keypair.public_key)
+        lease = ServerLease.objects.get(server_id=server_id)
+        self.assertEqual(lease.assigned_teammember.user, self.user)
+
+        response = self.client.get(
+            reverse(
+                "api:instance_jobs",
+                kwargs={
+                    "team_id": self.tenant.team_id,
+                    "tenant_id": self.tenant.id,
+                    "pk": job.pk,
+                },
+            )
+        )
+        self.assertEqual(response.data["status"], "COMPLETE")
+        self.assertEqual(response.data["server_id"], server_id)
+
+    def run_job_after_leaving_team(self, service):
+        server_id = "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c9d"
+        service.return_value.servers.create.return_value = mock.Mock(id=server_id)
+        service.return_value.servers.get.side_effect = Exception("not found")
+        job = ServerCreationJob.objects.create(
+            tenant=self.tenant, user=self.user, name="server"
+        )
+        TeamMember.objects.filter(team=self.tenant.team, user=self.user).delete()
+        create_server.call_local(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ServerCreationJob.Status.COMPLETE)
+        return ServerLease.objects.filter(server_id=server_id).first()
+
+    @mock.patch("openstack.tasks.OpenstackService")
+    def test_job_completes_after_user_leaves_team(self, service):
+        """If the user has left the team, is the lease assigned to a team admin?"""
+        admin = TeamMember.objects.create(
+            team=self.tenant.team, user=UserFactory(), is_admin=True
+        )
+        lease = self.run_job_after_leaving_team(service)
+        self.assertEqual(lease.assigned_teammember, admin)
+
+    @mock.patch("openstack.tasks.OpenstackService")
+    def test_job_completes_without_team_members(self, service):
+        """With no team member to assign a lease, does the job still complete?"""
+        self.assertIsNone(self.run_job_after_leaving_team(service))
+
+    @mock.patch("openstack.tasks.OpenstackService")
+    def test_failed_job_records_step_and_error(self, service):
+        """Is a creation failure reported on the job, with the step reached?"""
+
+        def create(data, progress, claim_volume=None):
+            progress("keypair")
+            progress("volume", volume_id="0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c9d")
+            raise OpenstackException(detail="Boot volume creation failed.")
+
+        service.return_value.servers.create.side_effect = create
+
+        response = self.create_instance()
+        job = ServerCreationJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, ServerCreationJob.Status.FAILED)
+        self.assertEqual(job.step, ServerCreationJob.Step.VOLUME)
+        self.assertEqual(job.error, "Boot volume creation failed.")
+        self.assertFalse(ServerLease.objects.exists())
+
+
+class TestCircuitBreakerAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory()
+        TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_region_list_includes_breaker_state(self):
+        """Does the region list show the circuit breaker state per service?"""
+        breaker = CircuitBreaker(self.tenant.region.name, "compute")
+        for _n in range(breaker.settings["FAILURE_THRESHOLD"]):
+            breaker.record_failure()
+        self.client.force_login(user=self.user)
+        response = self.client.get(reverse("api:regions"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        region = next(r for r in response.data if r["name"] == self.tenant.region.name)
+        breakers = region["circuit_breakers"]
+        self.assertEqual(breakers["compute"], CircuitBreaker.OPEN)
+        self.assertEqual(breakers["volumev3"], CircuitBreaker.CLOSED)
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_open_circuit_is_service_unavailable(self, service):
+        """Does an open circuit respond 503, rather than as an openstack error?"""
+        service.return_value.servers.get_list.side_effect = CircuitOpen()
+        self.client.force_login(user=self.user)
+        response = self.client.get(
+            reverse(
+                "api:instances",
+                kwargs={"team_id": self.tenant.team_id, "tenant_id": self.tenant.id},
+            ),
+            {"source": "live"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class TestInstanceBulkActionAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory()
+        cls.member = TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+        cls.server_ids = [
+            "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c90",
+            "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c91",
+            "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c92",
+        ]
+        for n, server_id in enumerate(cls.server_ids):
+            ServerLease.objects.create(
+                server_id=server_id,
+                server_name=f"server-{n}",
+                tenant=cls.tenant,
+                assigned_teammember=cls.member,
+            )
+
+    def setUp(self):
+        self.client.force_login(user=self.user)
+
+    def get_url(self):
+        return reverse(
+            "api:instance_actions",
+            kwargs={"team_id": self.tenant.team_id, "tenant_id": self.tenant.id},
+        )
+
+    def mock_servers(self, service, statuses):
+        servers = {
+            server_id: mock.Mock(id=server_id, status=server_status)
+            for server_id, server_status in zip(self.server_ids, statuses)
+        }
+        for server in servers.values():
+            server.name = f"name-{server.id[-1]}"
+        service.return_value.servers.get.side_effect = servers.__getitem__
+        return service.return_value.servers
+
+    @mock.patch("openstack.api_views.slack_post_templated_message")
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_bulk_shelve(self, service, slack):
+        """Are servers shelved & leases updated, with results per server?"""
+        servers = self.mock_servers(service, ["ACTIVE", "SHUTOFF", "SHELVED"])
+        response = self.client.post(
+            self.get_url(), {"servers": self.server_ids, "status": "SHELVED"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {result["id"]: result for result in response.data}
+        self.assertEqual(results[self.server_ids[0]]["action"], "shelve")
+        self.assertEqual(results[self.server_ids[1]]["action"], "shelve")
+        self.assertIsNone(results[self.server_ids[2]]["action"])
+        self.assertIn("Cannot change status", results[self.server_ids[2]]["error"])
+        self.assertEqual(servers.shelve.call_count, 2)
+        self.assertEqual(
+            ServerLease.objects.filter(shelved=True).count(),
+            2,
+        )
+        slack.assert_called_once()
+        self.assertEqual(len(slack.call_args[0][1]["servers"]), 2)
+        self.assertEqual(slack.call_args[0][1]["failed_count"], 1)
+
+    @mock.patch("openstack.api_views.slack_post_templated_message")
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_bulk_unshelve_renews_leases(self, service, slack):
+        """Does unshelving renew leases, leaving other failures per server?"""
+        ServerLease.objects.update(shelved=True)
+        servers = self.mock_servers(service, ["SHELVED_OFFLOADED", "SHELVED"])
+        servers.unshelve.side_effect = [None, Exception("No valid host")]
+        response = self.client.post(
+            self.get_url(), {"servers": self.server_ids[:2], "status": "ACTIVE"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        errors = [result["error"] for result in response.data]
+        self.assertEqual(errors.count(None), 1)
+        self.assertIn("No valid host", errors)
+        lease = ServerLease.objects.filter(shelved=False).get()
+        self.assertEqual(lease.renewal_count, 1)
+        slack.assert_called_once()
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_invalid_bulk_action_is_rejected(self, service):
+        """Are unknown statuses & empty server lists bad requests?"""
+        response = self.client.post(
+            self.get_url(), {"servers": self.server_ids, "status": "DELETED"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            self.get_url(), {"servers": [], "status": "SHELVED"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        service.assert_not_called()
+
+    def test_non_member_cannot_call_bulk_action(self):
+        """Are users forbidden from bulk actions on other teams' tenants?"""
+        self.client.force_login(user=UserFactory())
+        response = self.client.post(
+            self.get_url(), {"servers": self.server_ids, "status": "SHELVED"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestAsyncOpenstackAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory()
+        cls.member = TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(user=self.user)
+
+    def get_url(self, name, **kwargs):
+        return reverse(
+            f"api:{name}",
+            kwargs={
+                "team_id": self.tenant.team_id,
+                "tenant_id": self.tenant.id,
+                **kwargs,
+            },
+        )
+
+    def test_view_is_async(self):
+        """Are async views dispatched by Django as coroutine functions?"""
+        self.assertTrue(asyncio.iscoroutinefunction(VolumeListView.as_view()))
+
+    def test_handlers_are_async(self):
+        """Do views calling openstack have only async handlers?"""
+        views = [
+            view
+            for view in vars(api_views).values()
+            if isinstance(view, type) and issubclass(view, AsyncOpenstackAPIView)
+        ]
+        self.assertIn(api_views.TenantSnapshotView, views)
+        for view in views:
+            for method in ("get", "post", "patch", "delete"):
+                handler = getattr(view, method, None)
+                if handler:
+                    self.assertTrue(asyncio.iscoroutinefunction(handler), handler)
+
+    @mock.patch("openstack.api_views.slack_post_templated_message")
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_patch_calls_upstream_in_executor(self, service, slack):
+        """Are a PATCH's openstack calls made in the upstream executor?"""
+        threads = []
+
+        def get(pk):
+            threads.append(threading.current_thread().name)
+            return mock.Mock(status="ACTIVE")
+
+        service.return_value.servers.get.side_effect = get
+        response = self.client.patch(
+            self.get_url("instances", pk="0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c90"),
+            {"status": "SHUTOFF"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(threads[0].startswith("openstack-upstream"))
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_list(self, service):
+        """Is an async collection view served, uncached?"""
+        service.return_value.volumes.get_list.return_value = []
+        response = self.client.get(self.get_url("volumes"), {"source": "live"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+        self.assertIn("no-cache", response["Cache-Control"])
+        service.return_value.volumes.get_list.assert_called_once()
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_list_is_conditional(self, service):
+        """Is an unchanged async collection answered 304 Not Modified, for a matching ETag?"""
+        service.return_value.volumes.get_list.return_value = []
+        url = self.get_url("volumes")
+        etag = self.client.get(url, {"source": "live"})["ETag"]
+        response = self.client.get(url, {"source": "live"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_errors(self, service):
+        """Are permission, openstack & circuit breaker errors handled as for sync views?"""
+        service.return_value.volumes.get_list.side_effect = Exception("Unavailable")
+        response = self.client.get(self.get_url("volumes"), {"source": "live"})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        service.return_value.volumes.get_list.side_effect = CircuitOpen()
+        response = self.client.get(self.get_url("volumes"), {"source": "live"})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        self.client.force_login(user=UserFactory())
+        response = self.client.get(self.get_url("volumes"), {"source": "live"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_detail_is_read_only(self, service):
+        """Is a detail GET served without writing to the mirror?"""
+        volume_id = "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c90"
+        with mock.patch.object(VolumeDetailView, "serialize", return_value={}):
+            response = self.client.get(self.get_url("volumes", pk=volume_id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(CachedVolume.objects.exists())
+
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_local_errors_are_not_openstack_errors(self, service):
+        """Are local (e.g. database) errors raised as such, not reported as openstack errors?"""
+        volume_id = "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c90"
+        with mock.patch.object(
+            VolumeDetailView, "serialize", side_effect=DatabaseError("locked")
+        ):
+            with self.assertRaises(DatabaseError):
+                self.client.get(self.get_url("volumes", pk=volume_id))
+
+    @mock.patch("openstack.api_views.slack_post_templated_message")
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_delete_instance(self, service, slack):
+        """Does deleting an instance mark its lease deleted, & notify slack?"""
+        server_id = "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c90"
+        lease = ServerLease.objects.create(
+            server_id=server_id, tenant=self.tenant, assigned_teammember=self.member
+        )
+        service.return_value.servers.delete.return_value = (None, mock.Mock())
+        response = self.client.delete(self.get_url("instances", pk=server_id))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        lease.refresh_from_db()
+        self.assertTrue(lease.deleted)
+        slack.assert_called_once()
+
+    def test_upstream_calls_are_concurrent(self):
+        """Are upstream calls awaited concurrently, in the upstream executor?"""
+        barrier = threading.Barrier(5, timeout=5)  # broken unless all 5 wait at once
+
+        async def call_all():
+            return await asyncio.gather(
+                *[call_upstream(barrier.wait) for _n in range(5)]
+            )
+
+        self.assertEqual(sorted(async_to_sync(call_all)()), list(range(5)))
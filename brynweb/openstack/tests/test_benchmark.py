@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from ..benchmark import (
+    ENDPOINTS,
+    Recorder,
+    compare_to_baseline,
+    percentile,
+    run_benchmark,
+    seed_fleet,
+)
+from ..fake import reset_fake_clouds
+from ..models import ServerLease, Tenant
+
+FAKE_SETTINGS = {"LATENCY_SECONDS": 0, "LATENCY_JITTER_SECONDS": 0}
+
+
+def endpoint_results(p95_ms=10, mean_queries=5, errors=0):
+    return {
+        "requests": 100,
+        "errors": errors,
+        "throughput": 50,
+        "p50_ms": 5,
+        "p95_ms": p95_ms,
+        "p99_ms": 20,
+        "mean_queries": mean_queries,
+    }
+
+
+class TestBenchmarkStats(SimpleTestCase):
+    def test_percentile(self):
+        """Are nearest-rank percentiles returned?"""
+        values = list(range(100, 0, -1))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
+        self.assertIsNone(percentile([], 50))
+
+    def test_non_2xx_are_errors(self):
+        """Are all non-2xx responses counted as errors?"""
+        recorder = Recorder()
+        for status_code in (200, 204, 302, 404, 500):
+            recorder.record("team_list", 0.01, 1, status_code)
+        summary = recorder.summary(1)
+        self.assertEqual(summary["endpoints"]["team_list"]["errors"], 3)
+        self.assertEqual(summary["errors"], 3)
+
+    def test_compare_to_baseline(self):
+        """Are regressions beyond tolerance, & any extra queries, flagged?"""
+        baseline = {
+            "throughput": 100,
+            "endpoints": {
+                "team_list": endpoint_results(),
+                "tenant_list": endpoint_results(),
+            },
+        }
+        results = {
+            "throughput": 90,
+            "endpoints": {
+                "team_list": endpoint_results(p95_ms=11),
+                "tenant_list": endpoint_results(p95_ms=13, mean_queries=6, errors=5),
+                "volume_list": endpoint_results(),  # not in baseline
+            },
+        }
+        regressed = {
+            (endpoint, metric)
+            for endpoint, metric, _previous, _current, is_regression in compare_to_baseline(
+                results, baseline, tolerance=0.2
+            )
+            if is_regression
+        }
+        self.assertEqual(
+            regressed,
+            {
+                ("tenant_list", "p95_ms"),
+                ("tenant_list", "mean_queries"),
+                ("tenant_list", "error_rate"),
+            },
+        )
+
+
+class TestBenchmarkRun(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_fake_clouds()
+
+    def tearDown(self):
+        reset_fake_clouds()
+
+    def test_seed_fleet(self):
+        """Are teams, members, tenants, servers & leases seeded?"""
+        fleet = seed_fleet(teams=3, members=2, servers=2, fake_settings=FAKE_SETTINGS)
+        self.assertEqual(len(fleet.teams), 3)
+        for entry in fleet.teams:
+            self.assertEqual(len(entry["members"]), 2)
+            self.assertTrue(entry["members"][0].is_admin)
+            self.assertEqual(len(fleet.servers[entry["tenant"].pk]), 2)
+        self.assertEqual(Tenant.objects.count(), 3)
+        self.assertEqual(ServerLease.objects.count(), 6)
+
+    def test_run_benchmark(self):
+        """Are all endpoints exercised without errors, & their stats reported?"""
+        fleet = seed_fleet(teams=2, members=2, servers=2, fake_settings=FAKE_SETTINGS)
+        results = run_benchmark(fleet, requests=60, concurrency=1, seed=1)
+        self.assertEqual(results["requests"], 60)
+        self.assertEqual(set(results["endpoints"]), set(ENDPOINTS))
+        for endpoint, stats in results["endpoints"].items():
+            self.assertEqual(stats["errors"], 0, endpoint)
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+            self.assertGreater(stats["mean_queries"], 0)
+
+
+class TestConcurrentBenchmarkCommand(SimpleTestCase):
+    def test_concurrent_run(self):
+        """
+        With concurrent requests, are all endpoints served without errors? Run as a command,
+        in its own process, so threads share a file database as in deployment (the test
+        runner's in-memory sqlite database can't be written concurrently).
+        """
+        result = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(settings.BASE_DIR, "manage.py"),
+                "benchmark_api",
+                "--teams=2",
+                "--members=2",
+                "--servers=2",
+                "--requests=120",
+                "--concurrency=4",
+                "--seed=1",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+        # The command fails if any response isn't 2xx
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn("Total: 120 requests", result.stdout)
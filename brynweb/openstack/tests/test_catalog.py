@@ -0,0 +1,111 @@
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from ..catalog import TTL, RegionCatalog
+
+
+def get_openstack_mock():
+    openstack = mock.Mock(tenant=None)  # Region (admin) service
+    openstack.flavors.get_list.return_value = [
+        SimpleNamespace(id="flavor-1", name="small", ram=1024, vcpus=1)
+    ]
+    openstack.volume_types.get_list.return_value = [
+        SimpleNamespace(id="type-1", name="standard", is_default=False),
+        SimpleNamespace(id="type-2", name="fast", is_default=True),
+    ]
+    return openstack
+
+
+class TestRegionCatalog(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.region = SimpleNamespace(pk=1, name="region")
+        self.openstack = get_openstack_mock()
+
+    def test_catalog_served_from_cache(self):
+        """Is the upstream list only fetched once while fresh?"""
+        catalog = RegionCatalog(self.region, self.openstack)
+        catalog.get("flavors")
+        items, age = catalog.get("flavors")
+        self.assertEqual(items[0]["name"], "small")
+        self.assertLess(age, 1)
+        self.assertEqual(self.openstack.flavors.get_list.call_count, 1)
+
+    def test_default_volume_type(self):
+        """Is the default volume type read from the cached volume types?"""
+        catalog = RegionCatalog(self.region, self.openstack)
+        self.assertEqual(catalog.default_volume_type(), "type-2")
+        self.assertEqual(catalog.default_volume_type(), "type-2")
+        self.assertEqual(self.openstack.volume_types.get_list.call_count, 1)
+
+    def test_stale_entry_served_and_refreshed_in_background(self):
+        """Is a stale entry returned immediately, with a single background refresh queued?"""
+        catalog = RegionCatalog(self.region, self.openstack)
+        catalog.get("flavors")
+        later = time.time() + TTL + 1
+        with mock.patch(
+            "openstack.tasks.refresh_region_catalog"
+        ) as refresh, mock.patch("openstack.catalog.time.time", return_value=later):
+            _items, age = catalog.get("flavors")
+            catalog.get("flavors")
+        self.assertGreater(age, TTL)
+        refresh.assert_called_once_with(1, "flavors")
+        self.assertEqual(self.openstack.flavors.get_list.call_count, 1)
+
+    def test_invalidate(self):
+        """Does invalidation force a fetch?"""
+        catalog = RegionCatalog(self.region, self.openstack)
+        catalog.get("flavors")
+        catalog.invalidate()
+        catalog.get("flavors")
+        self.assertEqual(self.openstack.flavors.get_list.call_count, 2)
+
+    def test_private_items_are_per_tenant(self):
+        """
+        Are private flavors & images only included for their tenant, & not cached region-wide?
+        Private flavors are listed for every project, so only those with access are included.
+        """
+
+        def get_tenant_openstack(pk, private_image):
+            openstack = get_openstack_mock()
+            openstack.tenant = SimpleNamespace(pk=pk, created_tenant_id=f"project-{pk}")
+            # As for the admin role: every project's private flavors
+            openstack.flavors.get_list.side_effect = lambda is_public=True: [
+                SimpleNamespace(
+                    id="public", name="small", ram=1, vcpus=1, is_public=True
+                )
+            ] + ([] if is_public else private_flavors)
+            openstack.flavors.get_access_list.side_effect = lambda flavor: [
+                SimpleNamespace(tenant_id=f"project-{flavor.project}")
+            ]
+            openstack.images.get_list.side_effect = lambda filters=None: [
+                SimpleNamespace(id="public", name="ubuntu", visibility="public")
+            ] + ([] if filters else [private_image])
+            return openstack
+
+        private_flavors = [
+            SimpleNamespace(
+                id="a", name="large", ram=1, vcpus=1, is_public=False, project=1
+            ),
+            SimpleNamespace(
+                id="b", name="huge", ram=1, vcpus=1, is_public=False, project=2
+            ),
+        ]
+        first = get_tenant_openstack(
+            1, SimpleNamespace(id="a", name="snapshot", visibility="private")
+        )
+        second = get_tenant_openstack(
+            2, SimpleNamespace(id="b", name="shared", visibility="shared")
+        )
+        for section in ("flavors", "images"):
+            first_items, _age = RegionCatalog(self.region, first).get(section)
+            second_items, _age = RegionCatalog(self.region, second).get(section)
+            self.assertEqual([item["id"] for item in first_items], ["public", "a"])
+            self.assertEqual([item["id"] for item in second_items], ["public", "b"])
+            region_items, _age = RegionCatalog(self.region).get(section)
+            self.assertEqual([item["id"] for item in region_items], ["public"])
+        first.images.get_list.assert_any_call(filters={"visibility": "public"})
@@ -0,0 +1,109 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+from novaclient.v2.servers import Server
+
+from ..coalescing import SingleFlight, clone
+
+
+class TestSingleFlight(SimpleTestCase):
+    def call_concurrently(self, single_flight, key, func, callers=5):
+        """Call func from `callers` threads, returning results (or exceptions)"""
+        results = [None] * callers
+
+        def call(n):
+            try:
+                results[n] = single_flight.call(key, func)
+            except Exception as e:
+                results[n] = e
+
+        threads = [threading.Thread(target=call, args=(n,)) for n in range(callers)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def wait_for_coalesced(self, single_flight, count):
+        for _attempt in range(500):
+            if single_flight.stats()["coalesced"] >= count:
+                return
+            threading.Event().wait(0.01)
+
+    def blocking_func(self, result):
+        """A func which blocks until released, once every caller has joined the call"""
+        release = threading.Event()
+        func = mock.Mock(side_effect=lambda: release.wait(5) and result)
+        return func, release
+
+    def test_concurrent_calls_are_coalesced(self):
+        """Do concurrent callers share one call, each with their own copy of the result?"""
+        single_flight = SingleFlight()
+        func, release = self.blocking_func([Server(None, {"id": "1"}, loaded=True)])
+        threads, results = self.call_concurrently(single_flight, "key", func)
+        self.wait_for_coalesced(single_flight, 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        func.assert_called_once()
+        self.assertEqual([result[0].id for result in results], ["1"] * 5)
+        self.assertEqual(len({id(result[0]) for result in results}), 5)
+        stats = single_flight.stats()
+        self.assertEqual((stats["calls"], stats["coalesced"]), (1, 4))
+        self.assertEqual(stats["coalescing_rate"], 0.8)
+
+    def test_exceptions_are_shared(self):
+        """Is the exception from a coalesced call raised to every caller?"""
+        single_flight = SingleFlight()
+        release = threading.Event()
+        error = Exception("Unavailable")
+
+        def func():
+            release.wait(5)
+            raise error
+
+        threads, results = self.call_concurrently(single_flight, "key", func, 3)
+        self.wait_for_coalesced(single_flight, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [error] * 3)
+        self.assertEqual(single_flight.call("key", lambda: "ok"), "ok")
+
+    def test_sequential_calls_are_not_shared(self):
+        """Without a result TTL, are only in-flight calls shared?"""
+        single_flight = SingleFlight()
+        func = mock.Mock(return_value=[])
+        single_flight.call("key", func)
+        single_flight.call("key", func)
+        self.assertEqual(func.call_count, 2)
+
+    def test_results_are_reused_within_ttl(self):
+        """With a result TTL, are results reused, until they expire?"""
+        single_flight = SingleFlight(result_ttl=30)
+        func = mock.Mock(return_value=[])
+        single_flight.call("key", func)
+        single_flight.call("key", func)
+        single_flight.call("other", func)
+        self.assertEqual(func.call_count, 2)
+        self.assertEqual(single_flight.stats()["cached"], 1)
+
+        with mock.patch("openstack.coalescing.time.monotonic", return_value=1e12):
+            single_flight.call("key", func)
+        self.assertEqual(func.call_count, 3)
+
+    def test_disabled(self):
+        """When disabled, is every call made?"""
+        single_flight = SingleFlight(result_ttl=30, enabled=False)
+        func = mock.Mock(return_value=[])
+        single_flight.call("key", func)
+        single_flight.call("key", func)
+        self.assertEqual(func.call_count, 2)
+
+    def test_clone_resource(self):
+        """Can lazy-loading client resources be copied, without sharing attributes?"""
+        server = Server(None, {"id": "1", "flavor": {"id": "2"}}, loaded=True)
+        cloned = clone(server)
+        cloned.flavor = "transformed"
+        self.assertEqual(server.flavor, {"id": "2"})
+        self.assertEqual(cloned.id, "1")
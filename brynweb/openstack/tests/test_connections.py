@@ -0,0 +1,49 @@
+import socket
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..connections import RegionConnectionPools, RegionHTTPAdapter
+
+
+class TestRegionHTTPAdapter(SimpleTestCase):
+    def get_socket_options(self, adapter):
+        return adapter.poolmanager.connection_pool_kw["socket_options"]
+
+    def test_keepalive_socket_options(self):
+        """Is TCP keep-alive enabled, with the configured idle time, & Nagle's algorithm off?"""
+        options = self.get_socket_options(RegionHTTPAdapter(keepalive_idle=30))
+        self.assertIn((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1), options)
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), options)
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            self.assertIn((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30), options)
+
+    def test_keepalive_disabled(self):
+        """Without a keep-alive idle time, is keep-alive left off?"""
+        options = self.get_socket_options(RegionHTTPAdapter(keepalive_idle=None))
+        self.assertEqual(options, [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)])
+
+
+@mock.patch.dict(
+    "openstack.connections.POOL_SETTINGS", {"MAX_RETRIES": 3, "POOL_MAXSIZE": 5}
+)
+class TestRegionConnectionPools(SimpleTestCase):
+    def test_session_reused_per_region(self):
+        """Is one requests session (& connection pool) shared per region?"""
+        pools = RegionConnectionPools()
+        first = pools.get("region")
+        self.assertIs(pools.get("region"), first)
+        self.assertIsNot(pools.get("other"), first)
+        adapter = first.get_adapter("https://a")
+        self.assertIs(first.get_adapter("http://b"), adapter)
+        self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], 5)
+        self.assertEqual(set(pools.stats()), {"region", "other"})
+
+    def test_connect_only_retries(self):
+        """Are connection errors retried, but never requests which may have been sent?"""
+        retries = (
+            RegionConnectionPools().get("region").get_adapter("https://a").max_retries
+        )
+        self.assertEqual((retries.total, retries.connect), (3, 3))
+        self.assertEqual((retries.read, retries.status, retries.redirect), (0, 0, 0))
+        self.assertFalse(retries.is_retry("POST", status_code=503))
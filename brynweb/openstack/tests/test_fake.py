@@ -0,0 +1,190 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core import hashids
+from userdb.models import TeamMember
+from userdb.tests.factories import UserFactory
+from ..api_views import InstanceListView
+from ..fake import FakeNova, get_fake_cloud, reset_fake_clouds
+from ..leases import reconcile_region_leases
+from ..models import HypervisorStats, ServerCreationJob, ServerLease
+from ..tasks import update_hypervisor_stats
+from .factories import FixedLengthKeyPairFactory, RegionFactory, TenantFactory
+
+FAKE_SETTINGS = {
+    "LATENCY_SECONDS": 0,
+    "LATENCY_JITTER_SECONDS": 0,
+    "SEED_SERVERS": 3,
+    "REGIONS": {"fake": {}},
+}
+
+
+@mock.patch.dict("openstack.fake.FAKE_SETTINGS", FAKE_SETTINGS)
+class TestFakeBackend(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory(region=RegionFactory(name="fake"))
+        TeamMember.objects.create(team=cls.tenant.team, user=cls.user, is_admin=True)
+
+    def setUp(self):
+        reset_fake_clouds()
+        self.client.force_login(user=self.user)
+
+    def get_url(self, name, **kwargs):
+        return reverse(
+            f"api:{name}",
+            kwargs={
+                "team_id": self.tenant.team_id,
+                "tenant_id": self.tenant.id,
+                **kwargs,
+            },
+        )
+
+    def test_instances_are_listed_from_fake(self):
+        """Are a fake region's seeded servers & volumes listed through the API?"""
+        response = self.client.get(self.get_url("instances"), {"source": "live"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(item["ip"] for item in response.data))
+        response = self.client.get(self.get_url("volumes"), {"source": "live"})
+        self.assertEqual(len(response.data), 3)
+
+    @mock.patch.object(InstanceListView, "incremental", False)
+    def test_instance_list_queries_do_not_scale_with_servers(self):
+        """Are leases loaded in one query, rather than per server?"""
+
+        def count_list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    self.get_url("instances"), {"source": "live"}
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        reconcile_region_leases(self.tenant.region)
+        queries = count_list_queries()
+        get_fake_cloud("fake").seed_project(self.tenant.created_tenant_id, servers=5)
+        reconcile_region_leases(self.tenant.region)
+        self.assertEqual(ServerLease.objects.count(), 8)
+        self.assertEqual(count_list_queries(), queries)
+
+    def test_leases_are_reconciled(self):
+        """Are leases created, marked deleted & shelved to match nova, but not on GET?"""
+        cloud = get_fake_cloud("fake")
+        response = self.client.get(self.get_url("instances"), {"source": "live"})
+        self.assertIsNone(response.data[0]["lease_expiry"])
+        self.assertFalse(ServerLease.objects.exists())
+
+        counts = reconcile_region_leases(self.tenant.region)
+        self.assertEqual(counts, {"created": 3, "deleted": 0, "shelved": 0})
+        self.assertEqual(
+            set(
+                ServerLease.objects.values_list("assigned_teammember__user", flat=True)
+            ),
+            {self.user.pk},
+        )
+
+        servers = cloud.client(FakeNova, self.tenant.created_tenant_id).servers.list()
+        servers[0].shelve()
+        cloud.delete_server(cloud.servers[servers[1].id])
+        counts = reconcile_region_leases(self.tenant.region)
+        self.assertEqual(counts, {"created": 0, "deleted": 1, "shelved": 1})
+        self.assertTrue(ServerLease.objects.get(server_id=servers[0].id).shelved)
+        self.assertTrue(ServerLease.objects.get(server_id=servers[1].id).deleted)
+        self.assertEqual(ServerLease.objects.active().count(), 1)
+
+    def test_state_transitions_are_stateful(self):
+        """Does a server stopped through the API stay stopped?"""
+        response = self.client.get(self.get_url("instances"), {"source": "live"})
+        server_id = response.data[0]["id"]
+        response = self.client.patch(
+            self.get_url("instances", pk=server_id), {"status": "SHUTOFF"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(self.get_url("instances", pk=server_id))
+        self.assertEqual(response.data["status"], "SHUTOFF")
+
+    def test_servers_without_leases(self):
+        """Can servers without a lease (yet) be shelved, reassigned, requested & deleted?"""
+        response = self.client.get(self.get_url("instances"), {"source": "live"})
+        server_ids = [item["id"] for item in response.data]
+        self.assertFalse(ServerLease.objects.exists())
+
+        response = self.client.patch(
+            self.get_url("instances", pk=server_ids[0]), {"status": "SHELVED"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ServerLease.objects.exists())
+
+        teammember = TeamMember.objects.create(
+            team=self.tenant.team, user=UserFactory()
+        )
+        response = self.client.patch(
+            self.get_url("instances", pk=server_ids[1]),
+            {"lease_assigned_teammember": hashids.encode(teammember.pk)},
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        lease = ServerLease.objects.get(server_id=server_ids[1])
+        self.assertEqual(lease.assigned_teammember, teammember)
+
+        response = self.client.post(
+            self.get_url("lease_requests", instance_id=server_ids[2]),
+            {"message": "More time, please"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        lease = ServerLease.objects.get(server_id=server_ids[2])
+        self.assertEqual(lease.assigned_teammember.user, self.user)  # team admin
+
+        response = self.client.delete(self.get_url("instances", pk=server_ids[0]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_lease_request_for_unknown_server(self):
+        """Is a lease request for a server not in the tenant not found?"""
+        for instance_id in ("unknown", "0b5d6b1c-8f7e-4a2b-9d3c-4e5f6a7b8c9d"):
+            response = self.client.post(
+                self.get_url("lease_requests", instance_id=instance_id),
+                {"message": "More time, please"},
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(ServerLease.objects.exists())
+
+    def test_server_creation(self):
+        """Can a server be created (with keypair & boot volume) in a fake region?"""
+        user = UserFactory()
+        TeamMember.objects.create(team=self.tenant.team, user=user)
+        self.client.force_login(user=user)
+        keypair = FixedLengthKeyPairFactory(user=user)
+        data = {
+            "name": "server",
+            "flavor": get_fake_cloud("fake").flavors[0]["id"],
+            "image": get_fake_cloud("fake").images[0]["id"],
+            "keypair": str(keypair.id),
+        }
+        response = self.client.post(self.get_url("instances"), data)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ServerCreationJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, ServerCreationJob.Status.COMPLETE)
+        self.assertEqual(get_fake_cloud("fake").stats()["servers"], 4)
+
+    def test_errors_are_injected(self):
+        """Do calls fail at the configured (per call) error rate?"""
+        cloud = get_fake_cloud("fake")
+        cloud.settings["CALLS"] = {"nova.servers.list": {"ERROR_RATE": 1}}
+        response = self.client.get(self.get_url("instances"), {"source": "live"})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        response = self.client.get(self.get_url("volumes"), {"source": "live"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cloud.stats()["errors"], 1)
+
+    def test_hypervisor_stats(self):
+        """Are hypervisor statistics derived from the fake's servers?"""
+        self.client.get(self.get_url("instances"), {"source": "live"})
+        update_hypervisor_stats()
+        stats = HypervisorStats.objects.get(region=self.tenant.region)
+        self.assertEqual(stats.running_vms, 3)
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+
+from ..inventory import RegionInventory
+from .factories import RegionFactory, TenantFactory
+
+
+def get_paginated_list_mock(resources, max_limit=None):
+    """
+    Mock a novaclient/cinderclient list method, paginated by marker & limit; pages are capped
+    at max_limit, as by nova & cinder's osapi_max_limit.
+    """
+
+    def list_func(marker=None, limit=None, **kwargs):
+        ids = [resource.id for resource in resources]
+        start = ids.index(marker) + 1 if marker else 0
+        return resources[start : start + min(limit, max_limit or limit)]
+
+    return mock.Mock(side_effect=list_func)
+
+
+class TestRegionInventory(TestCase):
+    def setUp(self):
+        self.region = RegionFactory()
+        self.tenant_a = TenantFactory(region=self.region)
+        self.tenant_b = TenantFactory(region=self.region)
+        servers = [
+            SimpleNamespace(id=f"server{n}", tenant_id=tenant.created_tenant_id)
+            for n, tenant in enumerate([self.tenant_a] * 3 + [self.tenant_b] * 2)
+        ]
+        servers.append(SimpleNamespace(id="server-x", tenant_id="other-project"))
+        volumes = [
+            SimpleNamespace(
+                id="volume0",
+                **{"os-vol-tenant-attr:tenant_id": self.tenant_b.created_tenant_id},
+            )
+        ]
+        self.openstack = mock.Mock()
+        self.openstack.nova.servers.list = get_paginated_list_mock(servers)
+        self.openstack.cinder.volumes.list = get_paginated_list_mock(volumes)
+
+    def test_pagination_markers_followed(self):
+        """Are all pages listed, once per region rather than once per tenant?"""
+        inventory = RegionInventory(self.region, self.openstack, page_size=2)
+        servers = list(inventory.list_servers())
+        self.assertEqual(len(servers), 6)
+        self.assertEqual(self.openstack.nova.servers.list.call_count, 4)
+        _args, kwargs = self.openstack.nova.servers.list.call_args
+        self.assertEqual(kwargs["marker"], "server-x")
+        self.assertEqual(kwargs["search_opts"], {"all_tenants": True})
+
+    def test_pages_capped_by_server(self):
+        """Are all pages listed, where the server's page limit is below the page size?"""
+        servers = [SimpleNamespace(id=f"server{n}", tenant_id="") for n in range(5)]
+        self.openstack.nova.servers.list = get_paginated_list_mock(servers, max_limit=2)
+        inventory = RegionInventory(self.region, self.openstack, page_size=500)
+        self.assertEqual(len(list(inventory.list_servers())), 5)
+
+    def test_resources_partitioned_by_tenant(self):
+        """Are servers & volumes partitioned by tenant project id?"""
+        inventory = RegionInventory(self.region, self.openstack, page_size=2).collect()
+        self.assertEqual(len(inventory.servers_for_tenant(self.tenant_a)), 3)
+        self.assertEqual(len(inventory.servers_for_tenant(self.tenant_b)), 2)
+        self.assertEqual(inventory.volumes_for_tenant(self.tenant_a), [])
+        self.assertEqual(len(inventory.volumes_for_tenant(self.tenant_b)), 1)
+        self.assertEqual(
+            inventory.summary(),
+            {
+                "tenants": 2,
+                "servers": 5,
+                "volumes": 1,
+                "unmatched_servers": 1,
+                "unmatched_volumes": 0,
+            },
+        )
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from userdb.tests.factories import UserFactory
+from ..service import ServersService
+
+
+class TestServiceMetrics(TestCase):
+    def get_sample(self, name, method):
+        labels = {"region": "metrics-region", "service": "servers", "method": method}
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def setUp(self):
+        self.openstack = mock.Mock()
+        self.openstack.region.name = "metrics-region"
+        self.servers = ServersService(self.openstack)
+
+    def test_calls_are_timed(self):
+        """Are sub-service calls counted in the latency histogram, by region & method?"""
+        before = self.get_sample("bryn_openstack_call_duration_seconds_count", "get")
+        self.servers.get("server-id")
+        after = self.get_sample("bryn_openstack_call_duration_seconds_count", "get")
+        self.assertEqual(after - before, 1)
+        self.assertEqual(self.get_sample("bryn_openstack_call_in_progress", "get"), 0)
+
+    def test_errors_are_counted(self):
+        """Are exceptions counted as errors, & re-raised?"""
+        self.openstack.nova.servers.list.side_effect = Exception("timeout")
+        before = self.get_sample("bryn_openstack_call_errors_total", "get_list")
+        with self.assertRaises(Exception):
+            self.servers.get_list()
+        after = self.get_sample("bryn_openstack_call_errors_total", "get_list")
+        self.assertEqual(after - before, 1)
+
+
+class TestMetricsView(TestCase):
+    def test_anon_user_cannot_view_metrics(self):
+        """Are metrics forbidden without staff login or bearer token?"""
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_can_view_metrics(self):
+        """Can staff view metrics in prometheus text format?"""
+        self.client.force_login(user=UserFactory(is_staff=True))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"bryn_openstack_call_duration_seconds", response.content)
+
+    @override_settings(METRICS_BEARER_TOKEN="secret")
+    def test_bearer_token_can_view_metrics(self):
+        """Can metrics be scraped with the bearer token (& only the correct token)?"""
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer x")
+        self.assertEqual(response.status_code, 403)
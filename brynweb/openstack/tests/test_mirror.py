@@ -0,0 +1,248 @@
+import datetime
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from userdb.models import TeamMember
+from userdb.tests.factories import UserFactory
+from ..api_views import InstanceListView
+from ..mirror import server_mirror, volume_mirror
+from ..models import CachedServer, CachedVolume
+from ..service import ServersService
+from .factories import TenantFactory
+
+SERVER_IDS = [
+    "9a3c9d1e-1b7e-4c1a-8d0e-000000000001",
+    "9a3c9d1e-1b7e-4c1a-8d0e-000000000002",
+    "9a3c9d1e-1b7e-4c1a-8d0e-000000000003",
+]
+
+
+def get_server(server_id, name="server", status="ACTIVE"):
+    return SimpleNamespace(
+        id=server_id,
+        name=name,
+        status=status,
+        flavor={"id": "flavor-1"},
+        addresses={"public": [{"addr": "10.0.0.1"}]},
+        created="2021-05-01T12:00:00Z",
+        updated="2021-05-01T12:00:00Z",
+    )
+
+
+class TestMirror(APITestCase):
+    def setUp(self):
+        self.tenant = TenantFactory()
+
+    def test_read_before_sync(self):
+        """Is an unsynced tenant distinguished from one without servers?"""
+        self.assertEqual(server_mirror.read(self.tenant), (None, None))
+        server_mirror.sync_tenant(self.tenant, [], timezone.now())
+        data, last_synced = server_mirror.read(self.tenant)
+        self.assertEqual(data, [])
+        self.assertIsNotNone(last_synced)
+
+    def test_sync_creates_updates_and_removes(self):
+        """Does a sync replace the mirrored servers for the tenant?"""
+        server_mirror.sync_tenant(
+            self.tenant,
+            [get_server(SERVER_IDS[0]), get_server(SERVER_IDS[1])],
+            timezone.now(),
+        )
+        counts = server_mirror.sync_tenant(
+            self.tenant,
+            [get_server(SERVER_IDS[1], status="SHUTOFF"), get_server(SERVER_IDS[2])],
+            timezone.now(),
+        )
+        self.assertEqual(counts, {"created": 1, "updated": 1, "removed": 1})
+        self.assertEqual(
+            set(CachedServer.objects.values_list("status", flat=True)),
+            {"SHUTOFF", "ACTIVE"},
+        )
+        cached = CachedServer.objects.get(pk=SERVER_IDS[1])
+        self.assertEqual(cached.ip, "10.0.0.1")
+        self.assertEqual(cached.flavor, "flavor-1")
+
+    def test_optimistic_writes_survive_earlier_listing(self):
+        """Are rows written after a listing started left untouched by its sync?"""
+        listed_at = timezone.now() - datetime.timedelta(seconds=5)
+        server_mirror.record(self.tenant, get_server(SERVER_IDS[0], status="BUILD"))
+        server_mirror.sync_tenant(self.tenant, [], listed_at)
+        self.assertTrue(CachedServer.objects.filter(pk=SERVER_IDS[0]).exists())
+
+    def test_volume_fields(self):
+        """Are volume names & bootable flags normalised as in live responses?"""
+        volume = SimpleNamespace(
+            id=SERVER_IDS[0],
+            name=f"{self.tenant.created_tenant_name}data",
+            size=10,
+            status="available",
+            bootable="true",
+            volume_type="standard",
+            attachments=[],
+            created_at="2021-05-01T12:00:00.000000",
+            updated_at=None,
+        )
+        volume_mirror.record(self.tenant, volume)
+        cached = CachedVolume.objects.get(pk=SERVER_IDS[0])
+        self.assertEqual(cached.name, "data")
+        self.assertTrue(cached.bootable)
+        self.assertTrue(timezone.is_aware(cached.created_at))
+
+
+class TestMirrorReadAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory()
+        TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+        server_mirror.sync_tenant(
+            cls.tenant, [get_server(SERVER_IDS[0], name="mirrored")], timezone.now()
+        )
+
+    def test_instance_list_served_from_mirror(self):
+        """Is the instance list served from the mirror, with a last synced marker?"""
+        self.client.force_login(user=self.user)
+        response = self.client.get(
+            reverse(
+                "api:instances",
+                kwargs={"team_id": self.tenant.team_id, "tenant_id": self.tenant.id},
+            ),
+            {"source": "mirror"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("X-Last-Synced", response)
+        self.assertEqual(response.data[0]["name"], "mirrored")
+        self.assertEqual(response.data[0]["ip"], "10.0.0.1")
+
+    @mock.patch.object(InstanceListView, "incremental", False)
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_instance_list_live_by_default(self, service):
+        """Without ?source, is the instance list served live (not possibly stale)?"""
+        service.return_value.servers.get_list.return_value = []
+        self.client.force_login(user=self.user)
+        response = self.client.get(
+            reverse(
+                "api:instances",
+                kwargs={"team_id": self.tenant.team_id, "tenant_id": self.tenant.id},
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Last-Synced", response)
+        self.assertEqual(response.data, [])
+
+
+class TestIncrementalServerSync(APITestCase):
+    def setUp(self):
+        self.tenant = TenantFactory()
+        self.openstack = mock.Mock()
+        self.openstack.servers.get_list.return_value = [
+            get_server(SERVER_IDS[0]),
+            get_server(SERVER_IDS[1]),
+        ]
+
+    def test_initial_sync_is_full(self):
+        """Without a high-water mark, are all servers listed & the mark set from nova?"""
+        changed = server_mirror.sync_changes(self.tenant, self.openstack)
+        self.assertEqual(len(changed), 2)
+        self.openstack.servers.get_changes_since.assert_not_called()
+        self.assertEqual(
+            server_mirror.get_changes_since(self.tenant),
+            datetime.datetime(2021, 5, 1, 12, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_changes_merged(self):
+        """Are changed servers updated, new servers added & deleted servers removed?"""
+        server_mirror.sync_changes(self.tenant, self.openstack)
+        changed_server = get_server(SERVER_IDS[1], status="SHUTOFF")
+        changed_server.updated = "2021-05-02T12:00:00Z"
+        self.openstack.servers.get_changes_since.return_value = [
+            get_server(SERVER_IDS[0], status="DELETED"),
+            changed_server,
+            get_server(SERVER_IDS[2]),
+        ]
+        changed = server_mirror.sync_changes(self.tenant, self.openstack)
+
+        self.openstack.servers.get_changes_since.assert_called_once_with(
+            datetime.datetime(2021, 5, 1, 12, tzinfo=datetime.timezone.utc)
+        )
+        self.assertEqual([server.id for server in changed], SERVER_IDS[1:])
+        self.assertEqual(
+            dict(CachedServer.objects.values_list("id", "status")),
+            {uuid.UUID(SERVER_IDS[1]): "SHUTOFF", uuid.UUID(SERVER_IDS[2]): "ACTIVE"},
+        )
+        self.assertEqual(
+            server_mirror.get_changes_since(self.tenant),
+            datetime.datetime(2021, 5, 2, 12, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_sync_sets_mark(self):
+        """Does a (periodic) mirror sync set the high-water mark from nova?"""
+        server_mirror.sync_tenant(
+            self.tenant, iter(self.openstack.servers.get_list()), timezone.now()
+        )
+        self.assertEqual(
+            server_mirror.get_changes_since(self.tenant),
+            datetime.datetime(2021, 5, 1, 12, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_read_changes(self):
+        """Are changes merged with the mirrored servers, without writing to the mirror?"""
+        server_mirror.sync_changes(self.tenant, self.openstack)
+        changes = [
+            get_server(SERVER_IDS[0], status="DELETED"),
+            get_server(SERVER_IDS[1], status="SHUTOFF"),
+            get_server(SERVER_IDS[2], name="new"),
+        ]
+        with self.assertNumQueries(2):  # servers, leases
+            data = server_mirror.read_changes(self.tenant, changes)
+        self.assertEqual(
+            {item["id"]: item["status"] for item in data},
+            {SERVER_IDS[1]: "SHUTOFF", SERVER_IDS[2]: "ACTIVE"},
+        )
+        self.assertEqual(
+            set(CachedServer.objects.values_list("status", flat=True)), {"ACTIVE"}
+        )
+        self.assertEqual(CachedServer.objects.count(), 2)
+
+    @mock.patch.object(InstanceListView, "incremental", True)
+    @mock.patch("openstack.api_views.OpenstackService")
+    def test_incremental_list(self, service):
+        """Are live listings of synced tenants fetched incrementally?"""
+        user = UserFactory()
+        TeamMember.objects.create(team=self.tenant.team, user=user)
+        self.client.force_login(user=user)
+        url = reverse(
+            "api:instances",
+            kwargs={"team_id": self.tenant.team_id, "tenant_id": self.tenant.id},
+        )
+        service.return_value.servers.get_list.return_value = []
+        self.client.get(url)  # Unsynced: listed in full
+        service.return_value.servers.get_changes_since.assert_not_called()
+
+        server_mirror.sync_tenant(
+            self.tenant, self.openstack.servers.get_list(), timezone.now()
+        )
+        service.return_value.servers.get_changes_since.return_value = [
+            get_server(SERVER_IDS[0], status="SHUTOFF")
+        ]
+        response = self.client.get(url)
+        self.assertEqual(
+            {item["id"]: item["status"] for item in response.data},
+            {SERVER_IDS[0]: "SHUTOFF", SERVER_IDS[1]: "ACTIVE"},
+        )
+        self.assertEqual(CachedServer.objects.get(pk=SERVER_IDS[0]).status, "ACTIVE")
+
+    def test_service_requests_changes_since(self):
+        """Does the servers service pass the high-water mark to nova?"""
+        openstack = mock.Mock()
+        since = datetime.datetime(2021, 5, 1, 12, tzinfo=datetime.timezone.utc)
+        ServersService(openstack).get_changes_since(since)
+        openstack.nova.servers.list.assert_called_once_with(
+            detailed=True, search_opts={"changes-since": "2021-05-01T12:00:00+00:00"}
+        )
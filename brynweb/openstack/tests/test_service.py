@@ -0,0 +1,204 @@
+import sys
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from keystoneauth1 import exceptions as keystone_exceptions
+from keystoneauth1 import session as keystonesession
+from novaclient import exceptions as nova_exceptions
+from prometheus_client import REGISTRY
+
+from ..models import TenantKeyPair
+from ..service import (
+    BreakerSession,
+    CircuitBreaker,
+    CircuitOpen,
+    KeypairsService,
+    get_fake_cloud,
+)
+from ..sessions import session_pool
+from .factories import FixedLengthKeyPairFactory, TenantFactory
+
+
+class TestKeypairsService(TestCase):
+    def setUp(self):
+        self.tenant = TenantFactory()
+        self.keypair = FixedLengthKeyPairFactory()
+        self.openstack = mock.Mock(tenant=self.tenant)
+        self.service = KeypairsService(self.openstack)
+
+    def test_indexed_keypair_is_not_fetched(self):
+        """Is an indexed keypair used without calling nova?"""
+        TenantKeyPair.objects.create(tenant=self.tenant, keypair=self.keypair)
+        self.service.find_or_create(str(self.keypair.id), self.keypair.public_key)
+        self.openstack.nova.keypairs.get.assert_not_called()
+        self.openstack.nova.keypairs.create.assert_not_called()
+        self.openstack.nova.keypairs.list.assert_not_called()
+
+    def test_existing_keypair_is_indexed(self):
+        """Is a keypair already in nova indexed, without being created?"""
+        self.service.find_or_create(str(self.keypair.id), self.keypair.public_key)
+        self.openstack.nova.keypairs.get.assert_called_once_with(str(self.keypair.id))
+        self.openstack.nova.keypairs.create.assert_not_called()
+        self.assertTrue(
+            TenantKeyPair.objects.filter(
+                tenant=self.tenant, keypair=self.keypair
+            ).exists()
+        )
+
+    def test_missing_keypair_is_created_and_indexed(self):
+        """Is a keypair missing from nova created, then indexed?"""
+        self.openstack.nova.keypairs.get.side_effect = nova_exceptions.NotFound(404)
+        self.service.find_or_create(str(self.keypair.id), self.keypair.public_key)
+        self.openstack.nova.keypairs.create.assert_called_once_with(
+            name=str(self.keypair.id), public_key=self.keypair.public_key
+        )
+        self.assertEqual(TenantKeyPair.objects.count(), 1)
+
+    def test_index_is_per_tenant(self):
+        """Is a keypair indexed for one tenant looked up again for another?"""
+        TenantKeyPair.objects.create(tenant=TenantFactory(), keypair=self.keypair)
+        self.service.find_or_create(str(self.keypair.id), self.keypair.public_key)
+        self.openstack.nova.keypairs.get.assert_called_once()
+
+
+class TestCircuitBreaker(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("region", "compute")
+        self.threshold = self.breaker.settings["FAILURE_THRESHOLD"]
+
+    def trip(self, breaker):
+        for _n in range(breaker.settings["FAILURE_THRESHOLD"]):
+            breaker.record_failure()
+
+    def test_breaker_opens_after_threshold(self):
+        """Does the breaker open (& fail fast) after consecutive failures?"""
+        for _n in range(self.threshold - 1):
+            self.breaker.record_failure()
+        self.breaker.before_request()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before_request()
+
+    def test_success_resets_failures(self):
+        """Are failures only counted while consecutive?"""
+        for _n in range(self.threshold - 1):
+            self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_concurrent_failures_are_counted(self):
+        """Are failures recorded concurrently all counted (with an atomic incr)?"""
+        threads = [
+            threading.Thread(target=self.breaker.record_failure)
+            for _n in range(self.threshold - 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.get(self.breaker.failures_key), self.threshold - 1)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open_allows_single_probe(self):
+        """Once reset, is a single probe let through, which closes the breaker?"""
+        self.trip(self.breaker)
+        cache.delete(self.breaker.open_key)  # reset timeout elapsed
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.breaker.before_request()
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before_request()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breakers_are_separate_per_region_and_service(self):
+        """Does an open breaker leave other regions & services unaffected?"""
+        self.trip(self.breaker)
+        CircuitBreaker("other", "compute").before_request()
+        CircuitBreaker("region", "image").before_request()
+        self.assertEqual(
+            CircuitBreaker.get_states("region", ["compute", "image"]),
+            {"compute": CircuitBreaker.OPEN, "image": CircuitBreaker.CLOSED},
+        )
+
+
+@mock.patch.object(keystonesession.Session, "request")
+class TestBreakerSession(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = BreakerSession("region")
+        self.compute = {"service_type": "compute"}
+
+    def test_timeouts_are_set(self, request):
+        """Are the configured connect & read timeouts passed to requests?"""
+        request.return_value = mock.Mock(status_code=200)
+        self.session.request("/servers", "GET", endpoint_filter=self.compute)
+        settings = self.session.breaker_settings
+        self.assertEqual(
+            request.call_args[1]["timeout"],
+            (settings["CONNECT_TIMEOUT_SECONDS"], settings["READ_TIMEOUT_SECONDS"]),
+        )
+
+    def test_failures_open_breaker(self, request):
+        """Do connection failures & 5xx responses open the service's breaker?"""
+        breaker = CircuitBreaker("region", "compute")
+        request.return_value = mock.Mock(status_code=503)
+        for _n in range(breaker.settings["FAILURE_THRESHOLD"] - 1):
+            self.session.request("/servers", "GET", endpoint_filter=self.compute)
+        request.side_effect = keystone_exceptions.ConnectTimeout()
+        with self.assertRaises(keystone_exceptions.ConnectTimeout):
+            self.session.request("/servers", "GET", endpoint_filter=self.compute)
+
+        request.reset_mock()
+        with self.assertRaises(CircuitOpen):
+            self.session.request("/servers", "GET", endpoint_filter=self.compute)
+        request.assert_not_called()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_client_errors_do_not_open_breaker(self, request):
+        """Are 4xx responses treated as success?"""
+        request.return_value = mock.Mock(status_code=404)
+        breaker = CircuitBreaker("region", "compute")
+        for _n in range(breaker.settings["FAILURE_THRESHOLD"]):
+            self.session.request("/servers", "GET", endpoint_filter=self.compute)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @mock.patch.object(session_pool, "invalidate")
+    def test_unauthorized_session_is_invalidated(self, invalidate, request):
+        """Is a pooled session discarded from the pool, if a request is unauthorized?"""
+        session = BreakerSession("region", pool_key=("region", "project", "user"))
+        request.return_value = mock.Mock(status_code=200)
+        session.request("/servers", "GET", endpoint_filter=self.compute)
+        invalidate.assert_not_called()
+
+        request.return_value = mock.Mock(status_code=401)
+        session.request("/servers", "GET", endpoint_filter=self.compute)
+        request.side_effect = keystone_exceptions.Unauthorized()
+        with self.assertRaises(keystone_exceptions.Unauthorized):
+            session.request("/servers", "GET", endpoint_filter=self.compute)
+        invalidate.assert_called_with(("region", "project", "user"), session=session)
+        self.assertEqual(invalidate.call_count, 2)
+
+    def test_requests_are_timed_by_service_type(self, request):
+        """Are upstream requests timed by keystone service type & HTTP method?"""
+        request.return_value = mock.Mock(status_code=200)
+        labels = {"region": "region", "service": "compute", "method": "GET"}
+        name = "bryn_openstack_api_request_duration_seconds_count"
+        before = REGISTRY.get_sample_value(name, labels) or 0
+        self.session.request("/servers", "GET", endpoint_filter=self.compute)
+        self.assertEqual(REGISTRY.get_sample_value(name, labels) - before, 1)
+
+
+class TestFakeBackend(SimpleTestCase):
+    @mock.patch.dict("openstack.service.FAKE_BACKEND_SETTINGS", {"REGIONS": {}})
+    def test_fake_not_imported_unless_configured(self):
+        """Without fake regions, is the fake backend left unimported?"""
+        with mock.patch.dict(sys.modules):
+            sys.modules.pop("openstack.fake", None)
+            self.assertIsNone(get_fake_cloud("region"))
+            self.assertNotIn("openstack.fake", sys.modules)
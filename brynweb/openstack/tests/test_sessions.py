@@ -0,0 +1,121 @@
+import datetime
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from keystoneauth1 import access
+from keystoneauth1.identity.base import BaseIdentityPlugin
+
+from ..sessions import SessionPool
+from ..token_cache import TokenCache
+
+
+class FakeAuth(BaseIdentityPlugin):
+    """Auth plugin issuing tokens with a fixed lifetime, without calling keystone"""
+
+    def __init__(self, lifetime):
+        super().__init__(auth_url="http://keystone.invalid/v3")
+        self.lifetime = lifetime
+        self.issued = 0
+
+    def get_auth_ref(self, session, **kwargs):
+        self.issued += 1
+        expires_at = (timezone.now() + self.lifetime).isoformat()
+        body = {"token": {"expires_at": expires_at, "methods": ["password"]}}
+        return access.create(body=body, auth_token=f"token-{self.issued}")
+
+
+class TestSessionPool(SimpleTestCase):
+    def test_session_is_reused_for_key(self):
+        """Is a single session (and token) shared by all users of a key?"""
+        pool = SessionPool()
+        auth = FakeAuth(datetime.timedelta(hours=1))
+        first = pool.get(("region", "project"), lambda: auth)
+        second = pool.get(("region", "project"), lambda: FakeAuth(None))
+        self.assertIs(first, second)
+        self.assertEqual(auth.issued, 1)
+        self.assertEqual(pool.stats()["hits"], 1)
+
+    def test_sessions_are_separate_per_key(self):
+        """Do different projects get their own sessions?"""
+        pool = SessionPool()
+        first = pool.get(("region", "a"), lambda: FakeAuth(datetime.timedelta(hours=1)))
+        second = pool.get(
+            ("region", "b"), lambda: FakeAuth(datetime.timedelta(hours=1))
+        )
+        self.assertIsNot(first, second)
+
+    def test_token_refreshed_ahead_of_expiry(self):
+        """Is a token due to expire within the refresh margin renewed on checkout?"""
+        pool = SessionPool(refresh_margin=300)
+        auth = FakeAuth(datetime.timedelta(seconds=200))
+        pool.get(("region", "project"), lambda: auth)
+        pool.get(("region", "project"), lambda: auth)
+        self.assertEqual(auth.issued, 2)
+        self.assertEqual(pool.stats()["refreshes"], 1)
+
+    def test_idle_sessions_are_evicted(self):
+        """Are sessions unused for longer than the idle timeout evicted?"""
+        pool = SessionPool(idle_timeout=0)
+        pool.get(("region", "project"), lambda: FakeAuth(datetime.timedelta(hours=1)))
+        self.assertEqual(pool.evict_idle(), 1)
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_invalidated_session_is_replaced(self):
+        """Is an invalidated session discarded, but not a replacement for it?"""
+        pool = SessionPool()
+        key = ("region", "project")
+        first = pool.get(key, lambda: FakeAuth(datetime.timedelta(hours=1)))
+        pool.invalidate(key, session=first)
+        second = pool.get(key, lambda: FakeAuth(datetime.timedelta(hours=1)))
+        self.assertIsNot(first, second)
+        pool.invalidate(key, session=first)  # stale
+        self.assertIs(pool.get(key, lambda: None), second)
+        self.assertEqual(pool.stats()["invalidations"], 1)
+
+
+class FakeRedis:
+    """Minimal stand-in for the redis client methods used by TokenCache"""
+
+    class Lock:
+        def acquire(self):
+            return True
+
+        def release(self):
+            pass
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+
+    def lock(self, name, **kwargs):
+        return self.Lock()
+
+
+class TestTokenCache(SimpleTestCase):
+    def test_token_shared_between_pools(self):
+        """Does a second process (pool) reuse a token cached by the first?"""
+        token_cache = TokenCache(FakeRedis())
+        key = ("region", "project", "user")
+        first_auth = FakeAuth(datetime.timedelta(hours=1))
+        second_auth = FakeAuth(datetime.timedelta(hours=1))
+        SessionPool(token_cache=token_cache).get(key, lambda: first_auth)
+        pool = SessionPool(token_cache=token_cache)
+        session = pool.get(key, lambda: second_auth)
+        self.assertEqual(second_auth.issued, 0)
+        self.assertEqual(session.get_token(), "token-1")
+        self.assertEqual(pool.stats()["shared_hits"], 1)
+
+    def test_expiring_token_not_cached(self):
+        """Are tokens within the expiry margin left out of the cache?"""
+        conn = FakeRedis()
+        token_cache = TokenCache(conn, expiry_margin=300)
+        auth = FakeAuth(datetime.timedelta(seconds=200))
+        SessionPool(refresh_margin=0, token_cache=token_cache).get(
+            ("region", "project", "user"), lambda: auth
+        )
+        self.assertEqual(conn.data, {})
@@ -0,0 +1,206 @@
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+
+from userdb.tests.factories import UserFactory
+from ..models import PooledBootVolume, ServerCreationJob
+from ..volume_pool import BootVolumePool
+from .factories import RegionFactory, TenantFactory
+
+IMAGE_ID = "e1d0b5c4-7a8e-4b59-9c0f-2f7b1d6a3e22"
+VOLUME_IDS = [
+    "0b5d6b1c-8f7e-4a2b-9d3c-000000000001",
+    "0b5d6b1c-8f7e-4a2b-9d3c-000000000002",
+    "0b5d6b1c-8f7e-4a2b-9d3c-000000000003",
+]
+
+
+class TestBootVolumePool(TestCase):
+    def setUp(self):
+        self.region = RegionFactory()
+        self.admin = mock.Mock()
+        self.pool = BootVolumePool(self.region, admin=self.admin)
+        self.pool.settings["IMAGES"] = [IMAGE_ID]
+
+    def add_pooled(self, volume_id, status=PooledBootVolume.Status.READY):
+        return PooledBootVolume.objects.create(
+            volume_id=volume_id, region=self.region, image_id=IMAGE_ID, status=status
+        )
+
+    def test_claim_transfers_and_renames(self):
+        """Is a ready volume transferred to the tenant project, renamed & claimed once?"""
+        self.add_pooled(VOLUME_IDS[0])
+        openstack = mock.Mock()
+        transfer = SimpleNamespace(id="transfer", auth_key="key")
+        self.admin.cinder.transfers.create.return_value = transfer
+
+        volume = self.pool.claim(openstack, IMAGE_ID, "boot")
+
+        self.assertEqual(volume, openstack.cinder.volumes.get.return_value)
+        openstack.cinder.transfers.accept.assert_called_once_with("transfer", "key")
+        openstack.cinder.volumes.update.assert_called_once_with(
+            VOLUME_IDS[0], name="boot"
+        )
+        self.assertIsNone(self.pool.claim(openstack, IMAGE_ID, "boot"))
+
+    def claim_failing(self, openstack):
+        self.add_pooled(VOLUME_IDS[0])
+        transfer = SimpleNamespace(id="transfer", auth_key="key")
+        self.admin.cinder.transfers.create.return_value = transfer
+        self.assertIsNone(self.pool.claim(openstack, IMAGE_ID, "boot"))
+        pooled = PooledBootVolume.objects.get(volume_id=VOLUME_IDS[0])
+        self.assertEqual(pooled.status, PooledBootVolume.Status.FAILED)
+
+    def test_failed_transfer(self):
+        """If the transfer can't be created, is the volume left for cleanup?"""
+        openstack = mock.Mock()
+        self.admin.cinder.transfers.create.side_effect = Exception("error")
+        self.claim_failing(openstack)
+        self.admin.cinder.transfers.delete.assert_not_called()
+        openstack.cinder.volumes.delete.assert_not_called()
+
+    def test_failed_accept_deletes_transfer(self):
+        """If the transfer isn't accepted, is it deleted?"""
+        openstack = mock.Mock()
+        openstack.cinder.transfers.accept.side_effect = Exception("error")
+        self.claim_failing(openstack)
+        self.admin.cinder.transfers.delete.assert_called_once_with("transfer")
+        openstack.cinder.volumes.delete.assert_not_called()
+
+    def test_failure_after_accept_deletes_volume(self):
+        """If the claim fails after the transfer is accepted, is the tenant's volume deleted?"""
+        openstack = mock.Mock()
+        openstack.cinder.volumes.update.side_effect = Exception("error")
+        self.claim_failing(openstack)
+        openstack.cinder.volumes.delete.assert_called_once_with(VOLUME_IDS[0])
+        self.admin.cinder.transfers.delete.assert_not_called()
+
+    def test_cleanup_failed(self):
+        """Are failed volumes deleted, & their records kept only if deletion fails?"""
+        for volume_id in VOLUME_IDS[:2]:
+            self.add_pooled(volume_id, status=PooledBootVolume.Status.FAILED)
+        self.admin.cinder.volumes.get.return_value = SimpleNamespace(
+            status="awaiting-transfer"
+        )
+        self.admin.cinder.transfers.list.return_value = [
+            SimpleNamespace(id="transfer", volume_id=VOLUME_IDS[0])
+        ]
+        self.admin.cinder.volumes.delete.side_effect = [None, Exception("error")]
+
+        self.assertEqual(self.pool.cleanup_failed(), 1)
+        self.admin.cinder.transfers.delete.assert_called_once_with("transfer")
+        self.assertEqual(
+            list(PooledBootVolume.objects.values_list("volume_id", flat=True)),
+            [uuid.UUID(VOLUME_IDS[1])],
+        )
+
+        # Volume already gone
+        error = Exception("not found")
+        error.code = 404
+        self.admin.cinder.volumes.get.side_effect = error
+        self.assertEqual(self.pool.cleanup_failed(), 1)
+        self.assertFalse(PooledBootVolume.objects.exists())
+
+    def test_claim_misses_for_other_images(self):
+        """Is there no claim for an image without ready volumes?"""
+        self.add_pooled(VOLUME_IDS[0], status=PooledBootVolume.Status.BUILDING)
+        self.assertIsNone(self.pool.claim(mock.Mock(), IMAGE_ID, "boot"))
+        self.assertIsNone(self.pool.claim(mock.Mock(), "other", "boot"))
+
+    def test_refill_tops_up_pool(self):
+        """Are volumes requested for the deficit, & building volumes marked ready?"""
+        self.add_pooled(VOLUME_IDS[0], status=PooledBootVolume.Status.BUILDING)
+        self.admin.cinder.volumes.get.return_value = SimpleNamespace(
+            status="available",
+            created_at="2021-05-01T12:00:00.000000",
+            updated_at="2021-05-01T12:03:00.000000",
+        )
+        self.admin.cinder.volumes.create.return_value = SimpleNamespace(
+            id=VOLUME_IDS[1]
+        )
+
+        self.assertEqual(self.pool.refill(), 1)
+        ready = PooledBootVolume.objects.get(volume_id=VOLUME_IDS[0])
+        self.assertEqual(ready.status, PooledBootVolume.Status.READY)
+        self.assertEqual(self.pool.stats()["mean_refill_seconds"], 180)
+        self.assertEqual(self.pool.refill(), 0)
+
+    def test_refill_continues_after_errors(self):
+        """Does an error checking one building volume leave the others, & the top-up, to go on?"""
+        for volume_id in VOLUME_IDS[:2]:
+            self.add_pooled(volume_id, status=PooledBootVolume.Status.BUILDING)
+        self.admin.cinder.volumes.get.side_effect = [
+            Exception("unavailable"),
+            SimpleNamespace(status="available", created_at=None, updated_at=None),
+        ]
+        self.admin.cinder.volumes.create.return_value = SimpleNamespace(
+            id=VOLUME_IDS[2]
+        )
+        self.pool.settings["POOL_SIZE"] = 3
+
+        self.assertEqual(self.pool.refill(), 1)
+        self.assertEqual(
+            dict(PooledBootVolume.objects.values_list("volume_id", "status")),
+            {
+                uuid.UUID(VOLUME_IDS[0]): PooledBootVolume.Status.BUILDING,
+                uuid.UUID(VOLUME_IDS[1]): PooledBootVolume.Status.READY,
+                uuid.UUID(VOLUME_IDS[2]): PooledBootVolume.Status.BUILDING,
+            },
+        )
+
+    def test_failed_build_is_cleaned_up(self):
+        """If a requested volume can't be made bootable, is it left for cleanup?"""
+        self.admin.cinder.volumes.create.return_value = SimpleNamespace(
+            id=VOLUME_IDS[0]
+        )
+        self.admin.cinder.volumes.set_bootable.side_effect = Exception("error")
+        self.assertEqual(self.pool.refill(), 0)
+        pooled = PooledBootVolume.objects.get()
+        self.assertEqual(pooled.status, PooledBootVolume.Status.FAILED)
+
+    def test_surplus_reclaimed(self):
+        """Are ready volumes beyond their image's target (or untargeted) deleted?"""
+        for volume_id in VOLUME_IDS:
+            self.add_pooled(volume_id)
+        PooledBootVolume.objects.filter(volume_id=VOLUME_IDS[2]).update(
+            image_id="unpopular"
+        )
+        self.pool.settings["POOL_SIZE"] = 1
+        self.admin.cinder.volumes.get.return_value = SimpleNamespace(status="available")
+
+        self.assertEqual(self.pool.refill(), 0)
+        self.assertEqual(self.admin.cinder.volumes.delete.call_count, 2)
+        self.assertEqual(
+            list(PooledBootVolume.objects.values_list("volume_id", flat=True)),
+            [uuid.UUID(VOLUME_IDS[0])],
+        )
+
+    def test_hit_rate(self):
+        """Is the hit rate calculated from server creation jobs?"""
+        tenant = TenantFactory(region=self.region)
+        for pooled_volume in (True, False, False, False):
+            ServerCreationJob.objects.create(
+                tenant=tenant,
+                user=UserFactory(),
+                name="server",
+                volume_id=VOLUME_IDS[0],
+                pooled_volume=pooled_volume,
+            )
+        stats = self.pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 3))
+        self.assertEqual(stats["hit_rate"], 0.25)
+
+    def test_popular_images_targeted(self):
+        """Without configured images, are the most used images pooled?"""
+        self.pool.settings.update({"IMAGES": None, "POPULAR_IMAGES": 1})
+        tenant = TenantFactory(region=self.region)
+        for image in ("a", "b", "b"):
+            ServerCreationJob.objects.create(
+                tenant=tenant,
+                user=UserFactory(),
+                name="server",
+                params={"image": image},
+            )
+        self.assertEqual(self.pool.get_targets(), {"b": 2})
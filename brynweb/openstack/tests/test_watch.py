@@ -0,0 +1,352 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.test import SimpleTestCase
+from django.urls import reverse
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from userdb.models import TeamMember
+from userdb.tests.factories import UserFactory
+from ..api_views import InstanceDetailView, collect_tenant_resources
+from ..fake import reset_fake_clouds
+from ..watch import (
+    InMemoryChannelLayer,
+    RedisChannelLayer,
+    StreamLimitReached,
+    TenantPoller,
+    WatchRegistry,
+    get_changes,
+    watch_registry,
+)
+from .factories import RegionFactory, TenantFactory
+from .test_fake import FAKE_SETTINGS
+
+
+def snapshot(**statuses):
+    return {
+        "instance": {
+            server_id: {"id": server_id, "status": server_status}
+            for server_id, server_status in statuses.items()
+        }
+    }
+
+
+class TestChanges(SimpleTestCase):
+    def test_changes(self):
+        """Are new, changed & deleted resources (only) reported?"""
+        previous = snapshot(a="ACTIVE", b="ACTIVE", c="SHUTOFF")
+        current = snapshot(a="ACTIVE", b="SHELVED", d="BUILD")
+        changes = {
+            message["id"]: (message["status"], message["deleted"])
+            for message in get_changes(previous, current)
+        }
+        self.assertEqual(
+            changes,
+            {"b": ("SHELVED", False), "c": (None, True), "d": ("BUILD", False)},
+        )
+
+    def test_all_resources_without_previous(self):
+        """Without a previous snapshot, is every resource reported?"""
+        messages = list(get_changes(None, snapshot(a="ACTIVE", b="ACTIVE")))
+        self.assertEqual([message["id"] for message in messages], ["a", "b"])
+        self.assertEqual(messages[0]["data"], {"id": "a", "status": "ACTIVE"})
+
+
+class TestWatch(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = mock.Mock(pk=1)
+
+    def test_channel_layer(self):
+        """Are messages published to a group's subscribers, until they close?"""
+        layer = InMemoryChannelLayer()
+        first, second = layer.subscribe("group"), layer.subscribe("group")
+        other = layer.subscribe("other")
+        layer.publish("group", {"id": "a"})
+        self.assertEqual(first.get(timeout=1), {"id": "a"})
+        self.assertEqual(second.get(timeout=1), {"id": "a"})
+        self.assertIsNone(other.get(timeout=0.01))
+        first.close()
+        layer.publish("group", {"id": "b"})
+        self.assertIsNone(first.get(timeout=0.01))
+        self.assertEqual(second.get(timeout=1), {"id": "b"})
+
+    def test_poll(self):
+        """Are changes published, & is the tenant polled at most once per interval?"""
+        layer = InMemoryChannelLayer()
+        subscription = layer.subscribe("tenant-1")
+        collect = mock.Mock(side_effect=[snapshot(a="ACTIVE"), snapshot(a="SHUTOFF")])
+        poller = TenantPoller(self.tenant, collect, layer, interval=60)
+        poller.poll()
+        poller.poll()  # within interval
+        self.assertEqual(collect.call_count, 1)
+        self.assertEqual(subscription.get(timeout=1)["status"], "ACTIVE")
+
+        cache.delete(poller.lock_key)
+        poller.poll()
+        self.assertEqual(subscription.get(timeout=1)["status"], "SHUTOFF")
+        self.assertEqual(poller.snapshot, snapshot(a="SHUTOFF"))
+
+    @mock.patch.object(TenantPoller, "start")
+    def test_one_poller_per_tenant(self, start):
+        """Is one poller started per tenant, & stopped with its last subscriber?"""
+        registry = WatchRegistry(InMemoryChannelLayer())
+        first, _snapshot = registry.subscribe(self.tenant, mock.Mock())
+        second, _snapshot = registry.subscribe(self.tenant, mock.Mock())
+        start.assert_called_once()
+        self.assertEqual(
+            registry.stats(), {"pollers": 1, "subscribers": 2, "streams": 2}
+        )
+        first.close()
+        second.close()
+        first.close()  # closing again is a no-op
+        self.assertEqual(
+            registry.stats(), {"pollers": 0, "subscribers": 0, "streams": 0}
+        )
+
+    @mock.patch.object(TenantPoller, "start")
+    def test_stream_limit(self, start):
+        """Are subscriptions refused beyond max_streams, until one closes?"""
+        registry = WatchRegistry(InMemoryChannelLayer(), max_streams=1)
+        first, _snapshot = registry.subscribe(self.tenant, mock.Mock())
+        with self.assertRaises(StreamLimitReached):
+            registry.subscribe(mock.Mock(pk=2), mock.Mock())
+        self.assertEqual(registry.stats()["pollers"], 1)
+        first.close()
+        second, _snapshot = registry.subscribe(self.tenant, mock.Mock())
+        second.close()
+
+    def test_redis_dispatch(self):
+        """Are messages from the process's one Redis subscription dispatched by group?"""
+        conn = mock.Mock()
+        pubsub = conn.pubsub.return_value
+        messages = [
+            {"type": "pmessage", "channel": b"watch:tenant-1", "data": b'{"id": "a"}'},
+            {"type": "pmessage", "channel": b"watch:tenant-2", "data": b'{"id": "b"}'},
+        ]
+        pubsub.listen.side_effect = [messages, RedisError]  # then stop, on reconnecting
+        layer = RedisChannelLayer(conn, key_prefix="watch")
+        with mock.patch.object(layer, "start_listener"):
+            subscription = layer.subscribe("tenant-1")
+        with mock.patch("openstack.watch.time.sleep", side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                layer.listen()
+        pubsub.psubscribe.assert_called_with("watch:*")
+        self.assertEqual(subscription.get(timeout=1), {"id": "a"})
+        self.assertIsNone(subscription.get(timeout=0.01))
+
+
+@mock.patch.dict("openstack.fake.FAKE_SETTINGS", FAKE_SETTINGS)
+@mock.patch.object(TenantPoller, "start")
+class TestTenantEventsAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory(region=RegionFactory(name="fake"))
+        TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        reset_fake_clouds()
+        self.client.force_login(user=self.user)
+
+    def get_url(self, name="tenant_events", **kwargs):
+        return reverse(
+            f"api:{name}",
+            kwargs={
+                "team_id": self.tenant.team_id,
+                "tenant_id": self.tenant.id,
+                **kwargs,
+            },
+        )
+
+    def poll(self):
+        poller = TenantPoller(
+            self.tenant, collect_tenant_resources, watch_registry.layer
+        )
+        cache.delete(poller.lock_key)
+        poller.poll()
+
+    def read_events(self, stream, count):
+        events = [next(stream).decode() for _n in range(count)]
+        return [json.loads(event[len("data: ") :]) for event in events]
+
+    def test_changes_are_pushed(self, start):
+        """Are polled changes pushed to subscribers, & the snapshot sent on connect?"""
+        response = self.client.get(self.get_url())
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream).startswith(b"retry:"))
+
+        self.poll()
+        events = self.read_events(stream, 6)
+        self.assertEqual(
+            sorted(event["type"] for event in events), ["instance"] * 3 + ["volume"] * 3
+        )
+        server = next(event["data"] for event in events if event["type"] == "instance")
+        self.assertIn("leaseExpiry", server)
+
+        self.client.patch(
+            self.get_url("instances", pk=server["id"]), {"status": "SHUTOFF"}
+        )
+        self.poll()
+        (event,) = self.read_events(stream, 1)
+        self.assertEqual((event["id"], event["status"]), (server["id"], "SHUTOFF"))
+        response.close()
+        self.assertEqual(watch_registry.stats()["pollers"], 0)
+
+        # Reconnect
+        response = self.client.get(self.get_url())
+        stream = iter(response.streaming_content)
+        next(stream)
+        self.assertEqual(len(self.read_events(stream, 6)), 6)
+        response.close()
+        start.assert_called()
+
+    @mock.patch.dict("openstack.watch.WATCH_SETTINGS", {"STREAM_SECONDS": 0.05})
+    def test_stream_ends(self, start):
+        """Does a stream end after STREAM_SECONDS, for EventSource to reconnect?"""
+        response = self.client.get(self.get_url())
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(len(list(response.streaming_content)), 2)  # retry, keep-alive
+        response.close()
+        self.assertEqual(watch_registry.stats()["streams"], 0)
+
+    @mock.patch.object(watch_registry, "max_streams", 1)
+    def test_stream_limit(self, start):
+        """Beyond the process's stream limit, is the stream refused (for the frontend to poll)?"""
+        response = self.client.get(self.get_url())
+        refused = self.client.get(self.get_url())
+        self.assertEqual(refused.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        response.close()  # never iterated
+        self.assertEqual(
+            watch_registry.stats(), {"pollers": 0, "subscribers": 0, "streams": 0}
+        )
+
+    def test_non_member_cannot_subscribe(self, start):
+        """Are users forbidden from other teams' tenant events?"""
+        self.client.force_login(user=UserFactory())
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        start.assert_not_called()
+
+    @mock.patch.dict("openstack.watch.WATCH_SETTINGS", {"ENABLED": False})
+    def test_disabled(self, start):
+        """When disabled, is the endpoint not found (& the frontend falls back to polling)?"""
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+def poll_on_start(poller):
+    """TenantPoller.start replacement: one poll, in the waiting thread"""
+    poller.poll()
+
+
+@mock.patch.dict("openstack.fake.FAKE_SETTINGS", FAKE_SETTINGS)
+@mock.patch.object(TenantPoller, "start", autospec=True, side_effect=poll_on_start)
+@mock.patch("openstack.api_views.collect_tenant_resources")
+class TestWaitForStatusAPI(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory(region=RegionFactory(name="fake"))
+        TeamMember.objects.create(team=cls.tenant.team, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        reset_fake_clouds()
+        self.client.force_login(user=self.user)
+
+    def get_url(self, name, **kwargs):
+        return reverse(
+            f"api:{name}",
+            kwargs={
+                "team_id": self.tenant.team_id,
+                "tenant_id": self.tenant.id,
+                **kwargs,
+            },
+        )
+
+    def get_first_id(self, name):
+        return self.client.get(self.get_url(name), {"source": "live"}).data[0]["id"]
+
+    def test_wait_for_status(self, collect, start):
+        """Is a request held until the resource has a target status, from a shared poll?"""
+        server_id = self.get_first_id("instances")
+        url = self.get_url("instances", pk=server_id)
+        self.client.patch(url, {"status": "SHUTOFF"})
+        collect.return_value = snapshot(**{server_id: "SHUTOFF"})
+
+        response = self.client.get(url, {"wait": 5, "status": "SHELVED,SHUTOFF"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "SHUTOFF")
+        collect.assert_called_once()
+        self.assertEqual(watch_registry.stats()["pollers"], 0)
+
+    def test_wait_expires(self, collect, start):
+        """When the wait expires, is the resource returned as it is?"""
+        server_id = self.get_first_id("instances")
+        collect.return_value = snapshot(**{server_id: "ACTIVE"})
+        response = self.client.get(
+            self.get_url("instances", pk=server_id),
+            {"wait": 0.05, "status": "SHUTOFF"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "ACTIVE")
+
+    def test_wait_until_gone(self, collect, start):
+        """Without target statuses, is a request held until the resource is gone?"""
+        server_id = self.get_first_id("instances")
+        url = self.get_url("instances", pk=server_id)
+        self.client.delete(url)
+        collect.return_value = {"instance": {}, "volume": {}}
+        response = self.client.get(url, {"wait": 5})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_wait(self, collect, start):
+        """Is a non-numeric wait rejected?"""
+        server_id = self.get_first_id("instances")
+        response = self.client.get(
+            self.get_url("instances", pk=server_id), {"wait": "soon"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        start.assert_not_called()
+
+    @mock.patch.dict("openstack.watch.WATCH_SETTINGS", {"MAX_WSGI_WAIT_SECONDS": 0})
+    def test_wsgi_wait_is_limited(self, collect, start):
+        """Under WSGI (holding a thread), is the wait limited to MAX_WSGI_WAIT_SECONDS?"""
+        server_id = self.get_first_id("instances")
+        collect.return_value = snapshot(**{server_id: "ACTIVE"})
+        response = self.client.get(
+            self.get_url("instances", pk=server_id), {"wait": 30, "status": "SHUTOFF"}
+        )
+        self.assertEqual(response.data["status"], "ACTIVE")
+
+    def test_asgi_wait_seconds(self, collect, start):
+        """Under ASGI, are waits limited to MAX_WAIT_SECONDS instead?"""
+        view = InstanceDetailView()
+        view.request = mock.Mock(
+            query_params={"wait": "60"}, _request=mock.Mock(spec=ASGIRequest)
+        )
+        self.assertEqual(view.get_wait_seconds(), 30)
+        view.request._request = mock.Mock()
+        self.assertEqual(view.get_wait_seconds(), 5)
+
+    @mock.patch.dict("openstack.watch.WATCH_SETTINGS", {"ENABLED": False})
+    @mock.patch("openstack.api_views.asyncio.sleep")
+    def test_wait_without_watch(self, sleep, collect, start):
+        """With the watch disabled, is the wait a plain delay, with no poller?"""
+        server_id = self.get_first_id("instances")
+        with mock.patch.object(
+            InstanceDetailView, "get_tenant", wraps=InstanceDetailView().get_tenant
+        ) as get_tenant:
+            response = self.client.get(
+                self.get_url("instances", pk=server_id), {"wait": 2}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sleep.assert_called_once_with(2)
+        start.assert_not_called()
+        get_tenant.assert_called_once()
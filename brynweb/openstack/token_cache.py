@@ -0,0 +1,117 @@
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from huey.contrib.djhuey import HUEY
+from redis.exceptions import LockError, RedisError
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_SETTINGS = getattr(settings, "OPENSTACK_TOKEN_CACHE", {})
+
+
+class TokenCache:
+    """
+    Keystone token cache shared by all processes (gunicorn workers & huey consumer), stored in Redis.
+
+    Entries hold serialized keystoneauth auth state, keyed by region, project & user, and expire
+    `expiry_margin` seconds before the token itself. A per-entry lock ensures only one process
+    refreshes a given token at a time.
+    """
+
+    def __init__(
+        self,
+        conn,
+        key_prefix="bryn:keystone-token",
+        expiry_margin=300,
+        lock_timeout=30,
+        lock_wait=10,
+    ):
+        self.conn = conn
+        self.key_prefix = key_prefix
+        self.expiry_margin = expiry_margin
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+
+    def get_key(self, region, project, user):
+        return f"{self.key_prefix}:{region}:{project}:{user}"
+
+    def load(self, key, auth):
+        """
+        Install cached auth state on an auth plugin. Returns True if state was found.
+        """
+        try:
+            state = self.conn.get(key)
+        except RedisError as e:
+            logger.warning(f"Keystone token cache unavailable: {e}")
+            return False
+        if state is None:
+            return False
+        auth.set_auth_state(state.decode())
+        return True
+
+    def store(self, key, auth):
+        """
+        Cache the auth state of an authenticated plugin, until shortly before the token expires.
+        """
+        expires = auth.auth_ref.expires
+        ttl = int((expires - timezone.now()).total_seconds()) - self.expiry_margin
+        if ttl <= 0:
+            return
+        try:
+            self.conn.set(key, auth.get_auth_state(), ex=ttl)
+        except RedisError as e:
+            logger.warning(f"Keystone token cache unavailable: {e}")
+
+    def refresh(self, key, auth, authenticate):
+        """
+        Call `authenticate`, unless another process refreshes the token first.
+        Falls back to authenticating without the lock if it cannot be acquired.
+        """
+        lock = self.conn.lock(
+            f"{key}:lock", timeout=self.lock_timeout, blocking_timeout=self.lock_wait
+        )
+        try:
+            acquired = lock.acquire()
+        except RedisError as e:
+            logger.warning(f"Keystone token cache unavailable: {e}")
+            authenticate()
+            return
+
+        if not acquired:
+            logger.warning(f"Timed out waiting for keystone token lock {key}")
+            authenticate()
+            return
+
+        try:
+            # Another process may have refreshed the token while we waited
+            if self.load(key, auth) and not auth.auth_ref.will_expire_soon(
+                self.expiry_margin
+            ):
+                return
+            authenticate()
+            self.store(key, auth)
+        finally:
+            try:
+                lock.release()
+            except (LockError, RedisError):
+                pass  # expired; another process may now hold it
+
+
+def get_token_cache():
+    """
+    Return a TokenCache using the huey Redis connection, if enabled.
+    Returns None if disabled, or huey isn't using Redis storage (e.g. immediate mode).
+    """
+    if not TOKEN_CACHE_SETTINGS.get("ENABLED", False):
+        return None
+    conn = getattr(HUEY.storage, "conn", None)
+    if conn is None:
+        return None
+    return TokenCache(
+        conn,
+        key_prefix=TOKEN_CACHE_SETTINGS.get("KEY_PREFIX", "bryn:keystone-token"),
+        expiry_margin=TOKEN_CACHE_SETTINGS.get("EXPIRY_MARGIN_SECONDS", 300),
+        lock_timeout=TOKEN_CACHE_SETTINGS.get("LOCK_TIMEOUT_SECONDS", 30),
+        lock_wait=TOKEN_CACHE_SETTINGS.get("LOCK_WAIT_SECONDS", 10),
+    )
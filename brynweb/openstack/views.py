@@ -1,10 +1,19 @@
 from django.urls import reverse
 from django.conf import settings
 from django.contrib import messages
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseRedirect,
+    JsonResponse,
+)
 from django.shortcuts import get_object_or_404
-from django.views.decorators.http import require_http_methods
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET, require_http_methods
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from .metrics import get_registry
 from .models import ServerLease
 from .serializers import ServerLeaseSerializer
 
@@ -42,3 +51,24 @@ def server_lease_renewal_view(request, server_id, renewal_count):
     # POST: Return JSON serialized representation
     serialized = ServerLeaseSerializer(lease)
     return JsonResponse(serialized.data)
+
+
+@never_cache
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus metrics, in text format. Staff only, or with "Authorization: Bearer <token>",
+    where the token is settings.METRICS_BEARER_TOKEN.
+    """
+    token = getattr(settings, "METRICS_BEARER_TOKEN", None)
+    authorized = request.user.is_staff or (
+        token
+        and constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+    )
+    if not authorized:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
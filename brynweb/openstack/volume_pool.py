@@ -0,0 +1,294 @@
+import datetime
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Avg, DurationField, ExpressionWrapper, F
+from django.utils import timezone
+
+from .mirror import parse_openstack_datetime
+from .models import PooledBootVolume, ServerCreationJob
+from .service import BOOT_VOLUME_SIZE_GB, OpenstackService
+
+logger = logging.getLogger(__name__)
+
+POOL_SETTINGS = getattr(settings, "OPENSTACK_BOOT_VOLUME_POOL", {})
+
+DEFAULTS = {
+    "POOL_SIZE": 2,  # Ready volumes per image
+    "POPULAR_IMAGES": 3,  # Number of most used images to pool
+    "POPULARITY_DAYS": 30,  # Period over which image use is counted
+    "IMAGES": None,  # Explicit list of image ids, instead of the most used
+}
+
+# Claimed records are kept for stats, for this many days; failed records until cleaned up
+HISTORY_DAYS = 30
+
+
+def get_region_pool_settings(region_name):
+    """Pool settings for a region: defaults, overridden by global & per-region settings"""
+    region_overrides = POOL_SETTINGS.get("REGIONS", {}).get(region_name, {})
+    return {
+        key: region_overrides.get(key, POOL_SETTINGS.get(key, default))
+        for key, default in DEFAULTS.items()
+    }
+
+
+class BootVolumePool:
+    """
+    Pool of ready, bootable volumes for the most used images in a region.
+
+    Volumes are built in the region admin project by `refill` (a periodic huey task), and
+    transferred to the tenant project by `claim`, when a new server is created from a pooled image.
+    Ready volumes beyond an image's target (e.g. for images no longer popular) are reclaimed.
+    """
+
+    def __init__(self, region, admin=None):
+        self.region = region
+        self.settings = get_region_pool_settings(region.name)
+        self._admin = admin
+
+    @property
+    def admin(self):
+        """OpenstackService for the region admin project, which holds the pool"""
+        if not self._admin:
+            self._admin = OpenstackService(region=self.region)
+        return self._admin
+
+    def get_targets(self):
+        """Return a dict of {image id: target pool size}"""
+        images = self.settings["IMAGES"]
+        if images is None:
+            since = timezone.now() - datetime.timedelta(
+                days=self.settings["POPULARITY_DAYS"]
+            )
+            params = ServerCreationJob.objects.filter(
+                tenant__region=self.region, created_at__gte=since
+            ).values_list("params", flat=True)
+            counts = Counter(p.get("image") for p in params if p.get("image"))
+            images = [
+                image
+                for image, _count in counts.most_common(self.settings["POPULAR_IMAGES"])
+            ]
+        return {image: self.settings["POOL_SIZE"] for image in images}
+
+    def claim(self, openstack, image_id, name):
+        """
+        Claim a ready volume for image_id, transfer it to the tenant project of `openstack`
+        & rename it. Returns None if there is no ready volume, or the claim fails.
+        """
+        candidates = PooledBootVolume.objects.filter(
+            region=self.region,
+            image_id=image_id,
+            status=PooledBootVolume.Status.READY,
+        ).order_by("ready_at")
+        for pooled in candidates:
+            # Conditional update, so a volume is only claimed once
+            claimed = PooledBootVolume.objects.filter(
+                pk=pooled.pk, status=PooledBootVolume.Status.READY
+            ).update(status=PooledBootVolume.Status.CLAIMED, claimed_at=timezone.now())
+            if claimed:
+                break
+        else:
+            return None
+
+        volume_id = str(pooled.volume_id)
+        transfer = None
+        accepted = False
+        try:
+            transfer = self.admin.cinder.transfers.create(volume_id, name=name)
+            openstack.cinder.transfers.accept(transfer.id, transfer.auth_key)
+            accepted = True
+            openstack.cinder.volumes.update(volume_id, name=name)
+            return openstack.cinder.volumes.get(volume_id)
+        except Exception as e:
+            logger.error(f"Failed to claim pooled volume {volume_id}: {e}")
+            PooledBootVolume.objects.filter(pk=pooled.pk).update(
+                status=PooledBootVolume.Status.FAILED
+            )
+            self.undo_claim(openstack, volume_id, transfer, accepted)
+            return None
+
+    def undo_claim(self, openstack, volume_id, transfer, accepted):
+        """
+        Undo a failed claim, as far as it got: delete the volume if the tenant project
+        accepted it, otherwise cancel any transfer (leaving the volume to `cleanup_failed`).
+        """
+        try:
+            if accepted:
+                openstack.cinder.volumes.delete(volume_id)
+            elif transfer:
+                self.admin.cinder.transfers.delete(transfer.id)
+        except Exception as e:
+            logger.error(f"Failed to undo claim of pooled volume {volume_id}: {e}")
+
+    def refill(self):
+        """
+        Update building volumes, reclaim surplus ready volumes & clean up failed ones, then
+        build volumes to top up the pool for each target image. Cinder errors are logged per
+        volume (or image), & retried on the next refill. Returns the number of volumes requested.
+        """
+        targets = self.get_targets()
+        self.update_building()
+        self.reclaim_surplus(targets)
+        self.cleanup_failed()
+
+        requested = 0
+        for image_id, target in targets.items():
+            pooled = PooledBootVolume.objects.filter(
+                region=self.region,
+                image_id=image_id,
+                status__in=[
+                    PooledBootVolume.Status.BUILDING,
+                    PooledBootVolume.Status.READY,
+                ],
+            ).count()
+            try:
+                for _n in range(target - pooled):
+                    self.build(image_id)
+                    requested += 1
+            except Exception as e:
+                logger.error(
+                    f"Failed to build pooled volumes for image {image_id}: {e}"
+                )
+
+        PooledBootVolume.objects.filter(
+            region=self.region,
+            status=PooledBootVolume.Status.CLAIMED,
+            requested_at__lt=timezone.now() - datetime.timedelta(days=HISTORY_DAYS),
+        ).delete()
+        return requested
+
+    def build(self, image_id):
+        """Request a volume for image_id, recorded at once, so it's cleaned up if this fails"""
+        volume = self.admin.cinder.volumes.create(
+            imageRef=image_id,
+            name=f"bryn:pool_{image_id}",
+            size=BOOT_VOLUME_SIZE_GB,
+        )
+        pooled = PooledBootVolume.objects.create(
+            volume_id=volume.id, region=self.region, image_id=image_id
+        )
+        try:
+            self.admin.cinder.volumes.set_bootable(volume, True)
+        except Exception:
+            pooled.status = PooledBootVolume.Status.FAILED
+            pooled.save()
+            raise
+
+    def update_building(self):
+        """Mark building volumes as ready (or failed) once cinder has finished"""
+        building = PooledBootVolume.objects.filter(
+            region=self.region, status=PooledBootVolume.Status.BUILDING
+        )
+        for pooled in building:
+            try:
+                volume = self.admin.cinder.volumes.get(str(pooled.volume_id))
+            except Exception as e:
+                if getattr(e, "code", None) != 404:
+                    logger.error(
+                        f"Failed to check pooled volume {pooled.volume_id}: {e}"
+                    )
+                    continue
+                pooled.status = PooledBootVolume.Status.FAILED
+                pooled.save()
+                continue
+
+            if volume.status == "available":
+                pooled.status = PooledBootVolume.Status.READY
+                # Build time from cinder's own timestamps, since refills run periodically
+                created = parse_openstack_datetime(getattr(volume, "created_at", None))
+                updated = parse_openstack_datetime(getattr(volume, "updated_at", None))
+                pooled.ready_at = (
+                    pooled.requested_at + (updated - created)
+                    if created and updated
+                    else timezone.now()
+                )
+                pooled.save()
+            elif volume.status == "error":
+                logger.error(f"Pooled volume {pooled.volume_id} failed to build")
+                pooled.status = (
+                    PooledBootVolume.Status.FAILED
+                )  # deleted by cleanup_failed
+                pooled.save()
+
+    def reclaim_surplus(self, targets):
+        """
+        Mark ready volumes beyond their image's target (none, for images no longer targeted)
+        for deletion by `cleanup_failed`, keeping the oldest. Returns the number reclaimed.
+        """
+        ready = PooledBootVolume.objects.filter(
+            region=self.region, status=PooledBootVolume.Status.READY
+        ).order_by("ready_at")
+        kept = Counter()
+        reclaimed = 0
+        for pooled in ready:
+            kept[pooled.image_id] += 1
+            if kept[pooled.image_id] <= targets.get(pooled.image_id, 0):
+                continue
+            # Conditional update, so a volume being claimed isn't reclaimed
+            reclaimed += PooledBootVolume.objects.filter(
+                pk=pooled.pk, status=PooledBootVolume.Status.READY
+            ).update(status=PooledBootVolume.Status.FAILED)
+        if reclaimed:
+            logger.info(
+                f"Reclaiming {reclaimed} surplus pooled volumes in {self.region.name}"
+            )
+        return reclaimed
+
+    def cleanup_failed(self):
+        """
+        Delete failed volumes (with any pending transfer) & their records. Records are kept,
+        to retry, if the volume can't be deleted. Returns the number of records deleted.
+        """
+        failed = PooledBootVolume.objects.filter(
+            region=self.region, status=PooledBootVolume.Status.FAILED
+        )
+        cleaned = 0
+        for pooled in failed:
+            volume_id = str(pooled.volume_id)
+            try:
+                volume = self.admin.cinder.volumes.get(volume_id)
+                if volume.status == "awaiting-transfer":
+                    for transfer in self.admin.cinder.transfers.list():
+                        if transfer.volume_id == volume_id:
+                            self.admin.cinder.transfers.delete(transfer.id)
+                if volume.status != "deleting":
+                    self.admin.cinder.volumes.delete(volume_id)
+            except Exception as e:
+                if getattr(e, "code", None) != 404:
+                    logger.error(f"Failed to clean up pooled volume {volume_id}: {e}")
+                    continue
+            pooled.delete()
+            cleaned += 1
+        return cleaned
+
+    def stats(self):
+        """Pool size, hit rate & mean refill latency, over the history period"""
+        since = timezone.now() - datetime.timedelta(days=HISTORY_DAYS)
+        volumes = PooledBootVolume.objects.filter(region=self.region)
+        counts = Counter(volumes.values_list("status", flat=True))
+        jobs = ServerCreationJob.objects.filter(
+            tenant__region=self.region, created_at__gte=since, volume_id__isnull=False
+        )
+        hits = jobs.filter(pooled_volume=True).count()
+        total = jobs.count()
+        latency = (
+            volumes.filter(ready_at__isnull=False, requested_at__gte=since)
+            .annotate(
+                latency=ExpressionWrapper(
+                    F("ready_at") - F("requested_at"), output_field=DurationField()
+                )
+            )
+            .aggregate(mean=Avg("latency"))["mean"]
+        )
+        return {
+            "ready": counts[PooledBootVolume.Status.READY],
+            "building": counts[PooledBootVolume.Status.BUILDING],
+            "claimed": counts[PooledBootVolume.Status.CLAIMED],
+            "failed": counts[PooledBootVolume.Status.FAILED],
+            "hits": hits,
+            "misses": total - hits,
+            "hit_rate": hits / total if total else None,
+            "mean_refill_seconds": latency.total_seconds() if latency else None,
+        }
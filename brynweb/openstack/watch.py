@@ -0,0 +1,324 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from huey.contrib.djhuey import HUEY
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+WATCH_SETTINGS = getattr(settings, "OPENSTACK_WATCH", {})
+
+
+class InMemorySubscription:
+    def __init__(self, layer, group):
+        self.layer = layer
+        self.group = group
+        self.queue = queue.Queue()
+        self.on_close = None
+        self.closed = False
+
+    def get(self, timeout):
+        """The next message, or None if there is none within timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.layer.discard(self)
+        if self.on_close:
+            self.on_close()
+
+
+class InMemoryChannelLayer:
+    """
+    Process-local publish/subscribe, for development & single-process deployments.
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, group):
+        subscription = InMemorySubscription(self, group)
+        with self._lock:
+            self._groups.setdefault(group, set()).add(subscription)
+        return subscription
+
+    def discard(self, subscription):
+        with self._lock:
+            subscriptions = self._groups.get(subscription.group, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._groups.pop(subscription.group, None)
+
+    def publish(self, group, message):
+        with self._lock:
+            subscriptions = list(self._groups.get(group, ()))
+        for subscription in subscriptions:
+            subscription.queue.put(message)
+
+
+class RedisChannelLayer:
+    """
+    Publish/subscribe via Redis, shared by all processes.
+    Each process holds one Redis subscription, to every group, from a listener thread which
+    dispatches messages to the process's subscribers (rather than a connection per subscriber).
+    """
+
+    def __init__(self, conn, key_prefix="bryn:watch"):
+        self.conn = conn
+        self.key_prefix = key_prefix
+        self.local = InMemoryChannelLayer()
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, group):
+        self.start_listener()
+        return self.local.subscribe(group)
+
+    def publish(self, group, message):
+        try:
+            self.conn.publish(f"{self.key_prefix}:{group}", json.dumps(message))
+        except RedisError as e:
+            logger.warning(f"Watch channel layer unavailable: {e}")
+
+    def start_listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self.listen, name="watch-listener", daemon=True
+                )
+                self._listener.start()
+
+    def listen(self):
+        """Dispatch messages for all groups to local subscribers, reconnecting on errors"""
+        prefix = f"{self.key_prefix}:"
+        while True:
+            pubsub = self.conn.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"{prefix}*")
+                for message in pubsub.listen():
+                    self.dispatch(prefix, message)
+            except RedisError as e:
+                logger.warning(f"Watch channel layer unavailable: {e}")
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+    def dispatch(self, prefix, message):
+        if message["type"] != "pmessage":
+            return
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        self.local.publish(channel[len(prefix) :], json.loads(message["data"]))
+
+
+def get_channel_layer():
+    """
+    Return a RedisChannelLayer using the huey Redis connection, if configured.
+    Falls back to an InMemoryChannelLayer, e.g. where huey is in immediate mode (development).
+    """
+    conn = getattr(HUEY.storage, "conn", None)
+    if WATCH_SETTINGS.get("CHANNEL_LAYER", "memory") == "redis" and conn is not None:
+        return RedisChannelLayer(
+            conn, key_prefix=WATCH_SETTINGS.get("KEY_PREFIX", "bryn:watch")
+        )
+    return InMemoryChannelLayer()
+
+
+def get_changes(previous, current):
+    """
+    Messages for resources which are new or have changed status, or have gone, between
+    snapshots of a tenant's resources ({type: {id: data}}). Every resource, if no previous.
+    """
+    for resource_type, resources in current.items():
+        before = (previous or {}).get(resource_type, {})
+        for resource_id, data in resources.items():
+            if previous is None or before.get(resource_id, {}).get(
+                "status"
+            ) != data.get("status"):
+                yield {
+                    "type": resource_type,
+                    "id": resource_id,
+                    "status": data.get("status"),
+                    "deleted": False,
+                    "data": data,
+                }
+        for resource_id in before.keys() - resources.keys():
+            yield {
+                "type": resource_type,
+                "id": resource_id,
+                "status": None,
+                "deleted": True,
+                "data": None,
+            }
+
+
+def get_group_name(tenant):
+    return f"tenant-{tenant.pk}"
+
+
+class TenantPoller:
+    """
+    Polls a tenant's resources while it has subscribers, publishing status changes to the
+    tenant's group. Every process with subscribers runs a poller, but a cache lock means one
+    upstream listing per interval, across processes (approximately, with a non-atomic cache).
+    The last snapshot is also held in the cache, with the time it was polled, for changes, to
+    replay to new subscribers & for long-polling waiters.
+    `collect(tenant)` returns a snapshot: {resource type: {id: serialized data}}.
+    """
+
+    def __init__(self, tenant, collect, layer, interval=5, snapshot_timeout=300):
+        self.tenant = tenant
+        self.collect = collect
+        self.layer = layer
+        self.interval = interval
+        self.snapshot_timeout = snapshot_timeout
+        self.group = get_group_name(tenant)
+        self.lock_key = f"openstack:watch:{tenant.pk}:polled"
+        self.snapshot_key = f"openstack:watch:{tenant.pk}:snapshot"
+        self.subscribers = 0
+        self._stopped = threading.Event()
+
+    @property
+    def snapshot(self):
+        return self.get_snapshot()[1]
+
+    def get_snapshot(self):
+        """(time polled, snapshot) of the last snapshot, or (None, None)"""
+        return cache.get(self.snapshot_key, (None, None))
+
+    def start(self):
+        threading.Thread(
+            target=self.run, name=f"watch-{self.tenant.pk}", daemon=True
+        ).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception(f"Failed to poll {self.tenant} for changes")
+            finally:
+                connections.close_all()
+            self._stopped.wait(self.interval)
+
+    def poll(self):
+        """
+        Collect the tenant's resources & publish changes, unless polled within the interval.
+        """
+        if not cache.add(self.lock_key, True, timeout=self.interval):
+            return
+        polled_at = time.time()
+        previous = self.snapshot
+        current = self.collect(self.tenant)
+        cache.set(
+            self.snapshot_key, (polled_at, current), timeout=self.snapshot_timeout
+        )
+        for message in get_changes(previous, current):
+            self.layer.publish(self.group, message)
+
+
+class StreamLimitReached(Exception):
+    pass
+
+
+class WatchRegistry:
+    """
+    Thread-safe, process-wide registry of tenant pollers, started by a tenant's first subscriber
+    (or waiter) & stopped when its last subscriber closes (or waiter releases it).
+    Subscriptions (streams) are limited to max_streams per process, if set.
+    """
+
+    def __init__(self, layer, interval=5, snapshot_timeout=300, max_streams=None):
+        self.layer = layer
+        self.interval = interval
+        self.snapshot_timeout = snapshot_timeout
+        self.max_streams = max_streams
+        self._pollers = {}
+        self._streams = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tenant, collect):
+        """
+        Start a poller for the tenant, or share its running poller; release it when done.
+        """
+        with self._lock:
+            poller = self._pollers.get(tenant.pk)
+            if poller is None:
+                poller = self._pollers[tenant.pk] = TenantPoller(
+                    tenant,
+                    collect,
+                    self.layer,
+                    interval=self.interval,
+                    snapshot_timeout=self.snapshot_timeout,
+                )
+                poller.start()
+            poller.subscribers += 1
+        return poller
+
+    def release(self, tenant_pk):
+        with self._lock:
+            poller = self._pollers[tenant_pk]
+            poller.subscribers -= 1
+            if poller.subscribers == 0:
+                poller.stop()
+                del self._pollers[tenant_pk]
+
+    def subscribe(self, tenant, collect):
+        """
+        Subscribe to changes for a tenant's resources; close the subscription when done.
+        Returns (subscription, the last snapshot, or None).
+        Raises StreamLimitReached if the process already has max_streams subscriptions.
+        """
+        with self._lock:
+            if self.max_streams is not None and self._streams >= self.max_streams:
+                raise StreamLimitReached
+            self._streams += 1
+        try:
+            subscription = self.layer.subscribe(get_group_name(tenant))
+            poller = self.acquire(tenant, collect)
+        except Exception:
+            self._end_stream()
+            raise
+
+        def on_close():
+            self._end_stream()
+            self.release(tenant.pk)
+
+        subscription.on_close = on_close
+        return subscription, poller.snapshot
+
+    def _end_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pollers": len(self._pollers),
+                "subscribers": sum(p.subscribers for p in self._pollers.values()),
+                "streams": self._streams,
+            }
+
+
+watch_registry = WatchRegistry(
+    get_channel_layer(),
+    interval=WATCH_SETTINGS.get("INTERVAL_SECONDS", 5),
+    snapshot_timeout=WATCH_SETTINGS.get("SNAPSHOT_TIMEOUT_SECONDS", 300),
+    max_streams=WATCH_SETTINGS.get("MAX_STREAMS", 4),
+)
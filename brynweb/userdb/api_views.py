@@ -1,3 +1,4 @@
+from core.mixins import ConditionalGetMixin
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
@@ -22,7 +23,7 @@ from .helpers import get_teams_for_user
 User = get_user_model()
 
 
-class TeamListView(generics.ListAPIView):
+class TeamListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API list endpoint for Teams.
     """
@@ -60,7 +61,7 @@ class TeamDetailView(generics.RetrieveUpdateAPIView):
         return super().get(*args, **kwargs)
 
 
-class TeamMemberListView(generics.ListAPIView):
+class TeamMemberListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API list endpoint for TeamMember.
     """
@@ -109,7 +110,7 @@ class TeamMemberDetailView(generics.RetrieveDestroyAPIView):
         return super().delete(self, request, team_id, pk)
 
 
-class InvitationListView(generics.ListCreateAPIView):
+class InvitationListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API list endpoint for Invitation.
     """
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from openstack.models import Tenant
+from .models import Team, TeamMember
+
+MEMBERSHIP_CACHE_TIMEOUT = getattr(settings, "TEAM_MEMBERSHIP_CACHE_TIMEOUT", 600)
+
+
+class TeamMembershipCache:
+    """
+    Per-user map of team memberships, {team id: is admin}, held in the shared cache.
+    Invalidated by Team & TeamMember signals (see userdb.signals); the timeout bounds
+    staleness from changes which bypass signals (e.g. queryset updates).
+    Maps are keyed by a per-user version, which invalidation increments: a map read from
+    the database before an invalidation is stored under the old version, so is never served.
+    Versions rely on the cache's add & incr being atomic across processes (see CACHES).
+    Hit, miss & invalidation counts are per process.
+    """
+
+    def __init__(self, timeout=MEMBERSHIP_CACHE_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._counts = Counter(hits=0, misses=0, invalidations=0)
+
+    def get_key(self, user_id, version):
+        return f"userdb:team_memberships:{user_id}:{version}"
+
+    def get_version_key(self, user_id):
+        return f"userdb:team_memberships_version:{user_id}"
+
+    def get_version(self, user_id):
+        """The user's current version; if unset (or evicted), a new one, unique by time"""
+        key = self.get_version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    def get(self, user):
+        if user.pk is None:  # anonymous
+            return {}
+        key = self.get_key(user.pk, self.get_version(user.pk))
+        memberships = cache.get(key)
+        with self._lock:
+            self._counts["hits" if memberships is not None else "misses"] += 1
+        if memberships is None:
+            memberships = dict(
+                TeamMember.objects.filter(user=user).values_list("team_id", "is_admin")
+            )
+            cache.set(key, memberships, self.timeout)
+        return memberships
+
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            key = self.get_version_key(user_id)
+            try:
+                cache.incr(key)
+            except ValueError:  # unset: any new version invalidates
+                cache.add(key, time.time_ns(), None)
+        with self._lock:
+            self._counts["invalidations"] += len(user_ids)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"]
+        return {**counts, "hit_rate": counts["hits"] / lookups if lookups else None}
+
+
+team_membership_cache = TeamMembershipCache()
+
+
+class AuthorizationContext:
+    """
+    A user's team membership (from the membership cache) and, where a tenant is specified,
+    the tenant with its team, region & region settings, loaded in one joined query.
+    The tenant is None if the user is not a member of the team, or the tenant does not
+    belong to the team.
+    """
+
+    def __init__(self, user, team_id=None, tenant_id=None):
+        self.user = user
+        self.team_id = team_id
+        self.tenant_id = tenant_id
+        memberships = team_membership_cache.get(user)
+        self.is_member = team_id in memberships
+        self.is_admin = memberships.get(team_id, False)
+        self.tenant = None
+        if self.is_member and tenant_id is not None:
+            self.tenant = (
+                Tenant.objects.filter(pk=tenant_id, team_id=team_id)
+                .select_related("team", "region", "region__regionsettings")
+                .first()
+            )
+
+    @cached_property
+    def team(self):
+        if not self.is_member:
+            return None
+        if self.tenant:
+            return self.tenant.team
+        return Team.objects.get(pk=self.team_id)
+
+    @cached_property
+    def team_exists(self):
+        """Only queried if the user is not a member (to distinguish 403 from 404)"""
+        return self.is_member or Team.objects.filter(pk=self.team_id).exists()
+
+
+def get_authorization_context(request, team_id=None, tenant_id=None):
+    """
+    The AuthorizationContext for a request; by default for the team_id & tenant_id in its
+    URL kwargs. Cached on the request, so permission classes & views share one lookup.
+    """
+    if team_id is None and tenant_id is None:
+        kwargs = request.resolver_match.kwargs
+        team_id, tenant_id = kwargs.get("team_id"), kwargs.get("tenant_id")
+    django_request = getattr(request, "_request", request)  # DRF Request
+    contexts = django_request.__dict__.setdefault("authorization_contexts", {})
+    key = (request.user.pk, team_id, tenant_id)
+    if key not in contexts:
+        contexts[key] = AuthorizationContext(request.user, team_id, tenant_id)
+    return contexts[key]
@@ -1,6 +1,6 @@
 from rest_framework import permissions, exceptions
 
-from .models import Team, TeamMember
+from .authorization import get_authorization_context
 
 
 class IsTeamAdminPermission(permissions.BasePermission):
@@ -12,15 +12,12 @@ class IsTeamAdminPermission(permissions.BasePermission):
         """
         Check whether the current user is admin for the team.
         """
-        try:
-            team_id = request.resolver_match.kwargs["team_id"]
-            Team.objects.get(pk=team_id)
-            team_member = TeamMember.objects.get(team=team_id, user=request.user)
-        except Team.DoesNotExist:
-            raise exceptions.NotFound  # No team
-        except TeamMember.DoesNotExist:
+        context = get_authorization_context(request)
+        if not context.is_member:
+            if not context.team_exists:
+                raise exceptions.NotFound  # No team
             return False  # Team exists, but user is not a member
-        return team_member.is_admin
+        return context.is_admin
 
 
 class IsTeamAdminForUnsafePermission(IsTeamAdminPermission):
@@ -43,12 +40,9 @@ class IsTeamMemberPermission(permissions.BasePermission):
         """
         Check whether the current user is a member of the team.
         """
-        try:
-            team_id = request.resolver_match.kwargs["team_id"]
-            Team.objects.get(pk=team_id)
-            TeamMember.objects.get(team=team_id, user=request.user)
-            return True
-        except Team.DoesNotExist:
-            raise exceptions.NotFound  # No team
-        except TeamMember.DoesNotExist:
+        context = get_authorization_context(request)
+        if not context.is_member:
+            if not context.team_exists:
+                raise exceptions.NotFound  # No team
             return False  # Team exists, but user is not a member
+        return True
@@ -1,9 +1,11 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
 from openstack.models import KeyPair
-from .models import LicenceAcceptance, Profile, Team
+from .authorization import team_membership_cache
+from .models import LicenceAcceptance, Profile, Team, TeamMember
 
 
 @receiver(post_save, sender=User)
@@ -42,6 +44,44 @@ def send_new_registration_admin_email(sender, instance, created, **kwargs):
         instance.send_new_team_admin_email()
 
 
+def invalidate_team_memberships(*user_ids):
+    """
+    Invalidate users' cached team memberships now & again on commit: until then, other
+    connections may re-cache the old memberships.
+    """
+    team_membership_cache.invalidate(*user_ids)
+    transaction.on_commit(lambda: team_membership_cache.invalidate(*user_ids))
+
+
+@receiver([post_save, post_delete], sender=TeamMember)
+def invalidate_member_team_memberships(sender, instance, **kwargs):
+    """Invalidate the cached team memberships of the member's user"""
+    invalidate_team_memberships(instance.user_id)
+
+
+@receiver(post_save, sender=Team)
+def invalidate_team_memberships_on_save(sender, instance, created, **kwargs):
+    """Invalidate the cached team memberships of the team's members"""
+    if not created:
+        invalidate_team_memberships(
+            *instance.memberships.values_list("user_id", flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Team)
+def collect_team_member_user_ids(sender, instance, **kwargs):
+    """Members are deleted with the team, so are collected beforehand"""
+    instance._member_user_ids = list(
+        instance.memberships.values_list("user_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Team)
+def invalidate_team_memberships_on_delete(sender, instance, **kwargs):
+    """Invalidate the cached team memberships of the deleted team's members"""
+    invalidate_team_memberships(*getattr(instance, "_member_user_ids", ()))
+
+
 @receiver(post_save, sender=KeyPair)
 def set_first_keypair_as_default(sender, instance, created, **kwargs):
     """Set first keypair as a user's default"""
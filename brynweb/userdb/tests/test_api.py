@@ -342,6 +342,23 @@ class TestTeamMemberAPI(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
 
+    def test_team_members_list_is_conditional(self):
+        """Is an unchanged list answered 304 Not Modified, for a matching ETag?"""
+        self.client.force_login(user=self.team_a_member1)
+        url = reverse(self.path_name, kwargs={"team_id": self.team_a.pk})
+        response = self.client.get(url)
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+        TeamMember.objects.create(team=self.team_a, user=UserFactory())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertNotEqual(response["ETag"], etag)
+
     def test_user_from_different_team_cannot_view_team_members(self):
         """Is a user from a different team forbidden from viewing team members?"""
         self.client.force_login(user=self.team_b_admin)
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.test import TestCase
+
+from openstack.tests.factories import TenantFactory
+from ..authorization import (
+    AuthorizationContext,
+    get_authorization_context,
+    team_membership_cache,
+)
+from ..models import TeamMember
+from ..signals import invalidate_member_team_memberships
+from .factories import UserFactory
+
+
+class TestAuthorizationContext(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tenant = TenantFactory()
+        cls.member = TeamMember.objects.create(
+            team=cls.tenant.team, user=cls.user, is_admin=True
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tenant_context_is_one_query(self):
+        """Are tenant, region & region settings resolved in one query, once cached?"""
+        AuthorizationContext(self.user, team_id=self.tenant.team_id)  # fill cache
+        with self.assertNumQueries(1):
+            context = AuthorizationContext(
+                self.user, team_id=self.tenant.team_id, tenant_id=self.tenant.pk
+            )
+            self.assertEqual(context.tenant, self.tenant)
+            self.assertTrue(context.is_admin)
+            self.assertEqual(context.team, self.tenant.team)
+            context.tenant.region.regionsettings
+
+    def test_non_member_has_no_tenant(self):
+        """Is a tenant withheld from non-members, & for the wrong team?"""
+        context = AuthorizationContext(
+            UserFactory(), team_id=self.tenant.team_id, tenant_id=self.tenant.pk
+        )
+        self.assertIsNone(context.tenant)
+        self.assertFalse(context.is_member)
+        self.assertTrue(context.team_exists)
+
+        other_tenant = TenantFactory()
+        context = AuthorizationContext(
+            self.user, team_id=self.tenant.team_id, tenant_id=other_tenant.pk
+        )
+        self.assertIsNone(context.tenant)
+
+    def test_missing_team(self):
+        """Is a missing team distinguished from a lack of membership?"""
+        context = AuthorizationContext(self.user, team_id=self.tenant.team_id + 1000)
+        self.assertFalse(context.is_member)
+        self.assertFalse(context.team_exists)
+
+    def test_context_is_cached_on_request(self):
+        """Is the context resolved once per request?"""
+        request = SimpleNamespace(
+            user=self.user,
+            resolver_match=SimpleNamespace(kwargs={"team_id": self.tenant.team_id}),
+        )
+        with self.assertNumQueries(1):  # memberships
+            context = get_authorization_context(request)
+            self.assertIs(get_authorization_context(request), context)
+            self.assertTrue(context.is_member)
+
+
+class TestTeamMembershipCache(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_memberships_are_cached(self):
+        """Are memberships queried once, then served from the cache?"""
+        member = TeamMember.objects.create(
+            team=TenantFactory().team, user=UserFactory(), is_admin=True
+        )
+        before = team_membership_cache.stats()
+        with self.assertNumQueries(1):
+            memberships = team_membership_cache.get(member.user)
+            self.assertEqual(team_membership_cache.get(member.user), memberships)
+        self.assertEqual(memberships, {member.team_id: True})
+        after = team_membership_cache.stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+
+    def test_signals_invalidate_memberships(self):
+        """Do membership changes & deletion invalidate the cached map?"""
+        user = UserFactory()
+        team = TenantFactory().team
+        self.assertEqual(team_membership_cache.get(user), {})
+        member = TeamMember.objects.create(team=team, user=user)
+        self.assertEqual(team_membership_cache.get(user), {team.pk: False})
+        member.is_admin = True
+        member.save()
+        self.assertEqual(team_membership_cache.get(user), {team.pk: True})
+        member.delete()
+        self.assertEqual(team_membership_cache.get(user), {})
+
+        TeamMember.objects.create(team=team, user=user)
+        self.assertEqual(team_membership_cache.get(user), {team.pk: False})
+        team.delete()
+        self.assertEqual(team_membership_cache.get(user), {})
+
+    def test_team_signals_invalidate_memberships(self):
+        """Do team changes & deletion invalidate the members' cached maps?"""
+        user = UserFactory()
+        team = TenantFactory().team
+        TeamMember.objects.create(team=team, user=user)
+        team_membership_cache.get(user)
+        version = team_membership_cache.get_version(user.pk)
+        team.save()
+        self.assertNotEqual(team_membership_cache.get_version(user.pk), version)
+        self.assertEqual(team_membership_cache.get(user), {team.pk: False})
+
+        # Not via the members' (cascaded) deletion
+        post_delete.disconnect(invalidate_member_team_memberships, sender=TeamMember)
+        try:
+            team.delete()
+        finally:
+            post_delete.connect(invalidate_member_team_memberships, sender=TeamMember)
+        self.assertEqual(team_membership_cache.get(user), {})
+
+    def test_invalidation_during_read(self):
+        """Is a map read before a concurrent invalidation not served afterwards?"""
+        user = UserFactory()
+        filter_members = TeamMember.objects.filter
+
+        def read_then_invalidate(**kwargs):
+            rows = list(filter_members(**kwargs).values_list("team_id", "is_admin"))
+            team_membership_cache.invalidate(user.pk)  # e.g. by a concurrent commit
+            return mock.Mock(values_list=mock.Mock(return_value=rows))
+
+        with mock.patch.object(
+            TeamMember.objects, "filter", side_effect=read_then_invalidate
+        ):
+            team_membership_cache.get(user)
+        with self.assertNumQueries(1):
+            team_membership_cache.get(user)
+            team_membership_cache.get(user)
+
+    def test_invalidation_without_version(self):
+        """If a user's version is unset (e.g. evicted), does invalidation still apply?"""
+        user = UserFactory()
+        team_membership_cache.get(user)
+        cache.delete(team_membership_cache.get_version_key(user.pk))
+        team_membership_cache.invalidate(user.pk)
+        with self.assertNumQueries(1):
+            team_membership_cache.get(user)
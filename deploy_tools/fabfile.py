@@ -111,6 +111,7 @@ def _update_database(c, source_dir):
 
 def _restart_gunicorn(c):
     c.run(f"sudo systemctl restart gunicorn-{c.host.split('.')[0]}")
+    c.run(f"sudo systemctl restart gunicorn-asgi-{c.host.split('.')[0]}")
 
 
 def _restart_huey(c):